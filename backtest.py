@@ -0,0 +1,215 @@
+"""Vectorized backtest of the trade_recommendation rule set.
+
+trade_recommendation scores the latest bar only: +1 / -1 when the close,
+its 50-day and its 200-day average are stacked bullishly / bearishly
+(calculate_moving_average), +1.5 / -1.5 when the RSI is below 30 / above 70
+(calculate_rsi), and recommends buying on a positive score. Here that
+score is computed for every bar of every symbol and traded long-only: a
+position is opened at the close of a bar scoring at least `min_strength`
+and closed at the close of the first bar scoring 0 or less. With a
+`volume_multiplier`, entries also need the bar's volume above that
+multiple of its trailing `volume_window`-day average (the "unusual volume"
+of calculate_moving_average); 0 turns the check off.
+
+Parameter grids run as one batch: every indicator is computed once per
+distinct parameter value over the (symbols, days) arrays of indicators.py,
+the combinations are stacked into (combinations, symbols, days) arrays, and
+signals, positions, returns and trade statistics are array operations over
+all of them. Nothing loops over bars in Python (Wilder-mode RSI smoothing
+aside, which loops over days once per distinct period).
+"""
+from __future__ import annotations
+
+from typing import Any
+import itertools
+import math
+import os
+import warnings
+
+from indicators import RSI_MODES, rsi, sma
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+# Parameters of the rule and their defaults (those of trade_recommendation)
+DEFAULT_PARAMS = {
+    "rsi_period": 14,
+    "rsi_mode": "sma",
+    "oversold": 30.0,
+    "overbought": 70.0,
+    "ma_fast": 50,
+    "ma_slow": 200,
+    "volume_multiplier": 0.0,
+    "volume_window": 50,
+    "min_strength": 0.5,
+    "cost_bps": 0.0,
+}
+WINDOW_PARAMS = ("rsi_period", "ma_fast", "ma_slow", "volume_window")
+# Metric -> True when a larger value is better
+RANKINGS = {"total_return": True, "annual_return": True, "sharpe": True, "hit_rate": True, "max_drawdown": False}
+TRADING_DAYS = 252
+
+SCREENER_BACKTEST_MAX_COMBINATIONS = int(os.getenv("SCREENER_BACKTEST_MAX_COMBINATIONS", "256"))
+# Cells (combinations x symbols x days) evaluated per batch, to bound memory
+BATCH_CELLS = 4_000_000
+
+
+def parameter_grid(params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+    """Every combination of the given parameters (a list sweeps a parameter), on top of the defaults.
+
+    Raises ValueError for unknown parameters or values, and for grids over
+    SCREENER_BACKTEST_MAX_COMBINATIONS combinations.
+    """
+    params = params or {}
+    unknown = sorted(set(params) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown backtest parameters {unknown}, expected some of {list(DEFAULT_PARAMS)}")
+    axes = {name: values if isinstance(values, list) else [values] for name, values in params.items()}
+    size = math.prod(len(values) for values in axes.values())
+    if size > SCREENER_BACKTEST_MAX_COMBINATIONS:
+        raise ValueError(f"{size} parameter combinations, at most {SCREENER_BACKTEST_MAX_COMBINATIONS} allowed")
+    grid = []
+    for values in itertools.product(*axes.values()):
+        combination = {**DEFAULT_PARAMS, **dict(zip(axes, values))}
+        for name, default in DEFAULT_PARAMS.items():
+            try:
+                combination[name] = type(default)(combination[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}: {combination[name]!r}") from None
+        if combination["rsi_mode"] not in RSI_MODES:
+            raise ValueError(f"Unknown RSI mode {combination['rsi_mode']!r}, expected one of {RSI_MODES}")
+        if any(combination[name] < 1 for name in WINDOW_PARAMS):
+            raise ValueError(f"Windows must be at least 1 day: {', '.join(WINDOW_PARAMS)}")
+        grid.append(combination)
+    return grid
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """Carry each row's last value forward over NaNs (along the last axis); leading NaNs stay."""
+    flat = x.reshape(-1, x.shape[-1])
+    index = np.where(np.isnan(flat), 0, np.arange(flat.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(flat, index, axis=1).reshape(x.shape)
+
+
+def _stack(cache: dict, keys: list) -> np.ndarray:
+    return np.stack([cache[key] for key in keys])
+
+
+def _column(batch: list[dict[str, Any]], name: str) -> np.ndarray:
+    # One value per combination, shaped to broadcast over (combinations, symbols, days)
+    return np.array([combination[name] for combination in batch], dtype=float)[:, None, None]
+
+
+def backtest(close: np.ndarray, volume: np.ndarray | None, grid: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """Metrics of every parameter combination on every symbol, each shaped (combinations, symbols).
+
+    `close` and `volume` are (symbols, days) arrays as built by
+    indicators.align_series. Returns fractions (not percentages): total and
+    annualized return, maximum drawdown, hit rate (winning / all trades, the
+    last one marked to market), trades, exposure (share of days held),
+    annualized Sharpe ratio of daily returns, and buy-and-hold return.
+    """
+    close = _ffill(close)
+    if volume is None:
+        if any(combination["volume_multiplier"] > 0 for combination in grid):
+            raise ValueError("volume_multiplier needs volume data")
+        volume = np.full(close.shape, np.nan)
+    valid = ~np.isnan(close)
+    days = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.nan_to_num(np.diff(close, axis=1, prepend=np.nan) / np.roll(close, 1, axis=1))
+        first = np.take_along_axis(close, valid.argmax(axis=1)[:, None], axis=1)[:, 0]
+        buy_and_hold = close[:, -1] / first - 1
+
+    # Each indicator once per distinct parameter value
+    rsis = {key: rsi(close, *key) for key in {(c["rsi_period"], c["rsi_mode"]) for c in grid}}
+    averages = {w: sma(close, w) for w in {c[name] for c in grid for name in ("ma_fast", "ma_slow")}}
+    volumes = {w: sma(volume, w) for w in {c["volume_window"] for c in grid}}
+
+    per_batch = max(1, BATCH_CELLS // max(1, close.size))
+    batches = []
+    for start in range(0, len(grid), per_batch):
+        batch = grid[start:start + per_batch]
+        fast = _stack(averages, [c["ma_fast"] for c in batch])
+        slow = _stack(averages, [c["ma_slow"] for c in batch])
+        strength = _stack(rsis, [(c["rsi_period"], c["rsi_mode"]) for c in batch])
+        average_volume = _stack(volumes, [c["volume_window"] for c in batch])
+
+        # The combine_signals score, for every bar (NaN comparisons are False, so missing data scores 0)
+        score = (np.where((close > fast) & (fast > slow), 1.0, 0.0)
+                 - np.where((close < fast) & (fast < slow), 1.0, 0.0)
+                 + np.where(strength < _column(batch, "oversold"), 1.5, 0.0)
+                 - np.where(strength > _column(batch, "overbought"), 1.5, 0.0))
+        multiplier = _column(batch, "volume_multiplier")
+        entries = (score >= _column(batch, "min_strength")) & ((multiplier <= 0) | (volume > multiplier * average_volume))
+        # 1 from an entry, 0 from an exit, carried forward in between
+        position = np.nan_to_num(_ffill(np.where(entries, 1.0, np.where(score <= 0, 0.0, np.nan))))
+        # A position taken at a bar's close earns the next bar's return
+        held = np.concatenate([np.zeros(position.shape[:-1] + (1,)), position[..., :-1]], axis=-1)
+        starts = np.diff(held, axis=-1, prepend=0.0) > 0
+        # Both sides of a trade are paid on entry, as a fraction of equity
+        returns = (1 + held * daily) * (1 - starts * (2 * _column(batch, "cost_bps") / 1e4)) - 1
+
+        log = np.log1p(returns)
+        equity = np.exp(np.cumsum(log, axis=-1))
+        drawdown = 1 - equity / np.maximum(np.maximum.accumulate(equity, axis=-1), 1.0)
+        trades = starts.sum(axis=-1)
+
+        # Per-trade returns: sum each trade's log returns under an id unique across rows
+        rows = np.arange(trades.size).reshape(trades.shape)[..., None]
+        trade = rows * (close.shape[1] + 1) + np.cumsum(starts, axis=-1)
+        in_trade = held > 0
+        trade_log = np.bincount(trade[in_trade], weights=log[in_trade], minlength=trades.size * (close.shape[1] + 1))
+        won = trade_log.reshape(trades.size, -1)[:, 1:] > 0
+        wins = won.sum(axis=1).reshape(trades.shape)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            total = np.expm1(log.sum(axis=-1))
+            mean = returns.sum(axis=-1) / days
+            spread = np.sqrt(np.clip((returns * returns).sum(axis=-1) / days - mean * mean, 0.0, None))
+            batches.append({
+                "total_return": total,
+                "annual_return": (1 + total) ** (TRADING_DAYS / days) - 1,
+                "max_drawdown": drawdown.max(axis=-1),
+                "hit_rate": wins / trades,
+                "trades": trades,
+                "wins": wins,
+                "exposure": held.sum(axis=-1) / days,
+                "sharpe": np.where(spread > 0, mean / spread * math.sqrt(TRADING_DAYS), np.nan),
+            })
+    metrics = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+    metrics["buy_and_hold"] = np.broadcast_to(buy_and_hold, metrics["total_return"].shape)
+    return metrics
+
+
+def _value(x: Any) -> Any:
+    x = float(x)
+    return None if math.isnan(x) or math.isinf(x) else round(x, 4)
+
+
+def summarize(symbols: list[str], grid: list[dict[str, Any]], metrics: dict[str, np.ndarray],
+              rank_by: str = "total_return", top: int = 10) -> dict[str, Any]:
+    """Combinations ranked by `rank_by` (averaged over symbols), and the best one symbol by symbol."""
+    if rank_by not in RANKINGS:
+        raise ValueError(f"Unknown ranking {rank_by!r}, expected one of {list(RANKINGS)}")
+    swept = [name for name in DEFAULT_PARAMS if len({c[name] for c in grid}) > 1]
+    trades, wins = metrics["trades"].sum(axis=1), metrics["wins"].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # Means over symbols with no value at all (no trades, too little history) are NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        summary = {name: np.nanmean(np.where(np.isfinite(metrics[name]), metrics[name], np.nan), axis=1)
+                   for name in ("total_return", "annual_return", "max_drawdown", "sharpe", "exposure")}
+        summary["hit_rate"] = wins / trades
+    key = np.nan_to_num(summary[rank_by], nan=-np.inf if RANKINGS[rank_by] else np.inf)
+    order = np.argsort(-key if RANKINGS[rank_by] else key, kind="stable")
+    results = [{"params": {name: grid[i][name] for name in swept} if swept else grid[i],
+                **{name: _value(values[i]) for name, values in summary.items()},
+                "trades": int(trades[i])} for i in order[:top]]
+    best = order[0]
+    per_symbol = {symbol: {name: _value(metrics[name][best, row]) for name in
+                           ("total_return", "annual_return", "max_drawdown", "hit_rate", "sharpe", "exposure",
+                            "buy_and_hold")} | {"trades": int(metrics["trades"][best, row])}
+                  for row, symbol in enumerate(symbols)}
+    return {"combinations": len(grid), "ranked_by": rank_by, "results": results,
+            "best": {"params": grid[best], "per_symbol": per_symbol}}
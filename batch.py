@@ -0,0 +1,51 @@
+"""Fan-out helper behind the multi-symbol batch tools.
+
+Symbols run concurrently up to a limit (SCREENER_BATCH_CONCURRENCY by
+default); the shared client's per-host rate limit still applies underneath.
+One symbol failing never fails the batch: its error is reported next to the
+results of the others.
+"""
+from typing import Any, Awaitable, Callable
+import asyncio
+import os
+
+SCREENER_BATCH_CONCURRENCY = int(os.getenv("SCREENER_BATCH_CONCURRENCY", "5"))
+
+
+async def run_batch(symbols: list[str], fn: Callable[[str], Awaitable[Any]],
+                    concurrency: int | None = None,
+                    progress: Callable[[int, int], Awaitable[None]] | None = None) -> dict[str, Any]:
+    """Run `fn` once per unique symbol and split the outcomes into results and errors.
+
+    A result that is a dict with an "error" key (the tools' error convention)
+    counts as an error, as does a raised exception. `progress`, if given, is
+    awaited with (finished, total) after each symbol.
+    """
+    unique = list(dict.fromkeys(s.strip() for s in symbols if s.strip()))
+    semaphore = asyncio.Semaphore(max(1, concurrency or SCREENER_BATCH_CONCURRENCY))
+    outcomes: dict[str, tuple[bool, Any]] = {}
+
+    async def one(symbol: str) -> None:
+        async with semaphore:
+            try:
+                result = await fn(symbol)
+            except Exception as e:
+                outcomes[symbol] = (False, str(e))
+            else:
+                if isinstance(result, dict) and "error" in result:
+                    outcomes[symbol] = (False, result["error"])
+                else:
+                    outcomes[symbol] = (True, result)
+        if progress is not None:
+            await progress(len(outcomes), len(unique))
+
+    await asyncio.gather(*(one(s) for s in unique))
+    results = {s: outcomes[s][1] for s in unique if outcomes[s][0]}
+    errors = {s: outcomes[s][1] for s in unique if not outcomes[s][0]}
+    return {
+        "requested": len(unique),
+        "succeeded": len(results),
+        "failed": len(errors),
+        "results": results,
+        "errors": errors,
+    }
@@ -0,0 +1,91 @@
+"""Microbenchmark: backtesting a parameter grid over many symbols, bar-by-bar loop vs the vectorized engine.
+
+No network or stub server involved: chart payloads are generated in memory.
+The loop runs the trade_recommendation rule one bar, one symbol and one
+parameter set at a time (sharing the indicator arrays, so only the
+signal/position/return bookkeeping is compared); backtest.backtest
+evaluates the whole (parameter sets, symbols, days) grid in one pass.
+The loop is timed on --loop-symbols symbols and scaled up.
+
+    python -m benchmarks.bench_backtest --symbols 10 100 500 --days 1825
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backtest import backtest, parameter_grid
+from benchmarks.stub_server import chart_payload
+from indicators import align_series, rsi, sma
+
+GRID = {"rsi_period": [7, 14, 21], "volume_multiplier": [0, 1.2, 1.5, 2.0]}
+
+
+def loop_backtest(close: list[float], volume: list[float], p: dict) -> dict:
+    """The rule bar by bar, for one symbol and one parameter set."""
+    row = np.array([close])
+    fast, slow = sma(row, p["ma_fast"])[0], sma(row, p["ma_slow"])[0]
+    strength = rsi(row, p["rsi_period"], p["rsi_mode"])[0]
+    average_volume = sma(np.array([volume]), p["volume_window"])[0]
+    cost = 2 * p["cost_bps"] / 1e4
+    position, equity, peak, drawdown, trades, wins, trade_return = 0, 1.0, 1.0, 0.0, 0, 0, 1.0
+    for t in range(1, len(close)):
+        if position:
+            day = close[t] / close[t - 1] - 1
+            equity *= 1 + day
+            trade_return *= 1 + day
+            peak = max(peak, equity)
+            drawdown = max(drawdown, 1 - equity / peak)
+        score = 0.0
+        if close[t] > fast[t] > slow[t]:
+            score += 1
+        elif close[t] < fast[t] < slow[t]:
+            score -= 1
+        if strength[t] < p["oversold"]:
+            score += 1.5
+        elif strength[t] > p["overbought"]:
+            score -= 1.5
+        volume_ok = p["volume_multiplier"] <= 0 or volume[t] > p["volume_multiplier"] * average_volume[t]
+        # A position opened at the last close never earns anything and is not a trade
+        if not position and score >= p["min_strength"] and volume_ok and t < len(close) - 1:
+            # Paid from the next bar's equity, as the engine charges both sides on entry
+            position, trades, trade_return = 1, trades + 1, 1 - cost
+            equity *= 1 - cost
+        elif position and score <= 0:
+            position, wins = 0, wins + (trade_return > 1)
+    if position:
+        wins += trade_return > 1
+    return {"total_return": equity - 1, "max_drawdown": drawdown, "trades": trades, "wins": wins}
+
+
+def main(symbol_counts: list[int], days: int, loop_symbols: int) -> None:
+    grid = parameter_grid(GRID)
+    print(f"{len(grid)} parameter sets, {days} days of history")
+    print(f"{'symbols':>8}{'loop s (est.)':>15}{'vectorized s':>14}{'speed-up':>10}")
+    for count in symbol_counts:
+        payloads = {f"SYM{i}": chart_payload(f"SYM{i}", "Price-Volume", days) for i in range(count)}
+        _, close = align_series(payloads, "Price")
+        _, volume = align_series(payloads, "Volume")
+
+        start = time.perf_counter()
+        metrics = backtest(close, volume, grid)
+        vectorized = time.perf_counter() - start
+
+        sample = min(count, loop_symbols)
+        start = time.perf_counter()
+        for i, p in enumerate(grid):
+            for s in range(sample):
+                expected = loop_backtest(list(close[s]), list(volume[s]), p)
+                assert np.isclose(metrics["total_return"][i, s], expected["total_return"])
+                assert metrics["trades"][i, s] == expected["trades"]
+        loop = (time.perf_counter() - start) * count / sample
+        print(f"{count:>8}{loop:>15.2f}{vectorized:>14.3f}{loop / vectorized:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--days", type=int, default=1825)
+    parser.add_argument("--loop-symbols", type=int, default=10, help="symbols the loop is actually timed on")
+    args = parser.parse_args()
+    main(args.symbols, args.days, args.loop_symbols)
@@ -0,0 +1,177 @@
+"""Benchmark: every MCP tool end to end, offline, against the replay fixtures.
+
+Each round calls all of benchmarks.scenarios.SCENARIOS through
+`mcp.call_tool` (argument validation, the tool, JSON encoding) with at most
+--concurrency calls in flight. Upstream responses come from the recorded
+fixtures, so the numbers measure this server, not the network.
+
+--state warm (default) runs one untimed round first, so caches, the symbol
+index and the price store are populated and rounds measure the hit path.
+--state cold gives every round empty caches and stores, so every call parses
+(a warehouse loaded once up front is kept, for screen_companies).
+
+Reports throughput, p50/p99 latency, peak RSS growth and, with
+--tracemalloc, the peak Python heap. --json saves the results; --baseline
+compares against saved results and exits 1 if throughput dropped, or p99
+latency grew, by more than --tolerance.
+
+    python -m benchmarks.bench_e2e --concurrency 1 8 32 --rounds 20
+    python -m benchmarks.bench_e2e --state cold --json e2e.json
+    python -m benchmarks.bench_e2e --baseline e2e.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import http_client
+import warehouse
+from benchmarks.scenarios import SCENARIOS, WATCHLIST, reset_state, tool_error
+from replay import SCREENER_REPLAY_DIR, ReplayTransport
+from server import mcp
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+async def call(tool: str, arguments: dict) -> str | None:
+    result = await mcp.call_tool(tool, arguments)
+    text = result[0].text
+    return tool_error(json.loads(text) if text[:1] in "{[" else text)
+
+
+async def run_round(concurrency: int, latencies: dict[str, list[float]], errors: dict[str, str]) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(tool: str, arguments: dict) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            error = await call(tool, arguments)
+            latencies.setdefault(tool, []).append(time.perf_counter() - start)
+            if error:
+                errors[tool] = error
+
+    await asyncio.gather(*(timed(tool, arguments) for tool, arguments in SCENARIOS))
+
+
+def fresh_state(root: str, shared_warehouse: str) -> None:
+    directory = tempfile.mkdtemp(dir=root)
+    reset_state(directory)
+    warehouse.configure_warehouse(shared_warehouse)
+
+
+async def run_level(concurrency: int, rounds: int, cold: bool, root: str, shared_warehouse: str,
+                    trace: bool) -> dict:
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, str] = {}
+    if not cold:
+        fresh_state(root, shared_warehouse)
+        await run_round(concurrency, {}, {})
+    rss_before = max_rss_mb()
+    if trace:
+        tracemalloc.start()
+    elapsed = 0.0
+    for _ in range(rounds):
+        if cold:
+            fresh_state(root, shared_warehouse)
+        start = time.perf_counter()
+        await run_round(concurrency, latencies, errors)
+        elapsed += time.perf_counter() - start
+    heap_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if trace else None
+    if trace:
+        tracemalloc.stop()
+    every = np.concatenate([np.asarray(v) for v in latencies.values()])
+    return {
+        "concurrency": concurrency,
+        "calls": len(every),
+        "errors": errors,
+        "throughput": len(every) / elapsed,
+        "p50_ms": float(np.percentile(every, 50)) * 1e3,
+        "p99_ms": float(np.percentile(every, 99)) * 1e3,
+        "rss_growth_mb": max_rss_mb() - rss_before,
+        "heap_peak_mb": heap_peak,
+        "tools": {tool: {"p50_ms": float(np.percentile(v, 50)) * 1e3, "p99_ms": float(np.percentile(v, 99)) * 1e3}
+                  for tool, v in sorted(latencies.items())},
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Regressions of `results` against `baseline` (matched on concurrency), as readable lines."""
+    previous = {level["concurrency"]: level for level in baseline}
+    regressions = []
+    for level in results:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        if level["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: throughput {before['throughput']:.1f} -> "
+                               f"{level['throughput']:.1f} calls/s")
+        if level["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: p99 {before['p99_ms']:.2f} -> "
+                               f"{level['p99_ms']:.2f} ms")
+    return regressions
+
+
+async def main(concurrency: list[int], rounds: int, state: str, directory: str, trace: bool,
+               per_tool: bool) -> list[dict]:
+    http_client.configure_client(transport=ReplayTransport(directory), rate_limit=0)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            shared_warehouse = os.path.join(root, "warehouse")
+            fresh_state(root, shared_warehouse)
+            await call("load_warehouse", {"symbols": WATCHLIST})
+            print(f"{len(SCENARIOS)} scenarios x {rounds} rounds, {state} state, fixtures from {directory}")
+            print(f"{'concurrency':>11}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'rss +MB':>10}"
+                  + (f"{'heap MB':>10}" if trace else ""))
+            for level in concurrency:
+                result = await run_level(level, rounds, state == "cold", root, shared_warehouse, trace)
+                results.append(result)
+                print(f"{level:>11}{result['throughput']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                      f"{result['rss_growth_mb']:>10.1f}" + (f"{result['heap_peak_mb']:>10.1f}" if trace else ""))
+                for tool, error in result["errors"].items():
+                    print(f"{'':>11}error in {tool}: {error[:100]}")
+                if per_tool:
+                    for tool, stats in result["tools"].items():
+                        print(f"{'':>11}{tool:<36}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    finally:
+        await http_client.close_client()
+        http_client.reset_client_config()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--state", choices=("warm", "cold"), default="warm")
+    parser.add_argument("--dir", default=SCREENER_REPLAY_DIR, help="replay fixture directory")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace the peak Python heap (slower)")
+    parser.add_argument("--per-tool", action="store_true", help="print p50/p99 of every tool")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="results saved with --json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    results = asyncio.run(main(args.concurrency, args.rounds, args.state, args.dir, args.tracemalloc,
+                               args.per_tool))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,77 @@
+"""Benchmark: tool result size and encode + serialize time, to_dict() vs the compact layout.
+
+Each result is serialized the way FastMCP turns a tool's return value into
+its text response (json.dumps of pydantic_core.to_jsonable_python). Tables
+come from the saved fixture company page, the price series from the stub
+chart payload.
+
+    python -m benchmarks.bench_encoding --days 365 --repeat 200
+"""
+import argparse
+import json
+import os
+import time
+
+import pydantic_core
+
+from benchmarks.stub_server import chart_payload
+from parsing import extract_tables
+from table_format import encode_chart, encode_table
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "company_page.html")
+
+TOOLS = {
+    "get_quarterly_results": "quarterly_results",
+    "get_profit_loss": "profit_loss",
+    "get_balance_sheet": "balance_sheet",
+    "get_cash_flow": "cash_flow",
+    "get_ratios": "ratios",
+    "get_shareholding_pattern_quarterly": "shareholding_pattern_quarterly",
+    "get_shareholding_pattern_yearly": "shareholding_pattern_yearly",
+}
+
+
+def serialize(result) -> str:
+    # What FastMCP does with a non-string tool result
+    return json.dumps(pydantic_core.to_jsonable_python(result))
+
+
+def measure(encode, repeat: int) -> tuple[int, float]:
+    size = len(serialize(encode()).encode())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(encode())
+    return size, (time.perf_counter() - start) / repeat
+
+
+def main(days: int, repeat: int) -> None:
+    with open(FIXTURE, encoding="utf-8") as f:
+        tables = extract_tables(f.read())
+    payload = chart_payload("WIPRO", "Price-DMA50-DMA200-Volume", days)
+    cases = {tool: (lambda df: {
+        "to_dict": lambda: encode_table(df),
+        "compact": lambda: encode_table(df, compact=True),
+        "compact, last 4": lambda: encode_table(df, compact=True, periods=4),
+    })(tables[section]) for tool, section in TOOLS.items()}
+    cases[f"get_price_info ({days}d)"] = {
+        "to_dict": lambda: encode_chart(payload),
+        "compact": lambda: encode_chart(payload, compact=True),
+        "compact, last 4": lambda: encode_chart(payload, compact=True, periods=4),
+    }
+
+    modes = list(next(iter(cases.values())))
+    print(f"{'tool':<38}" + "".join(f"{m + ' B':>18}{'us':>8}" for m in modes))
+    for tool, encoders in cases.items():
+        row = f"{tool:<38}"
+        for mode in modes:
+            size, seconds = measure(encoders[mode], repeat)
+            row += f"{size:>18,}{seconds * 1e6:>8.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.days, args.repeat)
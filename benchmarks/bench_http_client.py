@@ -0,0 +1,94 @@
+"""Benchmark: one AsyncClient per call vs the shared pooled client.
+
+Runs the request mix of a `trade_recommendation` call (search, company page
+and chart API, twice over) against the local stub server and reports how many
+connections (i.e. TCP/TLS handshakes) each approach opened plus p50/p99 latency.
+
+    python -m benchmarks.bench_http_client --calls 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import http_client
+from benchmarks.stub_server import StubScreener, company_ids
+
+TRADE_RECOMMENDATION_MIX = [
+    ("/api/company/search/", {"q": "TCS"}),
+    ("/company/TCS/consolidated/", None),
+    ("/api/company/{cid}/chart/", {"q": "Price-DMA50-DMA200-Volume", "days": "365", "consolidated": "true"}),
+    ("/api/company/search/", {"q": "TCS"}),
+    ("/company/TCS/consolidated/", None),
+    ("/api/company/{cid}/chart/", {"q": "Price", "days": "365", "consolidated": "true"}),
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def per_call_client(base_url: str, path: str, params) -> None:
+    # What server.py did before: a brand-new client (and connection) per call
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        (await client.get(path, params=params)).raise_for_status()
+
+
+async def shared_client(base_url: str, path: str, params) -> None:
+    (await http_client.get_client().get(path, params=params)).raise_for_status()
+
+
+async def run(mode, stub: StubScreener, calls: int, concurrency: int) -> dict:
+    cid = company_ids("TCS")[1]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one_call() -> None:
+        async with semaphore:
+            for path, params in TRADE_RECOMMENDATION_MIX:
+                start = time.perf_counter()
+                await mode(stub.base_url, path.format(cid=cid), params)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    stub.reset_counters()
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": stub.requests,
+        "handshakes": stub.connections,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "req_per_s": stub.requests / elapsed,
+    }
+
+
+async def main(calls: int, concurrency: int, latency: float, handshake_delay: float) -> None:
+    async with StubScreener(latency=latency, handshake_delay=handshake_delay) as stub:
+        http_client.configure_client(base_url=stub.base_url, rate_limit=0)
+        try:
+            before = await run(per_call_client, stub, calls, concurrency)
+            after = await run(shared_client, stub, calls, concurrency)
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+    print(f"{calls} trade_recommendation-style calls, concurrency {concurrency}, "
+          f"server latency {latency * 1000:.0f} ms, handshake cost {handshake_delay * 1000:.0f} ms")
+    print(f"{'mode':<18}{'requests':>10}{'handshakes':>12}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, r in (("client per call", before), ("shared pool", after)):
+        print(f"{name:<18}{r['requests']:>10}{r['handshakes']:>12}{r['p50_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['req_per_s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.005, help="stub server think time per request (s)")
+    parser.add_argument("--handshake-delay", type=float, default=0.03,
+                        help="simulated TCP+TLS handshake cost per new connection (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.latency, args.handshake_delay))
@@ -0,0 +1,70 @@
+"""Microbenchmark: indicators for many symbols, per-symbol pandas vs the batched NumPy engine.
+
+No network or stub server involved: chart payloads are generated in memory
+and both paths compute from the same payloads. The pandas path is the
+original calculate_rsi / calculate_moving_average code run once per symbol;
+the engine computes the full indicator set for every symbol in one pass.
+
+    python -m benchmarks.bench_indicators --symbols 10 100 500 --days 365
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_server import chart_payload
+from indicators import align_series, compute_indicators, latest_values, rsi
+
+
+def legacy_rsi_and_volume(price_data: dict, period: int = 14) -> tuple[float, float]:
+    # The pre-engine per-symbol path: a DataFrame per call and a Python sum for volume
+    datasets = {dataset["metric"]: dataset for dataset in price_data.get("datasets", [])}
+    df = pd.DataFrame(datasets["Price"]["values"], columns=["date", "close"])
+    df["close"] = df["close"].astype(float)
+    delta = df["close"].diff()
+    avg_gain = delta.clip(lower=0).rolling(window=period).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(window=period).mean()
+    latest_rsi = (100 - (100 / (1 + avg_gain / avg_loss))).iloc[-1]
+    avg_volume = sum(v[1] for v in datasets["Volume"]["values"]) / len(datasets["Volume"]["values"])
+    return latest_rsi, avg_volume
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(symbol_counts: list[int], days: int, repeat: int) -> None:
+    print(f"{days} days of history, best of {repeat}")
+    print(f"{'symbols':>8}{'pandas RSI+vol ms':>20}{'engine RSI ms':>16}{'engine all ms':>16}{'align ms':>11}")
+    for count in symbol_counts:
+        payloads = {f"SYM{i}": chart_payload(f"SYM{i}", "Price-Volume", days) for i in range(count)}
+        _, close = align_series(payloads, "Price")
+        _, volume = align_series(payloads, "Volume")
+
+        legacy = timed(lambda: [legacy_rsi_and_volume(p) for p in payloads.values()], repeat)
+        engine_rsi = timed(lambda: (rsi(close, 14, "sma")[:, -1], np.nanmean(volume, axis=1)), repeat)
+        engine_all = timed(lambda: compute_indicators(close, volume), repeat)
+        align = timed(lambda: (align_series(payloads, "Price"), align_series(payloads, "Volume")), repeat)
+        print(f"{count:>8}{legacy * 1000:>20.1f}{engine_rsi * 1000:>16.1f}{engine_all * 1000:>16.1f}{align * 1000:>11.1f}")
+
+    # Sanity check: both paths agree on the RSI they share
+    sample = {f"SYM{i}": chart_payload(f"SYM{i}", "Price-Volume", days) for i in range(5)}
+    dates, close = align_series(sample, "Price")
+    engine = [row["rsi"] for row in latest_values(dates, {"close": close, "rsi": rsi(close, 14, "sma")})]
+    legacy = [round(float(legacy_rsi_and_volume(p)[0]), 4) for p in sample.values()]
+    assert np.allclose(engine, legacy), (engine, legacy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.symbols, args.days, args.repeat)
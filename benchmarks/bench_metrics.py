@@ -0,0 +1,60 @@
+"""Benchmark: what the instrumentation adds to a tool call and an upstream request.
+
+Times a trivial async tool called bare and through the metrics wrapper, and
+a batch of stub requests through a client with and without the instrumented
+transport.
+
+    python -m benchmarks.bench_metrics --calls 100000 --requests 500
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.stub_server import StubScreener
+from metrics import InstrumentedTransport, reset_metrics, timed_tool
+
+
+async def tool(symbol: str) -> dict:
+    return {"symbol": symbol}
+
+
+async def per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn("TCS")
+    return (time.perf_counter() - start) / calls
+
+
+async def per_request(client: httpx.AsyncClient, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        (await client.get("/api/company/search/", params={"q": "TCS"})).raise_for_status()
+    return (time.perf_counter() - start) / requests
+
+
+async def main(calls: int, requests: int) -> None:
+    bare = await per_call(tool, calls)
+    timed = await per_call(timed_tool("tool", tool), calls)
+    print(f"{'tool call':<24}{bare * 1e6:>10.2f} us bare {timed * 1e6:>10.2f} us timed "
+          f"(+{(timed - bare) * 1e6:.2f} us)")
+    async with StubScreener() as stub:
+        async with httpx.AsyncClient(base_url=stub.base_url) as client:
+            await per_request(client, 20)
+            bare = await per_request(client, requests)
+        transport = InstrumentedTransport(httpx.AsyncHTTPTransport())
+        async with httpx.AsyncClient(base_url=stub.base_url, transport=transport) as client:
+            await per_request(client, 20)
+            timed = await per_request(client, requests)
+    print(f"{'upstream request':<24}{bare * 1e6:>10.2f} us bare {timed * 1e6:>10.2f} us timed "
+          f"(+{(timed - bare) * 1e6:.2f} us)")
+    reset_metrics()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.requests))
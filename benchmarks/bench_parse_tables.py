@@ -0,0 +1,71 @@
+"""Benchmark: company page table parsing, pd.read_html vs the targeted lxml extractor.
+
+Times and measures peak Python heap (tracemalloc) for the old whole-page
+pd.read_html + positional indexing, the extractor building all seven
+tables, and the extractor building a single table. Defaults to the saved
+stub page in benchmarks/fixtures/; pass --html to use a page saved from
+www.screener.in instead.
+
+    python -m benchmarks.bench_parse_tables --html saved_page.html --repeat 50
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from parsing import extract_tables
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "company_page.html")
+
+
+def legacy_parse_stock_tables(html: str):
+    # The pre-extractor implementation
+    df_list = [df for df in pd.read_html(io.StringIO(html)) if df.shape[1] > 1]
+    names = ['Quarter', 'Profit & Loss', 'Balance Sheet', 'Cash Flow', 'Ratios',
+             'Shareholding Pattern Quarterly', 'Shareholding Pattern Yearly']
+    tables = []
+    for position, name in zip((0, 1, 6, 7, 8, 9, 10), names):
+        df = df_list[position]
+        df.index = df['Unnamed: 0']
+        df = df.drop(columns=['Unnamed: 0'])
+        df.index.name = name
+        tables.append(df)
+    return tuple(tables)
+
+
+def measure(fn, html: str, repeat: int) -> tuple[float, float]:
+    fn(html)  # warm up imports and parser state
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    per_call = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def main(path: str, repeat: int) -> None:
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    print(f"{os.path.basename(path)}: {len(html) / 1024:.0f} KiB, {repeat} runs")
+    print(f"{'parser':<34}{'ms/page':>10}{'peak KiB':>12}")
+    for label, fn in (
+        ("pd.read_html + positions", legacy_parse_stock_tables),
+        ("lxml extractor, 7 tables", extract_tables),
+        ("lxml extractor, balance sheet", lambda h: extract_tables(h, ["balance_sheet"])),
+    ):
+        per_call, peak = measure(fn, html, repeat)
+        print(f"{label:<34}{per_call * 1000:>10.2f}{peak / 1024:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--html", default=FIXTURE)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.html, args.repeat)
@@ -0,0 +1,70 @@
+"""Benchmark: 50 different companies requested through read_stock_info at once.
+
+Compares the old path (blocking pd.read_html(url) on the event loop) with the
+async fetch + worker-pool parse, reporting aggregate throughput and the worst
+event-loop stall seen by a 10 ms heartbeat task while the batch runs.
+
+    python -m benchmarks.bench_read_stock_info --companies 50 --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+import pandas as pd
+
+import http_client
+import parsing
+from benchmarks.stub_server import stub_in_thread
+
+
+async def legacy_read_stock_info(base_url: str, stock: str):
+    # The pre-change implementation: network fetch and lxml parse both on the loop
+    df_list = [df for df in pd.read_html(f"{base_url}/company/{stock}/") if df.shape[1] > 1]
+    return tuple(df_list[i] for i in (0, 1, 6, 7, 8, 9, 10))
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(label: str, fn, symbols: list[str]) -> None:
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(fn(s) for s in symbols))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    print(f"{label:<28}{elapsed:>9.2f}{len(symbols) / elapsed:>14.1f}{max(lags, default=0) * 1000:>16.1f}")
+
+
+async def main(companies: int, workers: int, pool: str, latency: float) -> None:
+    from server import read_stock_info
+
+    parsing.SCREENER_PARSE_WORKERS = workers
+    parsing.SCREENER_PARSE_POOL = pool
+    with stub_in_thread(latency=latency) as stub:
+        http_client.configure_client(base_url=stub.base_url, rate_limit=0)
+        print(f"{companies} companies at once, stub latency {latency * 1000:.0f} ms, {workers} {pool} workers")
+        print(f"{'path':<28}{'wall s':>9}{'companies/s':>14}{'max stall ms':>16}")
+        try:
+            await run("blocking pd.read_html(url)",
+                      lambda s: legacy_read_stock_info(stub.base_url, s), [f"OLD{i}" for i in range(companies)])
+            await run("async fetch + parse pool", read_stock_info, [f"NEW{i}" for i in range(companies)])
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+            parsing.shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=parsing.SCREENER_PARSE_WORKERS)
+    parser.add_argument("--pool", choices=["thread", "process"], default=parsing.SCREENER_PARSE_POOL)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server think time per request (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.companies, args.workers, args.pool, args.latency))
@@ -0,0 +1,81 @@
+"""Benchmark: screen_companies over a synthetic universe vs one page fetch per company.
+
+The warehouse is filled from stub company pages parsed once (the same field
+layout a real load produces), replicated with noise up to `--companies`
+rows. Each screen is evaluated over every company in one pass; the
+per-company path is what an agent did before: get_sections for each symbol
+against the local stub.
+
+    python -m benchmarks.bench_screen --companies 5000 --per-company 50
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cache
+import http_client
+import symbol_index
+from benchmarks.stub_server import StubScreener, render_company_page
+from company_page import get_sections
+from parsing import extract_tables
+from warehouse import Warehouse, company_fields
+
+SCREENS = {
+    "ROCE > 20, falling debt": ("ratios_roce_pct > 20 and bs_borrowings < bs_borrowings_1", None),
+    "profit growth, ranked": ("pl_net_profit > pl_net_profit_1 and q_sales > q_sales_4",
+                              "pl_net_profit / pl_net_profit_1"),
+    "promoters > 50%": ("shq_promoters > 50", "shq_promoters"),
+}
+
+
+def synthetic_universe(companies: int, directory: str) -> Warehouse:
+    rng = np.random.default_rng(0)
+    seeds = [company_fields(extract_tables(render_company_page(f"SEED{i}"))) for i in range(20)]
+    seed_frame = pd.DataFrame(seeds)
+    rows = seed_frame.to_numpy()[rng.integers(0, len(seeds), companies)] * rng.uniform(0.5, 1.5, (companies, 1))
+    warehouse = Warehouse(directory)
+    warehouse.frame = pd.DataFrame(rows, index=pd.Index([f"CO{i}" for i in range(companies)], name="symbol"),
+                                   columns=seed_frame.columns)
+    warehouse.save()
+    return Warehouse(directory)  # reload: columns come back memory-mapped
+
+
+async def per_company(symbols: list[str]) -> float:
+    async with StubScreener() as stub:
+        http_client.configure_client(base_url=stub.base_url)
+        try:
+            start = time.perf_counter()
+            for symbol in symbols:
+                await get_sections(symbol)
+            return time.perf_counter() - start
+        finally:
+            await http_client.close_client()
+
+
+def main(companies: int, sample: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache.configure_cache(backend="memory")
+        symbol_index.configure_symbol_index(f"{directory}/symbols.sqlite3")
+        warehouse = synthetic_universe(companies, directory)
+        print(f"{len(warehouse):,} companies x {len(warehouse.fields)} fields")
+        for name, (expression, rank_by) in SCREENS.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                matches = warehouse.screen(expression, rank_by)
+            print(f"{name:<28}{len(matches):>8,} matches{(time.perf_counter() - start) / repeat * 1e3:>10.1f} ms")
+        seconds = asyncio.run(per_company([f"CO{i}" for i in range(sample)]))
+        print(f"{'get_sections per company':<28}{sample:>8,} pages  {seconds / sample * 1e3:>10.1f} ms each, "
+              f"~{seconds / sample * companies:,.0f} s for the universe")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--per-company", type=int, default=50, help="companies to fetch one by one for comparison")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.companies, args.per_company, args.repeat)
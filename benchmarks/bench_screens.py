@@ -0,0 +1,75 @@
+"""Benchmark: finding a screen by walking the listing vs the screens index.
+
+The old path fetched one `screens/?page=N` page at a time and parsed it with
+BeautifulSoup's html.parser. The index path crawls every page concurrently
+once; after that, listing a page and searching are in-memory lookups. The
+stub serves `--pages` pages of 20 screens with `--latency` per request.
+
+    python -m benchmarks.bench_screens --pages 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from bs4 import BeautifulSoup
+
+import cache
+import http_client
+from benchmarks.stub_server import StubScreener, render_screens_page
+from screens import crawl_screens
+
+
+def legacy_parse(html: str) -> list[dict[str, str]]:
+    # The pre-index get_screens_page parser
+    soup = BeautifulSoup(html, "html.parser")
+    body = soup.find("div", class_="flex-row flex-space-between").find_next("ul").find_all("li")
+    return [{"text": li.get_text(strip=True), "href": li.a["href"]} for li in body]
+
+
+async def main(pages: int, latency: float, repeat: int) -> None:
+    cache.configure_cache(backend="memory")
+    listing = lambda method, path, query: (200, {"content-type": "text/html"}, render_screens_page(
+        int(query.get("page", ["1"])[0]), pages).encode()) if path.startswith("/screens") else None
+    async with StubScreener(latency=latency) as stub:
+        stub.responder = listing
+        # No client-side rate limit, so the comparison is about round trips rather than the limiter
+        http_client.configure_client(base_url=stub.base_url, rate_limit=0)
+        try:
+            client = http_client.get_client()
+            wanted = f"Stub screen {pages * 20 - 3}"
+            start = time.perf_counter()
+            for page in range(1, pages + 1):
+                response = await client.get("/screens/", params={"page": page})
+                if any(e["text"].startswith(wanted) for e in legacy_parse(response.text)):
+                    break
+            walk = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index = await crawl_screens()
+            crawl = time.perf_counter() - start
+        finally:
+            await http_client.close_client()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found = index.search(wanted)
+    search = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.page(pages // 2)
+    lookup = (time.perf_counter() - start) / repeat
+
+    print(f"{len(index)} screens on {pages} pages, {latency * 1e3:.0f} ms per request")
+    print(f"{'walk pages until found (html.parser)':<40}{walk * 1e3:>10.1f} ms")
+    print(f"{'crawl all pages concurrently (lxml)':<40}{crawl * 1e3:>10.1f} ms")
+    print(f"{'search the index':<40}{search * 1e6:>10.1f} us   -> {found[0]['name']}")
+    print(f"{'list one page from the index':<40}{lookup * 1e6:>10.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.latency, args.repeat))
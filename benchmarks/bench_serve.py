@@ -0,0 +1,149 @@
+"""Load test: MCP tool calls per second over HTTP (SSE) against serve.py, by number of workers.
+
+For each --workers count, serve.py is started on empty caches with Screener
+answered by the stub server in this process. One session first calls every
+read-only scenario of benchmarks.scenarios once (untimed, through a single
+worker); then --clients sessions call them in a loop for --seconds.
+--processes spreads the sessions over several load-generator processes, so
+on many-core hosts the client side is not what saturates.
+
+Reports calls/s (and the speed-up over the first worker count), p50/p99
+latency, and the requests that reached Screener during the timed phase:
+the workers share the persistent cache tier, so pages the warm-up fetched
+through one worker are hits for all of them and this stays near zero.
+
+    python -m benchmarks.bench_serve --workers 1 2 4 --clients 32 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+import numpy as np
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.stub_server import StubScreener
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Scenarios that write (files, the watchlist, the warehouse) or need a loaded warehouse are left out
+WRITES = {"update_watchlist", "download_report", "download_reports", "load_warehouse", "screen_companies",
+          "get_warehouse_fields"}
+LOAD = [(tool, arguments) for tool, arguments in SCENARIOS if tool not in WRITES]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def session_calls(url: str, deadline: float | None, offset: int = 0) -> tuple[list[float], dict[str, str]]:
+    """Call the LOAD scenarios in turn, once each (deadline None) or until `deadline`."""
+    latencies, errors = [], {}
+    async with sse_client(url, sse_read_timeout=600) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            i = 0
+            while (i < len(LOAD)) if deadline is None else (time.perf_counter() < deadline):
+                tool, arguments = LOAD[(offset + i) % len(LOAD)]
+                start = time.perf_counter()
+                result = await session.call_tool(tool, arguments)
+                latencies.append(time.perf_counter() - start)
+                if result.isError:
+                    errors[tool] = result.content[0].text
+                i += 1
+    return latencies, errors
+
+
+def generate_load(url: str, clients: int, first: int, seconds: float) -> tuple[list[float], dict[str, str]]:
+    """Run `clients` sessions for `seconds` in this process (a load-generator process of its own)."""
+    async def run():
+        deadline = time.perf_counter() + seconds
+        return await asyncio.gather(*(session_calls(url, deadline, first + i) for i in range(clients)))
+
+    latencies, errors = [], {}
+    for session_latencies, session_errors in asyncio.run(run()):
+        latencies += session_latencies
+        errors.update(session_errors)
+    return latencies, errors
+
+
+async def run_level(stub: StubScreener, workers: int, clients: int, processes: int, seconds: float) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as state:
+        env = {**os.environ, "SCREENER_API_BASE": stub.base_url, "SCREENER_RATE_LIMIT": "0",
+               "SCREENER_CACHE_DIR": os.path.join(state, "cache"),
+               "SCREENER_REPORTS_DIR": os.path.join(state, "reports"),
+               "SCREENER_WATCHLIST_FILE": os.path.join(state, "watchlist.json"),
+               "SCREENER_REPLAY_MODE": "", "SCREENER_PRELOAD_DELAY": "0"}
+        server = await asyncio.create_subprocess_exec(sys.executable, "serve.py", "--workers", str(workers),
+                                                      "--port", str(port), cwd=ROOT, env=env,
+                                                      stdout=asyncio.subprocess.DEVNULL,
+                                                      stderr=asyncio.subprocess.DEVNULL)
+        try:
+            async with httpx.AsyncClient() as client:
+                while True:
+                    try:
+                        if (await client.get(f"{url}/health")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if server.returncode is not None:
+                        raise RuntimeError(f"serve.py exited with {server.returncode}")
+                    await asyncio.sleep(0.1)
+            stub.reset_counters()
+            _, errors = await session_calls(f"{url}/sse", None)
+            warm_up = stub.requests
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(processes) as pool:
+                shares = [clients // processes + (i < clients % processes) for i in range(processes)]
+                start = time.perf_counter()
+                outcomes = await asyncio.gather(*(
+                    loop.run_in_executor(pool, generate_load, f"{url}/sse", share, sum(shares[:i]), seconds)
+                    for i, share in enumerate(shares) if share))
+                elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            await server.wait()
+    latencies = [latency for outcome in outcomes for latency in outcome[0]]
+    for _, outcome_errors in outcomes:
+        errors.update(outcome_errors)
+    return {"workers": workers, "throughput": len(latencies) / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)) * 1e3, "p99_ms": float(np.percentile(latencies, 99)) * 1e3,
+            "warm_up_requests": warm_up, "timed_requests": stub.requests - warm_up, "errors": errors}
+
+
+async def main(workers: list[int], clients: int, processes: int, seconds: float) -> None:
+    print(f"{len(LOAD)} scenarios, {clients} sessions from {processes} process(es), {seconds:g} s per level, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'calls/s':>10}{'speed-up':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'upstream warm-up':>18}{'upstream timed':>16}")
+    first = None
+    async with StubScreener() as stub:
+        for count in workers:
+            result = await run_level(stub, count, clients, processes, seconds)
+            first = first or result["throughput"]
+            print(f"{count:>8}{result['throughput']:>10.1f}{result['throughput'] / first:>10.2f}"
+                  f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+                  f"{result['warm_up_requests']:>18}{result['timed_requests']:>16}")
+            for tool, error in result["errors"].items():
+                print(f"{'':>8}error in {tool}: {error[:100]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32, help="concurrent MCP sessions")
+    parser.add_argument("--processes", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="load-generator processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, args.clients, args.processes, args.seconds))
@@ -0,0 +1,144 @@
+"""Benchmark: how fast a freshly started server answers, as an MCP client sees it.
+
+Each run starts `python server.py` as a stdio subprocess (as MCP clients do),
+on empty caches and with Screener answered from the replay fixtures, and
+times, over newline-delimited JSON-RPC:
+
+- initialize: from spawning the process to the `initialize` response
+- tools/list: the first tool listing
+- first call: one call of --tool, sent --think seconds after the listing
+
+plus, in a separate process, the time `import server` takes. Each mode sets
+the startup environment: "eager" imports pandas, NumPy and lxml up front,
+"lazy" on first use, "preload" on first use or in the background one second
+after startup, whichever comes first. Medians of --runs runs are reported.
+--json saves them; --baseline compares against saved results and exits 1
+if any time grew by more than --tolerance.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --tool get_ratios --args '{"company_name": "WIPRO"}' --think 2
+    python -m benchmarks.bench_startup --json startup.json
+    python -m benchmarks.bench_startup --baseline startup.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from replay import SCREENER_REPLAY_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    "eager": {"SCREENER_LAZY_IMPORTS": "0", "SCREENER_PRELOAD_DELAY": "-1"},
+    "lazy": {"SCREENER_LAZY_IMPORTS": "1", "SCREENER_PRELOAD_DELAY": "-1"},
+    "preload": {"SCREENER_LAZY_IMPORTS": "1", "SCREENER_PRELOAD_DELAY": "1"},
+}
+STEPS = ("import_ms", "initialize_ms", "list_ms", "call_ms")
+IMPORT_SERVER = "import time; start = time.perf_counter(); import server; print(time.perf_counter() - start)"
+
+
+def server_env(mode: str, directory: str, state: str) -> dict[str, str]:
+    return {**os.environ, **MODES[mode],
+            "SCREENER_CACHE_DIR": os.path.join(state, "cache"),
+            "SCREENER_REPORTS_DIR": os.path.join(state, "reports"),
+            "SCREENER_WATCHLIST_FILE": os.path.join(state, "watchlist.json"),
+            "SCREENER_REPLAY_MODE": "replay",
+            "SCREENER_REPLAY_DIR": os.path.abspath(directory)}
+
+
+async def rpc(process: asyncio.subprocess.Process, id: int, method: str, params: dict) -> dict:
+    process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": id, "method": method, "params": params}).encode() + b"\n")
+    await process.stdin.drain()
+    while True:
+        message = json.loads(await process.stdout.readline())
+        if message.get("id") == id:
+            if "error" in message:
+                raise RuntimeError(f"{method}: {message['error']}")
+            return message["result"]
+
+
+async def run_once(mode: str, directory: str, tool: str, arguments: dict, think: float) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as state:
+        env = server_env(mode, directory, state)
+        importer = await asyncio.create_subprocess_exec(sys.executable, "-c", IMPORT_SERVER, cwd=ROOT, env=env,
+                                                        stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.DEVNULL)
+        imported = float((await importer.communicate())[0])
+
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(sys.executable, "server.py", cwd=ROOT, env=env,
+                                                       stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        try:
+            await rpc(process, 1, "initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                                 "clientInfo": {"name": "bench_startup", "version": "1"}})
+            initialized = time.perf_counter()
+            process.stdin.write(b'{"jsonrpc": "2.0", "method": "notifications/initialized"}\n')
+            await rpc(process, 2, "tools/list", {})
+            listed = time.perf_counter()
+            await asyncio.sleep(think)
+            called = time.perf_counter()
+            result = await rpc(process, 3, "tools/call", {"name": tool, "arguments": arguments})
+            if result.get("isError"):
+                raise RuntimeError(f"{tool}: {result['content'][0]['text'][:200]}")
+            done = time.perf_counter()
+        finally:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+    return {"import_ms": imported * 1e3, "initialize_ms": (initialized - start) * 1e3,
+            "list_ms": (listed - initialized) * 1e3, "call_ms": (done - called) * 1e3}
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Regressions of `results` against `baseline` (matched on mode and step), as readable lines."""
+    regressions = []
+    for mode, steps in results.items():
+        before = baseline.get(mode, {})
+        for step, ms in steps.items():
+            if step in before and ms > before[step] * (1 + tolerance):
+                regressions.append(f"{mode}: {step} {before[step]:.0f} -> {ms:.0f}")
+    return regressions
+
+
+async def main(modes: list[str], runs: int, directory: str, tool: str, arguments: dict,
+               think: float) -> dict[str, dict]:
+    print(f"{runs} runs per mode, first call: {tool} {json.dumps(arguments)} after {think:g} s")
+    print(f"{'mode':<10}" + "".join(f"{step.removesuffix('_ms') + ' ms':>16}" for step in STEPS))
+    results = {}
+    for mode in modes:
+        samples = [await run_once(mode, directory, tool, arguments, think) for _ in range(runs)]
+        results[mode] = {step: statistics.median(s[step] for s in samples) for step in STEPS}
+        print(f"{mode:<10}" + "".join(f"{results[mode][step]:>16.0f}" for step in STEPS))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", default=SCREENER_REPLAY_DIR, help="replay fixture directory")
+    parser.add_argument("--tool", default="get_company_details")
+    parser.add_argument("--args", default='{"company_name": "WIPRO"}', help="the tool's arguments, as JSON")
+    parser.add_argument("--think", type=float, default=2.0, help="seconds between the listing and the call")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="results saved with --json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    args = parser.parse_args()
+    results = asyncio.run(main(args.modes, args.runs, args.dir, args.tool, json.loads(args.args), args.think))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,65 @@
+"""Benchmark: fan-out against a throttling Screener stand-in, with and without upstream governance.
+
+The stub answers 429 (with a Retry-After) to anything beyond --server-rate
+requests/second. Each configuration fetches --requests search results at
+--concurrency and reports how many succeeded, how many 429s were provoked,
+and the goodput (successful requests per second).
+
+    python -m benchmarks.bench_upstream --requests 300 --server-rate 50 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+
+import http_client
+from benchmarks.stub_server import StubScreener
+from server import make_screener_request
+from upstream import reset_upstream_stats, upstream_stats
+
+CONFIGS = [
+    ("no retries", {"retries": 0, "rate_limit": 0}),
+    ("retries, no rate limit", {"rate_limit": 0, "retries": 10}),
+    ("adaptive rate limit", {"retries": 10}),
+]
+
+
+async def run(stub: StubScreener, settings: dict, requests: int, concurrency: int) -> tuple[int, float]:
+    http_client.configure_client(base_url=stub.base_url, **settings)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> bool:
+        async with semaphore:
+            result = await make_screener_request("api/company/search/", params={"q": f"S{i}"})
+            return "response" in result
+
+    start = time.perf_counter()
+    try:
+        ok = sum(await asyncio.gather(*(one(i) for i in range(requests))))
+    finally:
+        await http_client.close_client()
+        http_client.reset_client_config()
+    return ok, time.perf_counter() - start
+
+
+async def main(requests: int, server_rate: float, concurrency: int, client_rate: float) -> None:
+    print(f"{'':<26}{'ok':>6}{'429s':>8}{'seconds':>10}{'goodput/s':>12}")
+    for name, settings in CONFIGS:
+        reset_upstream_stats()
+        async with StubScreener() as stub:
+            stub.throttle_to(server_rate, burst=5, retry_after=0.2)
+            ok, elapsed = await run(stub, {"rate_limit": client_rate, "rate_burst": 5, **settings},
+                                    requests, concurrency)
+            print(f"{name:<26}{ok:>6}{stub.hits['throttled']:>8}{elapsed:>10.2f}{ok / elapsed:>12.1f}")
+    rate = upstream_stats().get("search", {}).get("rate")
+    if rate is not None:
+        print(f"adaptive rate settled at {rate:.1f} requests/s (server allows {server_rate:g})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--server-rate", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--client-rate", type=float, default=200, help="configured (maximum) client rate")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.server_rate, args.concurrency, args.client_rate))
@@ -0,0 +1,77 @@
+"""Record the replay fixtures (benchmarks/fixtures/replay) by running every scenario once.
+
+Each scenario runs on cold caches so every request it can make is stored.
+By default the local stub server is recorded; --live records www.screener.in
+instead and needs the session cookies from .env for the export downloads.
+
+    python -m benchmarks.record_fixtures --clean
+    python -m benchmarks.record_fixtures --live
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import tempfile
+from urllib.parse import unquote
+
+import httpx
+
+import http_client
+from benchmarks.scenarios import COMPANY_NAME, SCENARIOS, reset_state, tool_error
+from benchmarks.stub_server import StubScreener, company_ids
+from replay import SCREENER_REPLAY_DIR, ReplayTransport
+from server import mcp
+
+
+def stub_responder(method: str, path: str, query: dict[str, list[str]]):
+    # The stub serves a page for any slug; make COMPANY_NAME behave like a name that needs a search
+    if unquote(path).upper() == f"/company/{COMPANY_NAME}/".upper():
+        return 404, {"content-type": "text/html"}, b"<html>Not found</html>"
+    if path == "/api/company/search/" and query.get("q", [""])[0].upper() == COMPANY_NAME.upper():
+        body = [{"id": int(company_ids("TCS")[1]), "name": "Tata Consultancy Services Ltd",
+                 "url": "/company/TCS/consolidated/"}]
+        return 200, {"content-type": "application/json"}, json.dumps(body).encode()
+    return None
+
+
+async def record(base_url: str | None, directory: str) -> ReplayTransport:
+    transport = ReplayTransport(directory, "record", httpx.AsyncHTTPTransport())
+    overrides = {"transport": transport} if base_url is None else {"transport": transport, "base_url": base_url,
+                                                                    "rate_limit": 0}
+    for tool, arguments in SCENARIOS:
+        with tempfile.TemporaryDirectory() as state:
+            reset_state(state)
+            http_client.configure_client(**overrides)
+            try:
+                if tool == "screen_companies":
+                    await mcp.call_tool("load_warehouse", {"symbols": ["WIPRO", "TCS", "INFY"]})
+                result = await mcp.call_tool(tool, arguments)
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+        error = tool_error(json.loads(result[0].text) if result[0].text[:1] in "{[" else result[0].text)
+        print(f"{tool:<36}{'error: ' + error[:80] if error else 'ok'}")
+    return transport
+
+
+async def main(live: bool, directory: str, clean: bool) -> None:
+    if clean:
+        for path in glob.glob(os.path.join(directory, "*.json.gz")):
+            os.remove(path)
+    if live:
+        transport = await record(None, directory)
+    else:
+        async with StubScreener() as stub:
+            stub.responder = stub_responder
+            transport = await record(stub.base_url, directory)
+    print(f"{len(transport.recorded)} responses recorded in {directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="record www.screener.in instead of the stub")
+    parser.add_argument("--dir", default=SCREENER_REPLAY_DIR)
+    parser.add_argument("--clean", action="store_true", help="delete existing fixtures first")
+    args = parser.parse_args()
+    asyncio.run(main(args.live, args.dir, args.clean))
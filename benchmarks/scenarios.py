@@ -0,0 +1,81 @@
+"""One call of every MCP tool, shared by the fixture recorder, the offline tests and bench_e2e.
+
+Each scenario is (tool name, arguments). The recorder runs each one on cold
+caches, so the stored fixtures hold every request any of them can make,
+in whatever order they later run.
+"""
+import json
+
+SYMBOLS = ["WIPRO", "TCS"]
+WATCHLIST = ["WIPRO", "TCS", "INFY"]
+# Not a page slug: symbol resolution falls back to the search API
+COMPANY_NAME = "Tata Consultancy"
+SCREEN = "/screens/1001/stub-screen-1/"
+
+SCENARIOS = [
+    ("get_company_details", {"company_name": "WIPRO"}),
+    ("get_quarterly_results", {"company_name": "WIPRO"}),
+    ("get_profit_loss", {"company_name": "WIPRO"}),
+    ("get_balance_sheet", {"company_name": "WIPRO"}),
+    ("get_cash_flow", {"company_name": "WIPRO"}),
+    ("get_ratios", {"company_name": "WIPRO", "compact": True}),
+    ("get_shareholding_pattern_quarterly", {"company_name": "WIPRO"}),
+    ("get_shareholding_pattern_yearly", {"company_name": "WIPRO"}),
+    ("get_fundamentals", {"company_name": "TCS", "compact": True, "periods": 4}),
+    ("get_price_info", {"symbol": "TCS"}),
+    ("get_price_info", {"symbol": "WIPRO", "days": 90, "compact": True}),
+    ("calculate_moving_average", {"symbol": "TCS"}),
+    ("calculate_rsi", {"symbol": "TCS"}),
+    ("trade_recommendation", {"symbol": "TCS"}),
+    ("calculate_indicators", {"symbols": WATCHLIST}),
+    ("backtest_strategy", {"symbols": WATCHLIST, "days": 365,
+                           "params": {"rsi_period": [7, 14], "volume_multiplier": [0, 1.5]}}),
+    ("get_price_info_batch", {"symbols": WATCHLIST}),
+    ("calculate_moving_average_batch", {"symbols": WATCHLIST}),
+    ("calculate_rsi_batch", {"symbols": WATCHLIST}),
+    ("trade_recommendation_batch", {"symbols": WATCHLIST}),
+    ("get_screens_page", {"page": 2}),
+    ("search_screens", {"query": "growing sales 7"}),
+    ("run_screen", {"href": SCREEN, "limit": 20}),
+    ("load_warehouse", {"symbols": WATCHLIST}),
+    ("get_warehouse_fields", {"section": "ratios"}),
+    ("screen_companies", {"expression": "ratios_roce_pct > 10", "rank_by": "ratios_roce_pct"}),
+    ("get_watchlist", {}),
+    ("update_watchlist", {"add": WATCHLIST, "interval": 3600}),
+    ("download_report", {"symbol": "WIPRO"}),
+    ("download_reports", {"symbols": SYMBOLS}),
+    ("download_report", {"symbol": COMPANY_NAME}),
+]
+
+
+def reset_state(directory: str) -> None:
+    """Fresh, empty caches and local stores under `directory` (as the tests' conftest sets up)."""
+    import os
+
+    import cache
+    import price_store
+    import report_store
+    import scheduler
+    import screens
+    import symbol_index
+    import warehouse
+
+    cache.configure_cache(backend="memory")
+    symbol_index.configure_symbol_index(os.path.join(directory, "symbols.sqlite3"))
+    price_store.configure_price_store(os.path.join(directory, "prices"))
+    warehouse.configure_warehouse(os.path.join(directory, "warehouse"))
+    report_store.SCREENER_REPORTS_DIR = os.path.join(directory, "reports")
+    screens.reset_screens_index()
+    scheduler.configure_scheduler(os.path.join(directory, "watchlist.json"))
+
+
+def tool_error(result) -> str | None:
+    """Why a tool result counts as failed, if it does (error dicts, batch errors, error strings)."""
+    if isinstance(result, dict):
+        if "error" in result:
+            return str(result["error"])
+        if result.get("errors"):
+            return json.dumps(result["errors"])
+    if isinstance(result, str) and result.startswith("Error"):
+        return result
+    return None
@@ -0,0 +1,114 @@
+"""Tiny in-process Redis-protocol (RESP2) server for tests and local runs.
+
+Implements just the commands the cache tier uses: PING, SELECT, GET,
+SET (with EX/PX), DEL, EXISTS, DBSIZE and FLUSHDB.
+
+    python -m benchmarks.stub_redis --port 6390
+"""
+import argparse
+import asyncio
+import time
+
+
+class MiniRedis:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.commands = 0
+        self._data: dict[bytes, tuple[bytes, float | None]] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://{self.host}:{port}/0"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self.url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "MiniRedis":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _get(self, key: bytes) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def execute(self, args: list[bytes]) -> bytes:
+        self.commands += 1
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            expires_at = None
+            options = [a.upper() for a in args[3:]]
+            if b"PX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"EX") + 1])
+            self._data[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if command in (b"DEL", b"EXISTS"):
+            found = [k for k in args[1:] if self._get(k) is not None]
+            if command == b"DEL":
+                for k in found:
+                    del self._data[k]
+            return b":%d\r\n" % len(found)
+        if command == b"DBSIZE":
+            return b":%d\r\n" % len(self._data)
+        if command == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                count = int(line[1:])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a minimal Redis-protocol server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        server = MiniRedis(args.host, args.port)
+        print(f"listening on {await server.start()}")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
@@ -0,0 +1,423 @@
+"""Local stand-in for www.screener.in used by the benchmarks and offline tests.
+
+It speaks just enough HTTP/1.1 (keep-alive, Content-Length bodies) to serve
+the endpoints server.py talks to, and counts accepted TCP connections so the
+benchmarks can report how many handshakes a client pays for. Throttling
+(429 with Retry-After) and server errors can be injected with throttle_to
+and fail_next.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+from contextlib import contextmanager
+import asyncio
+import json
+import random
+import threading
+import zlib
+
+from rate_limit import TokenBucket
+
+QUARTERS = ["Dec 2022", "Mar 2023", "Jun 2023", "Sep 2023", "Dec 2023", "Mar 2024",
+            "Jun 2024", "Sep 2024", "Dec 2024", "Mar 2025", "Jun 2025", "Sep 2025", "Dec 2025"]
+YEARS = ["Mar 2014", "Mar 2015", "Mar 2016", "Mar 2017", "Mar 2018", "Mar 2019", "Mar 2020",
+         "Mar 2021", "Mar 2022", "Mar 2023", "Mar 2024", "Mar 2025"]
+
+QUARTERS_ROWS = ["Sales", "Expenses", "Operating Profit", "OPM %", "Other Income", "Interest",
+                 "Depreciation", "Profit before tax", "Tax %", "Net Profit", "EPS in Rs"]
+PROFIT_LOSS_ROWS = QUARTERS_ROWS + ["Dividend Payout %"]
+BALANCE_SHEET_ROWS = ["Equity Capital", "Reserves", "Borrowings", "Other Liabilities", "Total Liabilities",
+                      "Fixed Assets", "CWIP", "Investments", "Other Assets", "Total Assets"]
+CASH_FLOW_ROWS = ["Cash from Operating Activity", "Cash from Investing Activity",
+                  "Cash from Financing Activity", "Net Cash Flow"]
+RATIOS_ROWS = ["Debtor Days", "Inventory Days", "Days Payable", "Cash Conversion Cycle",
+               "Working Capital Days", "ROCE %"]
+SHAREHOLDING_ROWS = ["Promoters", "FIIs", "DIIs", "Government", "Public", "No. of Shareholders"]
+EXPANDABLE_ROWS = {"Sales", "Expenses", "Net Profit", "Borrowings", "Other Assets",
+                   "Cash from Operating Activity", "Promoters", "FIIs"}
+
+
+def company_ids(symbol: str) -> tuple[str, str]:
+    """Deterministic (warehouse_id, company_id) for a stub symbol."""
+    company_id = 1000 + zlib.crc32(symbol.upper().encode()) % 9000
+    return str(company_id * 7 + 11), str(company_id)
+
+
+def _cell(row: str, value: float) -> str:
+    if row.endswith("%"):
+        return f"{value:.0f}%"
+    if row in ("Promoters", "FIIs", "DIIs", "Government", "Public"):
+        return f"{value:.2f}%"
+    if row == "No. of Shareholders":
+        return f"{int(value * 1000):,}"
+    return f"{value:,.2f}" if abs(value) < 100 else f"{value:,.0f}"
+
+
+def _table(rows: list[str], periods: list[str], rng: random.Random) -> str:
+    head = "".join(f'<th class="">{p}</th>' for p in periods)
+    body = []
+    for i, row in enumerate(rows):
+        base = rng.uniform(1, 60) if row.endswith("%") or row in SHAREHOLDING_ROWS[:5] else rng.uniform(5, 5000)
+        label = (f'<button class="button-plain" onclick="Company.showSchedule(\'{row}\', \'x\', this)">'
+                 f'{row}&nbsp;<span class="blue-icon">+</span></button>') if row in EXPANDABLE_ROWS else row
+        cells = "".join(f'<td class="">{_cell(row, base * (1 + 0.03 * j) * rng.uniform(0.9, 1.1))}</td>'
+                        for j in range(len(periods)))
+        stripe = ' class="stripe"' if i % 2 else ""
+        body.append(f'<tr{stripe}><td class="text">{label}</td>{cells}</tr>')
+    return (f'<table class="data-table responsive-text-nowrap"><thead><tr><th class="text"></th>{head}</tr></thead>'
+            f'<tbody>{"".join(body)}</tbody></table>')
+
+
+def _ranges_table(title: str, rng: random.Random) -> str:
+    rows = "".join(f"<tr><td>{span}:</td><td>{rng.randint(-5, 30)}%</td></tr>"
+                   for span in ("10 Years", "5 Years", "3 Years", "TTM"))
+    return f'<table class="ranges-table"><tr><th colspan="2">{title}</th></tr>{rows}</table>'
+
+
+def render_company_page(symbol: str) -> str:
+    """Render an HTML page shaped like https://www.screener.in/company/{symbol}/."""
+    rng = random.Random(symbol.upper())
+    warehouse_id, company_id = company_ids(symbol)
+    ranges = "".join(_ranges_table(t, rng) for t in ("Compounded Sales Growth", "Compounded Profit Growth",
+                                                     "Stock Price CAGR", "Return on Equity"))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><title>{symbol} Ltd share price | About {symbol} | Key Insights - Screener</title></head>
+<body>
+<main class="flex-grow container">
+<div class="card card-large" id="top">
+  <div class="flex flex-space-between flex-gap-8"><h1 class="h2 shrink-text">{symbol} Ltd</h1>
+    <form method="post" class="flex">
+      <input type="hidden" name="csrfmiddlewaretoken" value="stub">
+      <button formaction="/api/company/{company_id}/add/" class="button-primary">Follow</button>
+    </form>
+  </div>
+  <div class="company-profile">
+    <div class="sub show-more-box about" style="flex-basis: 100px">
+      <p>{symbol} Ltd is a diversified company with operations across several business segments.</p>
+      <p>It was incorporated in {1940 + rng.randint(0, 60)} and is headquartered in India.</p>
+    </div>
+  </div>
+  <ul id="top-ratios"><li><span class="name">Market Cap</span><span class="number">{rng.randint(1000, 900000):,}</span></li></ul>
+</div>
+<section id="peers" class="card card-large"><table class="data-table"><tr><td>Loading peers table ...</td></tr></table></section>
+<section id="quarters" class="card card-large"><h2>Quarterly Results</h2>
+  <div data-result-table>{_table(QUARTERS_ROWS, QUARTERS, rng)}</div></section>
+<section id="profit-loss" class="card card-large"><h2>Profit &amp; Loss</h2>
+  <div data-result-table>{_table(PROFIT_LOSS_ROWS, YEARS + ["TTM"], rng)}</div>
+  <div style="display: grid;">{ranges}</div></section>
+<section id="balance-sheet" class="card card-large"><h2>Balance Sheet</h2>
+  <div data-result-table>{_table(BALANCE_SHEET_ROWS, YEARS + ["Sep 2025"], rng)}</div></section>
+<section id="cash-flow" class="card card-large"><h2>Cash Flows</h2>
+  <div data-result-table>{_table(CASH_FLOW_ROWS, YEARS, rng)}</div></section>
+<section id="ratios" class="card card-large"><h2>Ratios</h2>
+  <div data-result-table>{_table(RATIOS_ROWS, YEARS, rng)}</div></section>
+<section id="shareholding" class="card card-large"><h2>Shareholding Pattern</h2>
+  <div id="quarterly-shp">{_table(SHAREHOLDING_ROWS, QUARTERS, rng)}</div>
+  <div id="yearly-shp" class="hidden">{_table(SHAREHOLDING_ROWS, YEARS[-8:], rng)}</div></section>
+<section id="documents" class="card card-large">
+  <form method="post"><button formaction="/user/company/export/{warehouse_id}/" class="button-small">Export to Excel</button></form>
+</section>
+</main>
+</body></html>"""
+
+
+REPORT_PROFIT_LOSS_ROWS = ["Sales", "Raw Material Cost", "Employee Cost", "Other Expenses", "Other Income",
+                           "Depreciation", "Interest", "Profit before tax", "Tax", "Net profit", "Dividend Amount"]
+REPORT_QUARTERS_ROWS = ["Sales", "Expenses", "Other Income", "Depreciation", "Interest", "Profit before tax",
+                        "Tax", "Net profit", "Operating Profit"]
+REPORT_BALANCE_SHEET_ROWS = ["Equity Share Capital", "Reserves", "Borrowings", "Other Liabilities", "Total",
+                             "Net Block", "Capital Work in Progress", "Investments", "Other Assets", "Total"]
+REPORT_CASH_FLOW_ROWS = CASH_FLOW_ROWS
+
+
+def _month_end(label: str) -> date:
+    month, year = label.split()
+    month_number = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"].index(month) + 1
+    return (date(int(year) + month_number // 12, month_number % 12 + 1, 1) - timedelta(days=1))
+
+
+def render_report_workbook(symbol: str) -> bytes:
+    """An .xlsx shaped like Screener's "Export to Excel" (its Data Sheet), or stub bytes without openpyxl."""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        return b"PK\x03\x04stub-workbook-" + symbol.encode()
+    import io
+    rng = random.Random(f"report:{symbol.upper()}")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Data Sheet"
+    sheet.append(["COMPANY NAME", f"{symbol.upper()} LTD"])
+    sheet.append([])
+    sheet.append(["META"])
+    sheet.append(["Number of shares", rng.randint(10, 5000) * 1_000_000])
+    sheet.append([])
+    # Deeper history than the company page: 10 more years of annual data
+    years = [f"Mar {y}" for y in range(2004, 2014)] + YEARS
+    for heading, rows, periods in (("PROFIT & LOSS", REPORT_PROFIT_LOSS_ROWS, years),
+                                   ("Quarters", REPORT_QUARTERS_ROWS, QUARTERS[-10:]),
+                                   ("BALANCE SHEET", REPORT_BALANCE_SHEET_ROWS, years),
+                                   ("CASH FLOW:", REPORT_CASH_FLOW_ROWS, years)):
+        sheet.append([heading])
+        sheet.append(["Report Date", *(_month_end(p) for p in periods)])
+        for row in rows:
+            base = rng.uniform(5, 5000)
+            sheet.append([row, *(round(base * (1 + 0.03 * j) * rng.uniform(0.9, 1.1), 2) for j in range(len(periods)))])
+        sheet.append([])
+    sheet.append(["PRICE:", *(round(rng.uniform(100, 3000), 2) for _ in years)])
+    workbook.create_sheet("Profit & Loss")
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+CHART_EPOCH = date(2019, 1, 1)
+
+
+@lru_cache(maxsize=256)
+def _price_history(symbol: str, end: date) -> tuple[list[float], list[int], list[float]]:
+    # Anchored at a fixed epoch so a given date always has the same bar,
+    # whichever window is requested.
+    rng = random.Random(f"chart:{symbol}")
+    closes, volumes, prefix = [], [], [0.0]
+    price = rng.uniform(100, 3000)
+    for _ in range((end - CHART_EPOCH).days + 1):
+        price = max(1.0, price * (1 + rng.gauss(0.0004, 0.015)))
+        closes.append(round(price, 2))
+        volumes.append(rng.randint(100_000, 5_000_000))
+        prefix.append(prefix[-1] + closes[-1])
+    return closes, volumes, prefix
+
+
+def chart_payload(symbol: str, query: str, days: int, end: date | None = None) -> dict:
+    """Chart API payload shaped like /api/company/{id}/chart/ for the last `days` days."""
+    end = end or date.today()
+    closes, volumes, prefix = _price_history(symbol.upper(), end)
+    history = len(closes)
+
+    def dma(i: int, n: int) -> float:
+        lo = max(0, i - n + 1)
+        return round((prefix[i + 1] - prefix[lo]) / (i + 1 - lo), 2)
+
+    series: dict[str, list] = {"Price": [], "DMA50": [], "DMA200": [], "Volume": []}
+    for i in range(max(0, history - days), history):
+        day = (CHART_EPOCH + timedelta(days=i)).isoformat()
+        series["Price"].append([day, f"{closes[i]:.2f}"])
+        series["DMA50"].append([day, dma(i, 50)])
+        series["DMA200"].append([day, dma(i, 200)])
+        series["Volume"].append([day, volumes[i], {"delivery": 20 + volumes[i] % 60}])
+    labels = {"Price": "Price on NSE", "DMA50": "50 DMA", "DMA200": "200 DMA", "Volume": "Volume"}
+    return {"datasets": [{"metric": metric, "label": labels[metric], "values": series[metric],
+                          "meta": {"is_weekly": False}}
+                         for metric in query.split("-") if metric in series]}
+
+
+def render_screens_page(page: int, pages: int = 5, per_page: int = 20) -> str:
+    """Render an HTML page shaped like https://www.screener.in/screens/?page=N."""
+    items = []
+    for i in range(per_page):
+        n = (page - 1) * per_page + i + 1
+        items.append(f'<li class="flex-row"><a href="/screens/{1000 + n}/stub-screen-{n}/" class="nowrap">'
+                     f'Stub screen {n}<span class="sub">Companies with growing sales {n}</span></a>'
+                     f'<span class="sub">by user{n % 7}</span></li>')
+    nav = "".join(f'<a class="button" href="?page={p}">{p}</a>' for p in range(1, pages + 1))
+    return f"""<!DOCTYPE html><html><body><main class="container">
+<div class="flex-row flex-space-between"><h1>Popular Stock Screens</h1></div>
+<ul class="items">{"".join(items)}</ul>
+<div class="pagination">{nav}</div></main></body></html>"""
+
+
+SCREEN_COLUMNS = ["CMP Rs.", "P/E", "Mar Cap Rs.Cr.", "Div Yld %", "NP Qtr Rs.Cr.", "Qtr Profit Var %", "ROCE %"]
+
+
+def screen_symbols(screen_id: int, total: int = 60) -> list[str]:
+    """Companies a stub screen returns, best first."""
+    return [f"S{screen_id}CO{n}" for n in range(1, total + 1)]
+
+
+def render_screen_results(screen_id: int, page: int, total: int = 60, per_page: int = 25) -> str:
+    """Render a result page shaped like https://www.screener.in/screens/{id}/{slug}/?page=N."""
+    symbols = screen_symbols(screen_id, total)
+    pages = (total + per_page - 1) // per_page
+    head = '<tr><th class="text">S.No.</th><th class="text"><a href="?sort=name">Name</a></th>' + "".join(
+        f'<th><a href="?sort=c{i}">{c.rsplit(" ", 1)[0]} <span>{c.rsplit(" ", 1)[1]}</span></a></th>'
+        if " " in c else f'<th><a href="?sort=c{i}">{c}</a></th>' for i, c in enumerate(SCREEN_COLUMNS)) + "</tr>"
+    rows = []
+    for n in range((page - 1) * per_page, min(page * per_page, total)):
+        symbol = symbols[n]
+        rng = random.Random(f"screen:{symbol}")
+        _, company_id = company_ids(symbol)
+        cells = "".join(f"<td>{_cell(c, rng.uniform(1, 60) if c.endswith('%') else rng.uniform(5, 5000))}</td>"
+                        for c in SCREEN_COLUMNS)
+        rows.append(f'<tr data-row-company-id="{company_id}"><td class="text">{n + 1}.</td>'
+                    f'<td class="text"><a href="/company/{symbol}/consolidated/" target="_blank">{symbol} Ltd</a></td>'
+                    f"{cells}</tr>")
+        if (n + 1) % 15 == 0:
+            rows.append(head)  # Screener repeats the header inside long tables
+    median = '<tr><td class="text"></td><td class="text">Median: 25 Co.</td>' + "<td>1</td>" * len(SCREEN_COLUMNS) + "</tr>"
+    nav = "".join(f'<a class="button" href="?page={p}">{p}</a>' for p in range(1, pages + 1))
+    return f"""<!DOCTYPE html><html><body><main class="container">
+<div class="card card-large"><h1>Stub screen {screen_id}</h1>
+<div class="sub">{total} results found: Showing page {page} of {pages}</div>
+<table class="data-table text-nowrap striped mark-visited"><tbody>{head}{"".join(rows)}{median}</tbody></table>
+<div class="pagination">{nav}</div></div></main></body></html>"""
+
+
+class StubScreener:
+    """Minimal keep-alive HTTP/1.1 server imitating the Screener.in endpoints."""
+
+    def __init__(self, latency: float = 0.0, handshake_delay: float = 0.0, host: str = "127.0.0.1"):
+        self.latency = latency
+        # Extra delay charged once per accepted connection, standing in for
+        # the TCP + TLS round trips a real client pays to www.screener.in.
+        self.handshake_delay = handshake_delay
+        self.host = host
+        self.connections = 0
+        self.requests = 0
+        self.hits: Counter = Counter()
+        self.responder = None  # optional hook(method, path, query) -> (status, headers, body) | None
+        # Injected throttling: beyond this many requests/second answer 429 with a Retry-After
+        self.throttle: TokenBucket | None = None
+        self.retry_after = "1"
+        self._failures: list[int] = []
+        self._server: asyncio.AbstractServer | None = None
+        self._symbols: dict[str, str] = {}
+
+    @property
+    def base_url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{port}"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "StubScreener":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def reset_counters(self) -> None:
+        self.connections = 0
+        self.requests = 0
+        self.hits.clear()
+
+    def throttle_to(self, rate: float, burst: float = 1, retry_after: float | None = 1.0) -> None:
+        """Answer 429 to requests beyond `rate`/second (no limit with rate 0)."""
+        self.throttle = TokenBucket(rate, burst) if rate > 0 else None
+        self.retry_after = None if retry_after is None else f"{retry_after:g}"
+
+    def fail_next(self, count: int, status: int = 503) -> None:
+        """Answer the next `count` requests with `status`."""
+        self._failures += [status] * count
+
+    def route(self, method: str, path: str, query: dict[str, list[str]]) -> tuple[int, dict[str, str], bytes]:
+        if self._failures:
+            self.hits["failed"] += 1
+            return self._failures.pop(0), {"content-type": "text/plain"}, b"service unavailable"
+        if self.throttle is not None and not self.throttle.try_acquire():
+            self.hits["throttled"] += 1
+            headers = {"content-type": "text/plain"}
+            if self.retry_after is not None:
+                headers["retry-after"] = self.retry_after
+            return 429, headers, b"too many requests"
+        if self.responder is not None:
+            result = self.responder(method, path, query)
+            if result is not None:
+                return result
+        parts = [p for p in path.split("/") if p]
+        if parts[:3] == ["api", "company", "search"]:
+            self.hits["search"] += 1
+            symbol = query.get("q", [""])[0].upper()
+            _, company_id = company_ids(symbol)
+            self._symbols[company_id] = symbol
+            body = [{"id": int(company_id), "name": f"{symbol} Ltd", "url": f"/company/{symbol}/consolidated/"}]
+            return 200, {"content-type": "application/json"}, json.dumps(body).encode()
+        if parts[:2] == ["api", "company"] and len(parts) == 4 and parts[3] == "chart":
+            self.hits["chart"] += 1
+            symbol = self._symbols.get(parts[2], parts[2])
+            payload = chart_payload(symbol, query.get("q", ["Price"])[0], int(query.get("days", ["365"])[0]))
+            return 200, {"content-type": "application/json"}, json.dumps(payload).encode()
+        if parts[:1] == ["company"] and len(parts) >= 2:
+            self.hits["company"] += 1
+            symbol = parts[1].upper()
+            self._symbols[company_ids(symbol)[1]] = symbol
+            return 200, {"content-type": "text/html; charset=utf-8"}, render_company_page(symbol).encode()
+        if parts[:1] == ["screens"] and len(parts) > 1:
+            self.hits["screen"] += 1
+            page = int(query.get("page", ["1"])[0])
+            return 200, {"content-type": "text/html; charset=utf-8"}, render_screen_results(int(parts[1]), page).encode()
+        if parts[:1] == ["screens"]:
+            self.hits["screens"] += 1
+            page = int(query.get("page", ["1"])[0])
+            return 200, {"content-type": "text/html; charset=utf-8"}, render_screens_page(page).encode()
+        if parts[:3] == ["user", "company", "export"] and method == "POST":
+            self.hits["export"] += 1
+            symbol = next((s for s in self._symbols.values() if company_ids(s)[0] == parts[3]), parts[3])
+            return 200, {"content-type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}, \
+                render_report_workbook(symbol)
+        return 404, {"content-type": "text/plain"}, b"not found"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                request_headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        request_headers[k.strip().lower()] = v.strip()
+                length = int(request_headers.get("content-length", "0"))
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                url = urlsplit(target)
+                status, response_headers, body = self.route(method, url.path, parse_qs(url.query))
+                out = [f"HTTP/1.1 {status} {'OK' if status < 400 else 'ERROR'}",
+                       f"content-length: {len(body)}"]
+                out += [f"{k}: {v}" for k, v in response_headers.items()]
+                writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1") + body)
+                await writer.drain()
+                if request_headers.get("connection", "").lower() == "close":
+                    break
+        finally:
+            writer.close()
+
+
+@contextmanager
+def stub_in_thread(**kwargs):
+    """Run a StubScreener on its own event loop thread.
+
+    Needed when the code under test blocks its own loop (e.g. a synchronous
+    fetch), which would otherwise deadlock against an in-loop stub.
+    """
+    stub = StubScreener(**kwargs)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(stub.start(), loop).result()
+    try:
+        yield stub
+    finally:
+        asyncio.run_coroutine_threadsafe(stub.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
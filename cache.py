@@ -0,0 +1,490 @@
+"""Two-tier cache for Screener.in data with per-dataset TTLs.
+
+Tier 1 is an in-process LRU bounded by the (pickled) size of its entries.
+Tier 2 is persistent and shared: a local SQLite file by default, or any
+Redis-protocol server. A tier-2 hit is promoted into tier 1.
+
+    SCREENER_CACHE_BACKEND=disk       # disk | redis | memory (tier 1 only)
+    SCREENER_CACHE_MEMORY_MB=128
+    SCREENER_CACHE_PATH=.screener_cache/cache.sqlite3
+    SCREENER_REDIS_URL=redis://127.0.0.1:6379/0
+    SCREENER_TTL_CHART=300            # per-dataset TTL override, in seconds
+    SCREENER_STALE_FACTOR=1           # stale grace period, as a multiple of the TTL
+    SCREENER_STALE_CHART=60           # per-dataset grace override, in seconds
+
+An entry past its TTL but within its grace period is stale: `cached`
+functions return it at once and refresh it in the background, so only a
+request after the grace period waits for Screener. Code running inside
+`refreshing()` never accepts stale entries (and can ask for entries to be
+fresh for a while longer), which is how background refreshes and the
+watchlist scheduler get real data.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, NamedTuple
+from urllib.parse import urlsplit
+import asyncio
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+SCREENER_CACHE_DIR = os.getenv("SCREENER_CACHE_DIR", ".screener_cache")
+SCREENER_CACHE_BACKEND = os.getenv("SCREENER_CACHE_BACKEND", "disk")
+SCREENER_CACHE_MEMORY_MB = float(os.getenv("SCREENER_CACHE_MEMORY_MB", "128"))
+SCREENER_CACHE_PATH = os.getenv("SCREENER_CACHE_PATH", os.path.join(SCREENER_CACHE_DIR, "cache.sqlite3"))
+SCREENER_REDIS_URL = os.getenv("SCREENER_REDIS_URL", "redis://127.0.0.1:6379/0")
+
+# Seconds each dataset stays fresh; SCREENER_TTL_<DATASET> overrides any of them
+DEFAULT_TTLS = {
+    "company_html": 3600,
+    "company_page": 3600,
+    "fundamentals": 3600,
+    "chart": 300,
+    "search": 7 * 86400,
+    "screens": 3600,
+    "screens_index": 6 * 3600,
+    "screen_results": 600,
+    "report": 86400,
+}
+DEFAULT_TTL = 3600
+SCREENER_STALE_FACTOR = float(os.getenv("SCREENER_STALE_FACTOR", "1"))
+
+
+def ttl_for(dataset: str) -> float:
+    override = os.getenv(f"SCREENER_TTL_{dataset.upper()}")
+    return float(override) if override else DEFAULT_TTLS.get(dataset, DEFAULT_TTL)
+
+
+def stale_for(dataset: str) -> float:
+    """Seconds past its TTL an entry of `dataset` may still be served while it is refreshed."""
+    override = os.getenv(f"SCREENER_STALE_{dataset.upper()}")
+    return float(override) if override else ttl_for(dataset) * SCREENER_STALE_FACTOR
+
+
+# None: stale entries may be served. A number: they may not, and entries must stay fresh that much longer
+_min_fresh: ContextVar[float | None] = ContextVar("min_fresh", default=None)
+
+
+@contextmanager
+def refreshing(ahead: float = 0.0):
+    """Within this block stale entries are misses, as are fresh ones expiring in the next `ahead` seconds."""
+    token = _min_fresh.set(ahead)
+    try:
+        yield
+    finally:
+        _min_fresh.reset(token)
+
+
+def freshness(fresh_until: float, expires_at: float, now: float | None = None, ttl: float = float("inf")) -> str:
+    """"fresh", "stale" or "miss" for an entry, as the current context sees it.
+
+    Inside `refreshing(ahead)` the margin asked for is capped at half the
+    entry's `ttl`, so an entry written moments ago is never fetched again.
+    """
+    now = time.time() if now is None else now
+    min_fresh = _min_fresh.get()
+    if expires_at <= now:
+        return "miss"
+    if min_fresh is None:
+        return "fresh" if fresh_until > now else "stale"
+    return "fresh" if fresh_until > now + min(min_fresh, ttl / 2) else "miss"
+
+
+class _Stamped(NamedTuple):
+    """Tier-2 payload: the value and when it stops being fresh (tier 2 expires it after the grace period)."""
+    fresh_until: float
+    value: Any
+
+
+@dataclass
+class TierStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expired: int = 0
+    errors: int = 0
+    stale: int = 0
+
+
+class MemoryLRU:
+    """In-process LRU capped at `max_bytes` of pickled entry size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = TierStats()
+        self._entries: OrderedDict[str, tuple[float, float, Any, int]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        hit, value, _ = self.get_entry(key)
+        return hit, value
+
+    def get_entry(self, key: str) -> tuple[bool, Any, float]:
+        """(hit, value, fresh_until); entries past `expires_at` are dropped."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None, 0.0
+        expires_at, fresh_until, value, size = entry
+        if expires_at <= time.time():
+            self._drop(key)
+            self.stats.expired += 1
+            self.stats.misses += 1
+            return False, None, 0.0
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return True, value, fresh_until
+
+    def set(self, key: str, value: Any, size: int, expires_at: float, fresh_until: float | None = None) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, expires_at if fresh_until is None else fresh_until, value, size)
+        self.bytes += size
+        self.stats.sets += 1
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def _drop(self, key: str) -> None:
+        size = self._entries.pop(key)[3]
+        self.bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskTier:
+    """Persistent tier in a local SQLite file (WAL, safe to share between processes)."""
+
+    backend = "disk"
+
+    def __init__(self, path: str = SCREENER_CACHE_PATH):
+        self.path = path
+        self.stats = TierStats()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at, value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] <= time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.stats.expired += 1
+                return None
+        return row[1] if row else None
+
+    def _set(self, key: str, payload: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, now + ttl, payload))
+            if self.stats.sets % 500 == 0:
+                self.stats.evictions += self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+
+    def _delete(self, key: str | None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache")
+            else:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, payload, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._delete, None)
+
+
+class RedisTier:
+    """Persistent tier on any server speaking the Redis protocol (RESP2)."""
+
+    backend = "redis"
+
+    def __init__(self, url: str = SCREENER_REDIS_URL):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.db = int(parts.path.strip("/") or 0)
+        self.password = parts.password
+        self.stats = TierStats()
+        self._conn: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        loop = asyncio.get_running_loop()
+        if self._conn is None or self._loop is not loop or self._conn[1].is_closing():
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._conn, self._loop = (reader, writer), loop
+            if self.password:
+                await self._roundtrip(b"AUTH", self.password.encode())
+            if self.db:
+                await self._roundtrip(b"SELECT", str(self.db).encode())
+        return self._conn
+
+    async def _roundtrip(self, *args: bytes) -> Any:
+        reader, writer = self._conn
+        writer.write(b"*%d\r\n" % len(args) + b"".join(b"$%d\r\n%s\r\n" % (len(a), a) for a in args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            return [await self._read_reply(reader) for _ in range(int(rest))]
+        raise ConnectionError("connection closed by redis server")
+
+    async def command(self, *args: bytes) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._connect()
+            try:
+                return await self._roundtrip(*args)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._conn = None
+                raise
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.command(b"GET", key.encode())
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        await self.command(b"SET", key.encode(), payload, b"PX", str(max(1, int(ttl * 1000))).encode())
+
+    async def delete(self, key: str) -> None:
+        await self.command(b"DEL", key.encode())
+
+    async def clear(self) -> None:
+        await self.command(b"FLUSHDB")
+
+
+class TieredCache:
+    """Memory LRU in front of an optional persistent tier."""
+
+    def __init__(self, memory_bytes: int, second_tier: DiskTier | RedisTier | None = None):
+        self.memory = MemoryLRU(memory_bytes)
+        self.second_tier = second_tier
+        self.datasets: dict[str, TierStats] = {}
+
+    @staticmethod
+    def _key(dataset: str, key: str) -> str:
+        return f"screener:{dataset}:{key}"
+
+    def _dataset_stats(self, dataset: str) -> TierStats:
+        if dataset not in self.datasets:
+            self.datasets[dataset] = TierStats()
+        return self.datasets[dataset]
+
+    async def get(self, dataset: str, key: str) -> tuple[bool, Any]:
+        """(hit, value) for fresh entries only; a stale entry counts as a miss."""
+        state, value = await self.lookup(dataset, key)
+        return (True, value) if state == "fresh" else (False, None)
+
+    async def lookup(self, dataset: str, key: str) -> tuple[str, Any]:
+        """("fresh" | "stale" | "miss", value), see `freshness`."""
+        state, value = await self._lookup(dataset, key)
+        stats = self._dataset_stats(dataset)
+        if state == "miss":
+            stats.misses += 1
+            return state, None
+        stats.hits += 1
+        if state == "stale":
+            stats.stale += 1
+        return state, value
+
+    async def _lookup(self, dataset: str, key: str) -> tuple[str, Any]:
+        full_key = self._key(dataset, key)
+        now = time.time()
+        best: tuple[str, Any] = ("miss", None)
+        hit, value, fresh_until = self.memory.get_entry(full_key)
+        if hit:
+            state = freshness(fresh_until, float("inf"), now, ttl_for(dataset))
+            if state == "fresh":
+                return state, value
+            if state == "stale":
+                best = (state, value)
+        if self.second_tier is not None:
+            # Also on a stale memory hit: another process sharing tier 2 may have refreshed the entry
+            tier = self.second_tier
+            try:
+                payload = await tier.get(full_key)
+                if payload is None:
+                    tier.stats.misses += 1
+                    return best
+                tier.stats.hits += 1
+                entry = pickle.loads(payload)
+                # Entries written before stale-while-revalidate stay fresh until tier 2 expires them
+                fresh_until, value = entry if isinstance(entry, _Stamped) else (float("inf"), entry)
+                state = freshness(fresh_until, float("inf"), now, ttl_for(dataset))
+                if state == "fresh" or (state == "stale" and best[0] == "miss"):
+                    # Promote; tier 2 still holds the authoritative expiry
+                    fresh_until = min(fresh_until, now + ttl_for(dataset))
+                    self.memory.set(full_key, value, len(payload), fresh_until + stale_for(dataset), fresh_until)
+                    best = (state, value)
+            except Exception as e:
+                tier.stats.errors += 1
+                logging.info(f"Cache {tier.backend} get failed for {full_key}: {e}")
+        return best
+
+    async def set(self, dataset: str, key: str, value: Any, ttl: float | None = None) -> None:
+        full_key = self._key(dataset, key)
+        ttl = ttl_for(dataset) if ttl is None else ttl
+        fresh_until = time.time() + ttl
+        grace = stale_for(dataset)
+        payload = pickle.dumps(_Stamped(fresh_until, value), protocol=pickle.HIGHEST_PROTOCOL)
+        self.memory.set(full_key, value, len(payload), fresh_until + grace, fresh_until)
+        self._dataset_stats(dataset).sets += 1
+        if self.second_tier is not None:
+            tier = self.second_tier
+            try:
+                await tier.set(full_key, payload, ttl + grace)
+                tier.stats.sets += 1
+            except Exception as e:
+                tier.stats.errors += 1
+                logging.info(f"Cache {tier.backend} set failed for {full_key}: {e}")
+
+    async def delete(self, dataset: str, key: str) -> None:
+        full_key = self._key(dataset, key)
+        self.memory.delete(full_key)
+        if self.second_tier is not None:
+            await self.second_tier.delete(full_key)
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.second_tier is not None:
+            await self.second_tier.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "memory": {"entries": len(self.memory), "bytes": self.memory.bytes,
+                       "max_bytes": self.memory.max_bytes, **asdict(self.memory.stats)},
+            "second_tier": None if self.second_tier is None else {
+                "backend": self.second_tier.backend, **asdict(self.second_tier.stats)},
+            "datasets": {name: {"ttl": ttl_for(name), "hits": s.hits, "misses": s.misses, "sets": s.sets,
+                                "stale": s.stale} for name, s in self.datasets.items()},
+            "revalidating": len(_revalidations),
+        }
+
+
+_cache: TieredCache | None = None
+
+
+def _build_cache(backend: str, memory_bytes: int, path: str, redis_url: str) -> TieredCache:
+    if backend == "disk":
+        return TieredCache(memory_bytes, DiskTier(path))
+    if backend == "redis":
+        return TieredCache(memory_bytes, RedisTier(redis_url))
+    if backend == "memory":
+        return TieredCache(memory_bytes)
+    raise ValueError(f"Unknown SCREENER_CACHE_BACKEND: {backend}")
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        _cache = _build_cache(SCREENER_CACHE_BACKEND, int(SCREENER_CACHE_MEMORY_MB * 1024 * 1024),
+                              SCREENER_CACHE_PATH, SCREENER_REDIS_URL)
+    return _cache
+
+
+def configure_cache(backend: str = SCREENER_CACHE_BACKEND, memory_mb: float = SCREENER_CACHE_MEMORY_MB,
+                    path: str = SCREENER_CACHE_PATH, redis_url: str = SCREENER_REDIS_URL) -> TieredCache:
+    """Replace the process-wide cache (tests, alternate deployments)."""
+    global _cache
+    _cache = _build_cache(backend, int(memory_mb * 1024 * 1024), path, redis_url)
+    return _cache
+
+
+_revalidations: dict[str, asyncio.Task] = {}
+
+
+def revalidate(name: str, refresh: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """Run `refresh()` in the background inside `refreshing()`, unless a refresh of `name` is running."""
+    task = _revalidations.get(name)
+    if task is None or task.done():
+        async def run() -> Any:
+            with refreshing():
+                return await refresh()
+
+        task = _revalidations[name] = asyncio.create_task(run())
+        task.add_done_callback(functools.partial(_revalidated, name))
+    return task
+
+
+def _revalidated(name: str, task: asyncio.Task) -> None:
+    if _revalidations.get(name) is task:
+        del _revalidations[name]
+    if not task.cancelled() and task.exception() is not None:
+        logging.info(f"Background refresh of {name} failed, keeping the stale entry: {task.exception()}")
+
+
+def cached(dataset: str, key_builder: Callable[..., str] | None = None):
+    """Cache an async function's result in the tiered cache under `dataset`'s TTL.
+
+    A stale result is returned as it is while the function runs again in the
+    background. Results must be picklable. Exceptions are not cached.
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        async def load(key: str, *args: Any, **kwargs: Any) -> Any:
+            value = await fn(*args, **kwargs)
+            await get_cache().set(dataset, key, value)
+            return value
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if key_builder is not None:
+                key = key_builder(*args, **kwargs)
+            else:
+                key = f"{fn.__qualname__}:{args!r}:{sorted(kwargs.items())!r}"
+            state, value = await get_cache().lookup(dataset, key)
+            if state == "stale":
+                revalidate(f"{dataset}:{key}", lambda: load(key, *args, **kwargs))
+            if state != "miss":
+                return value
+            return await load(key, *args, **kwargs)
+
+        wrapper.dataset = dataset
+        return wrapper
+
+    return decorator
@@ -0,0 +1,155 @@
+"""Single-fetch model of a Screener.in company page.
+
+One download of /company/{name}/ yields everything the tools need from that
+page: the seven fundamentals tables, the "about" text and the export/follow
+IDs. The page is fetched once and kept (zlib-compressed) in the cache; the
+light CompanyPage summary and each fundamentals table are parsed from it only
+when first asked for, and cached separately, so get_ratios never builds or
+stores the other six tables.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+import re
+import zlib
+
+from cache import cached, get_cache, revalidate
+from http_client import get_client
+from lazy_import import lazy_module
+from parsing import SECTIONS, extract_tables, run_parser
+from report_store import read_report_sections
+from singleflight import coalesced
+
+pd = lazy_module("pandas")
+lxml_html = lazy_module("lxml.html")
+
+
+@dataclass
+class CompanyPage:
+    name: str
+    url: str
+    about: str | None
+    warehouse_id: str | None
+    company_id: str | None
+
+
+def parse_about(html: str | lxml_html.HtmlElement) -> str | None:
+    """Text of the "about" box, one paragraph per line."""
+    tree = lxml_html.fromstring(html) if isinstance(html, str) else html
+    boxes = tree.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " show-more-box ")'
+                       ' and contains(concat(" ", normalize-space(@class), " "), " about ")]')
+    if not boxes:
+        return None
+    return "\n".join(p.text_content().strip() for p in boxes[0].iter("p"))
+
+
+def parse_company_page(name: str, url: str, html: str) -> CompanyPage:
+    """Build a CompanyPage from the page HTML."""
+    warehouse_id = re.findall('formaction=./user/company/export/(.*?)/.', html)
+    company_id = re.findall('formaction=./api/company/(.*?)/add/.', html)
+    return CompanyPage(
+        name,
+        url,
+        about=parse_about(html),
+        warehouse_id=warehouse_id[0] if warehouse_id else None,
+        company_id=company_id[0] if company_id else None,
+    )
+
+
+# Worker-pool entry points: inflating the cached page is part of the parse work
+def _parse_page_summary(name: str, url: str, compressed: bytes) -> CompanyPage:
+    return parse_company_page(name, url, zlib.decompress(compressed).decode())
+
+
+def _parse_sections(compressed: bytes, sections: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    return extract_tables(zlib.decompress(compressed).decode(), sections)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def _page_name(name: str) -> str:
+    # "wipro" and "WIPRO" are one page (and one cache entry); a path after the symbol ("TCS/consolidated") is kept
+    symbol, slash, rest = name.strip().partition("/")
+    return normalize_symbol(symbol) + slash + rest
+
+
+def _page_url(name: str) -> str:
+    return f"/company/{name}/"
+
+
+async def fetch_company_html(name: str) -> bytes:
+    """zlib-compressed HTML of /company/{name}/; raises ValueError if it cannot be fetched."""
+    return await _fetch_company_html(_page_name(name))
+
+
+@cached("company_html")
+@coalesced("company_html")  # Concurrent cache misses share one fetch
+async def _fetch_company_html(name: str) -> bytes:
+    try:
+        response = await get_client().get(_page_url(name), follow_redirects=True)
+        response.raise_for_status()
+    except Exception as e:
+        raise ValueError(f"Error fetching company page for {name}: {e}") from e
+    return zlib.compress(response.text.encode())
+
+
+async def get_company_page(name: str) -> CompanyPage:
+    """About text and Screener IDs of a company page; raises ValueError if it cannot be fetched."""
+    return await _company_page(_page_name(name))
+
+
+@cached("company_page")
+@coalesced("company_page")
+async def _company_page(name: str) -> CompanyPage:
+    return await run_parser(_parse_page_summary, name, _page_url(name), await _fetch_company_html(name))
+
+
+def _section_key(name: str, section: str) -> str:
+    return f"{name}:{section}"
+
+
+async def get_sections(name: str, sections: Iterable[str] = SECTIONS) -> dict[str, pd.DataFrame]:
+    """Fundamentals tables (keys of parsing.SECTIONS) of a company, in the order asked for.
+
+    Cached sections are returned as they are, stale ones while they are
+    reloaded in the background. The rest come from a fresh
+    downloaded Excel report when there is one (see report_store), otherwise
+    they are parsed together in one pass over the page; either way they are
+    cached one by one. Raises ValueError for an unknown section or if the
+    page cannot be fetched.
+    """
+    name = _page_name(name)
+    sections = tuple(dict.fromkeys(sections))
+    unknown = [s for s in sections if s not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown sections {unknown}, expected any of {list(SECTIONS)}")
+    cache = get_cache()
+    tables, stale = {}, []
+    for section in sections:
+        state, table = await cache.lookup("fundamentals", _section_key(name, section))
+        if state != "miss":
+            tables[section] = table
+        if state == "stale":
+            stale.append(section)
+    missing = tuple(s for s in sections if s not in tables)
+    if missing:
+        tables.update(await _load_sections(name, missing))
+    if stale:
+        revalidate(f"fundamentals:{name}:{','.join(stale)}",
+                   lambda: _load_sections(name, tuple(stale)))
+    return {section: tables[section] for section in sections}
+
+
+@coalesced("fundamentals")
+async def _load_sections(name: str, sections: tuple[str, ...]) -> dict[str, pd.DataFrame]:
+    tables = await read_report_sections(name, sections)
+    missing = tuple(s for s in sections if s not in tables)
+    if missing:
+        tables.update(await run_parser(_parse_sections, await _fetch_company_html(name), missing))
+    cache = get_cache()
+    for section, table in tables.items():
+        await cache.set("fundamentals", _section_key(name, section), table)
+    return tables
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+import cache
+import http_client
+import price_store
+import report_store
+import scheduler
+import screens
+import symbol_index
+import upstream
+import warehouse
+from benchmarks.stub_server import StubScreener
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    # Keep tests off the real .screener_cache directory and independent of each other
+    cache.configure_cache(backend="memory")
+    symbol_index.configure_symbol_index(str(tmp_path / "symbols.sqlite3"))
+    price_store.configure_price_store(str(tmp_path / "prices"))
+    warehouse.configure_warehouse(str(tmp_path / "warehouse"))
+    monkeypatch.setattr(report_store, "SCREENER_REPORTS_DIR", str(tmp_path / "reports"))
+    screens.reset_screens_index()
+    upstream.reset_upstream_stats()
+    scheduler.configure_scheduler(str(tmp_path / "watchlist.json"))
+    yield
+
+
+@pytest.fixture
+def run_against_stub():
+    """Runs `await fn(stub)` on a new event loop, with the shared HTTP client pointed at a StubScreener.
+
+    `responder` is installed on the stub and `client` settings are passed to
+    http_client.configure_client. The client, and any watchlist refresher
+    the call started, are shut down before the loop closes.
+    """
+    def run(fn, responder=None, **client):
+        async def main():
+            async with StubScreener() as stub:
+                stub.responder = responder
+                http_client.configure_client(base_url=stub.base_url, **client)
+                try:
+                    return await fn(stub)
+                finally:
+                    await scheduler.get_scheduler().stop()
+                    await http_client.close_client()
+                    http_client.reset_client_config()
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,177 @@
+"""Process-wide pooled HTTP client for all Screener.in traffic."""
+from contextlib import asynccontextmanager
+from typing import Any
+import asyncio
+import logging
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import SCREENER_METRICS, InstrumentedTransport, observe
+from replay import SCREENER_REPLAY_DIR, SCREENER_REPLAY_MODE, ReplayTransport
+from upstream import (SCREENER_BREAKER_COOLDOWN, SCREENER_BREAKER_THRESHOLD, SCREENER_RETRIES, SCREENER_RETRY_BACKOFF,
+                      SCREENER_RETRY_MAX_BACKOFF, GovernedTransport)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Define Screener.in API base URL and credentials
+SCREENER_API_BASE = os.getenv("SCREENER_API_BASE", "https://www.screener.in")
+SCREENER_CSRF_TOKEN = os.getenv("SCREENER_CSRF_TOKEN")
+SCREENER_SESSION_ID = os.getenv("SCREENER_SESSION_ID")
+SCREENER_CSRF_MIDDLEWARE_TOKEN = os.getenv("SCREENER_CSRF_MIDDLEWARE_TOKEN")
+
+# Connection pool settings, all overridable from the environment
+SCREENER_HTTP2 = os.getenv("SCREENER_HTTP2", "false").lower() in ("1", "true", "yes")
+SCREENER_MAX_CONNECTIONS = int(os.getenv("SCREENER_MAX_CONNECTIONS", "20"))
+SCREENER_MAX_KEEPALIVE = int(os.getenv("SCREENER_MAX_KEEPALIVE", "10"))
+SCREENER_KEEPALIVE_EXPIRY = float(os.getenv("SCREENER_KEEPALIVE_EXPIRY", "60"))
+SCREENER_CONNECT_TIMEOUT = float(os.getenv("SCREENER_CONNECT_TIMEOUT", "10"))
+SCREENER_READ_TIMEOUT = float(os.getenv("SCREENER_READ_TIMEOUT", "30"))
+SCREENER_POOL_TIMEOUT = float(os.getenv("SCREENER_POOL_TIMEOUT", "30"))
+# Requests per second allowed to each endpoint class (0 disables) and the burst size; see upstream.py
+SCREENER_RATE_LIMIT = float(os.getenv("SCREENER_RATE_LIMIT", "10"))
+SCREENER_RATE_BURST = float(os.getenv("SCREENER_RATE_BURST", "20"))
+
+
+cookies = {
+    'theme': 'auto',
+    'csrftoken': SCREENER_CSRF_TOKEN,
+    'sessionid': SCREENER_SESSION_ID,
+}
+
+# content-type might not be needed in get request headers
+headers = {
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'accept-language': 'en-GB,en-US;q=0.9,en;q=0.8',
+    'cache-control': 'max-age=0',
+    'content-type': 'application/x-www-form-urlencoded',
+    'origin': 'https://www.screener.in',
+    'priority': 'u=0, i',
+    'referer': 'https://www.screener.in',
+    'sec-ch-ua': '"Chromium";v="134", "Not:A-Brand";v="24", "Google Chrome";v="134"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'document',
+    'sec-fetch-mode': 'navigate',
+    'sec-fetch-site': 'same-origin',
+    'sec-fetch-user': '?1',
+    'upgrade-insecure-requests': '1',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36',
+    # 'cookie': 'theme=auto; csrftoken=qwe; sessionid=fgh',
+}
+
+data = {
+    'csrfmiddlewaretoken': SCREENER_CSRF_MIDDLEWARE_TOKEN,
+    'next': '/company/WIPRO/consolidated/',
+}
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+_overrides: dict[str, Any] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = _overrides.get("http2", SCREENER_HTTP2)
+    if http2 and not _http2_available():
+        logging.info("SCREENER_HTTP2 is set but the 'h2' package is not installed, falling back to HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=_overrides.get("max_connections", SCREENER_MAX_CONNECTIONS),
+        max_keepalive_connections=_overrides.get("max_keepalive", SCREENER_MAX_KEEPALIVE),
+        keepalive_expiry=_overrides.get("keepalive_expiry", SCREENER_KEEPALIVE_EXPIRY),
+    )
+    timeout = httpx.Timeout(
+        _overrides.get("read_timeout", SCREENER_READ_TIMEOUT),
+        connect=_overrides.get("connect_timeout", SCREENER_CONNECT_TIMEOUT),
+        pool=_overrides.get("pool_timeout", SCREENER_POOL_TIMEOUT),
+    )
+    transport = _overrides.get("transport")
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+        if SCREENER_REPLAY_MODE:
+            transport = ReplayTransport(SCREENER_REPLAY_DIR, SCREENER_REPLAY_MODE, transport)
+    if SCREENER_METRICS:
+        transport = InstrumentedTransport(transport)
+
+    def timed_wait(endpoint: str, seconds: float) -> None:
+        observe("screener_rate_limit_wait_seconds", seconds, endpoint=endpoint)
+
+    # Outermost, so each retry is timed (and rate limited) as a request of its own
+    transport = GovernedTransport(
+        transport,
+        rate=_overrides.get("rate_limit", SCREENER_RATE_LIMIT),
+        burst=_overrides.get("rate_burst", SCREENER_RATE_BURST),
+        retries=_overrides.get("retries", SCREENER_RETRIES),
+        backoff_base=_overrides.get("retry_backoff", SCREENER_RETRY_BACKOFF),
+        max_backoff=_overrides.get("retry_max_backoff", SCREENER_RETRY_MAX_BACKOFF),
+        breaker_threshold=_overrides.get("breaker_threshold", SCREENER_BREAKER_THRESHOLD),
+        breaker_cooldown=_overrides.get("breaker_cooldown", SCREENER_BREAKER_COOLDOWN),
+        on_wait=timed_wait if SCREENER_METRICS else None,
+    )
+
+    return httpx.AsyncClient(
+        base_url=_overrides.get("base_url", SCREENER_API_BASE),
+        headers=headers,
+        cookies={k: v for k, v in cookies.items() if v is not None},
+        limits=limits,
+        timeout=timeout,
+        http2=http2,
+        transport=transport,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use in the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A pooled connection cannot outlive the loop it was opened on, so a
+        # new loop (e.g. a fresh asyncio.run in a script) gets a new client.
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def configure_client(**overrides: Any) -> None:
+    """Override client settings (base_url, http2, max_connections, rate_limit, retries, transport, ...).
+
+    The current client is dropped and rebuilt with the new settings on next use.
+    """
+    global _client, _client_loop
+    _overrides.update(overrides)
+    _client, _client_loop = None, None
+
+
+def reset_client_config() -> None:
+    """Drop all overrides set through configure_client."""
+    global _client, _client_loop
+    _overrides.clear()
+    _client, _client_loop = None, None
+
+
+@asynccontextmanager
+async def client_lifespan(server: Any):
+    """FastMCP lifespan: open the shared client on startup, close it on shutdown."""
+    get_client()
+    try:
+        yield {}
+    finally:
+        await close_client()
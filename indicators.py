@@ -0,0 +1,409 @@
+"""Technical indicators computed from a Screener.in chart API payload.
+
+The indicator functions take an already-fetched payload instead of fetching
+their own, so a caller that needs several indicators (trade_recommendation)
+can request the union of their metrics once and hand the same payload to
+each of them.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+# Chart metrics each indicator reads
+MOVING_AVERAGE_METRICS = ("Price", "DMA50", "DMA200", "Volume")
+RSI_METRICS = ("Price",)
+
+
+def chart_query(*metric_groups: tuple[str, ...]) -> str:
+    """Chart API `q` parameter covering the union of the given metric groups."""
+    metrics = dict.fromkeys(metric for group in metric_groups for metric in group)
+    return "-".join(metrics)
+
+
+def chart_datasets(price_data: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Index a chart payload's datasets by metric name."""
+    return {dataset["metric"]: dataset for dataset in price_data.get("datasets", [])}
+
+
+def is_weekly(price_data: dict[str, Any]) -> bool:
+    """Whether the chart API answered with weekly bars (it can for long windows)."""
+    return any(dataset.get("meta", {}).get("is_weekly") for dataset in price_data.get("datasets", []))
+
+
+def moving_average_analysis(symbol: str, price_data: dict[str, Any]) -> dict[str, Any]:
+    """Price vs DMA50/DMA200 alignment plus a volume check, as returned by calculate_moving_average."""
+    if "error" in price_data:
+        return {"error": f"Failed to fetch price info for {symbol}: {price_data['error']}"}
+
+    # Extract datasets
+    datasets = chart_datasets(price_data)
+
+    # Ensure required metrics are available
+    required_metrics = list(MOVING_AVERAGE_METRICS)
+    if not all(metric in datasets for metric in required_metrics):
+        return {"error": f"Missing required metrics for {symbol}: {required_metrics}"}
+
+    # Get latest values
+    latest_price = float(datasets["Price"]["values"][-1][1])
+    latest_dma50 = float(datasets["DMA50"]["values"][-1][1])
+    latest_dma200 = float(datasets["DMA200"]["values"][-1][1])
+    latest_volume = datasets["Volume"]["values"][-1][1]
+    avg_volume = float(np.mean([v[1] for v in datasets["Volume"]["values"]]))
+
+    # Determine signal
+    if latest_price > latest_dma50 > latest_dma200:
+        signal = "BULLISH"
+    elif latest_price < latest_dma50 < latest_dma200:
+        signal = "BEARISH"
+    else:
+        signal = "NEUTRAL"
+
+    # Volume analysis
+    unusual_volume = latest_volume > 1.5 * avg_volume
+
+    # Recommendation
+    if signal == "BULLISH" and unusual_volume:
+        recommendation = "STRONG BUY"
+    elif signal == "BULLISH":
+        recommendation = "BUY"
+    elif signal == "BEARISH" and unusual_volume:
+        recommendation = "STRONG SELL"
+    elif signal == "BEARISH":
+        recommendation = "SELL"
+    else:
+        recommendation = "HOLD"
+
+    return {
+        "symbol": symbol,
+        "latest_price": latest_price,
+        "latest_dma50": latest_dma50,
+        "latest_dma200": latest_dma200,
+        "latest_volume": latest_volume,
+        "average_volume": avg_volume,
+        "signal": signal,
+        "unusual_volume": unusual_volume,
+        "recommendation": recommendation,
+        "analysis": f"""Stock Analysis for {symbol}:
+Latest Price: {latest_price}
+50 DMA: {latest_dma50}
+200 DMA: {latest_dma200}
+Signal: {signal}
+Unusual Volume: {"Yes" if unusual_volume else "No"}
+Recommendation: {recommendation}
+"""
+    }
+
+
+def rsi_analysis(symbol: str, price_data: dict[str, Any], period: int = 14, mode: str = "sma") -> dict[str, Any]:
+    """RSI over the payload's closing prices, as returned by calculate_rsi."""
+    if "error" in price_data:
+        return {"error": f"Failed to fetch price info for {symbol}: {price_data['error']}"}
+
+    # Extract price data
+    datasets = chart_datasets(price_data)
+    if "Price" not in datasets:
+        return {"error": f"Price data not available for {symbol}"}
+
+    if mode not in RSI_MODES:
+        return {"error": f"Unknown RSI mode {mode!r}, expected one of {RSI_MODES}"}
+
+    # Calculate RSI over the closing prices ("sma" averages gains and losses with a rolling mean)
+    _, close = align_series({symbol: price_data}, "Price")
+    latest_rsi = rsi(close, period, mode)[0, -1]
+
+    # Determine signal
+    if latest_rsi < 30:
+        signal = "OVERSOLD (Potential buy opportunity)"
+    elif latest_rsi > 70:
+        signal = "OVERBOUGHT (Potential sell opportunity)"
+    else:
+        signal = "NEUTRAL"
+
+    return {
+        "symbol": symbol,
+        "period": period,
+        "rsi": latest_rsi,
+        "signal": signal,
+        "analysis": f"""RSI Analysis for {symbol}:
+            {period}-period RSI: {latest_rsi:.2f}
+            Signal: {signal}
+            
+            Recommendation: {
+                "BUY" if latest_rsi < 30 else
+                "SELL" if latest_rsi > 70 else
+                "HOLD"
+            }"""
+    }
+
+
+def combine_signals(symbol: str, ma_data: dict[str, Any], rsi_data: dict[str, Any]) -> dict[str, Any]:
+    """Blend moving average and RSI results into the trade_recommendation result."""
+    # Check for errors in the data
+    if "error" in ma_data:
+        return {"error": f"Error in moving average data: {ma_data['error']}"}
+    if "error" in rsi_data:
+        return {"error": f"Error in RSI data: {rsi_data['error']}"}
+
+    # Extract signals
+    ma_signal = ma_data["signal"]
+    rsi_value = rsi_data["rsi"]
+    rsi_signal = rsi_data["signal"]
+
+    # Determine overall signal strength
+    signal_strength = 0
+
+    # MA contribution
+    if "BULLISH" in ma_signal:
+        signal_strength += 1
+    elif "BEARISH" in ma_signal:
+        signal_strength -= 1
+
+    # RSI contribution
+    if "OVERSOLD" in rsi_signal:
+        signal_strength += 1.5
+    elif "OVERBOUGHT" in rsi_signal:
+        signal_strength -= 1.5
+
+    # Determine final recommendation
+    if signal_strength >= 2:
+        recommendation = "STRONG BUY"
+    elif signal_strength > 0:
+        recommendation = "BUY"
+    elif signal_strength <= -2:
+        recommendation = "STRONG SELL"
+    elif signal_strength < 0:
+        recommendation = "SELL"
+    else:
+        recommendation = "HOLD"
+
+    # Calculate risk level
+    risk_level = "MEDIUM"
+    if abs(signal_strength) > 3:
+        risk_level = "LOW"  # Strong signal, lower risk
+    elif abs(signal_strength) < 1:
+        risk_level = "HIGH"  # Weak signal, higher risk
+
+    analysis = f"""# Trading Recommendation for {symbol}
+
+        ## Summary
+        Recommendation: {recommendation}
+        Risk Level: {risk_level}
+        Signal Strength: {signal_strength:.1f} / 4.5
+        
+        ## Technical Indicators
+        Moving Averages: {ma_signal}
+        RSI ({rsi_data["period"]}): {rsi_value:.2f} - {rsi_signal}
+        
+        ## Reasoning
+        This recommendation is based on a combination of Moving Average analysis and RSI indicators.
+        {
+            f"The RSI indicates the stock is {rsi_signal.split(' ')[0].lower()}. " if "NEUTRAL" not in rsi_signal else ""
+        }
+        
+        ## Action Plan
+        {
+            "Consider immediate entry with a stop loss at the recent low. Target the next resistance level." if recommendation == "STRONG BUY" else
+            "Look for a good entry point on small dips. Set reasonable stop loss." if recommendation == "BUY" else
+            "Consider immediate exit or setting tight stop losses to protect gains." if recommendation == "STRONG SELL" else
+            "Start reducing position on strength or set trailing stop losses." if recommendation == "SELL" else
+            "Monitor the position but no immediate action needed."
+        }
+        """
+
+    return {
+        "symbol": symbol,
+        "recommendation": recommendation,
+        "risk_level": risk_level,
+        "signal_strength": signal_strength,
+        "ma_signal": ma_signal,
+        "rsi_signal": rsi_signal,
+        "current_price": ma_data["latest_price"],
+        "analysis": analysis
+    }
+
+
+# Batched indicator engine
+#
+# The functions below work on 2-D float arrays shaped (symbols, days): one row
+# per symbol, aligned on a shared date axis, NaN where a symbol has no bar.
+# Every indicator is computed for all rows at once; recursive ones (EMA,
+# Wilder smoothing) loop over days but never over symbols. A NaN inside a
+# row restarts them, so compute_indicators first packs each row's own bars
+# together (pack_rows) and spreads the results back onto the shared dates.
+
+RSI_MODES = ("wilder", "sma")
+
+
+def align_series(payloads: dict[str, dict[str, Any]], metric: str) -> tuple[list[str], np.ndarray]:
+    """Stack one metric from several chart payloads onto their union of dates.
+
+    Returns the sorted dates and a (len(payloads), len(dates)) array in
+    payload order, NaN where a symbol has no value for a date.
+    """
+    series = {symbol: chart_datasets(data).get(metric, {}).get("values", [])
+              for symbol, data in payloads.items()}
+    dates = sorted({value[0] for values in series.values() for value in values})
+    position = {day: i for i, day in enumerate(dates)}
+    out = np.full((len(series), len(dates)), np.nan)
+    for row, values in enumerate(series.values()):
+        if values:
+            out[row, [position[v[0]] for v in values]] = [float(v[1]) for v in values]
+    return dates, out
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    # NaN unless the whole window holds values
+    valid = ~np.isnan(x)
+    pad = np.zeros((x.shape[0], 1))
+    sums = np.concatenate([pad, np.cumsum(np.where(valid, x, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    out = np.full(x.shape, np.nan)
+    if window <= x.shape[1]:
+        total = sums[:, window:] - sums[:, :-window]
+        full = (counts[:, window:] - counts[:, :-window]) == window
+        out[:, window - 1:] = np.where(full, total, np.nan)
+    return out
+
+
+def sma(x: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average over the last `window` days."""
+    return _rolling_sum(x, window) / window
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Population standard deviation over the last `window` days."""
+    mean = sma(x, window)
+    variance = _rolling_sum(x * x, window) / window - mean * mean
+    return np.sqrt(np.clip(variance, 0.0, None))
+
+
+def _smooth(x: np.ndarray, alpha: float, seed: np.ndarray) -> np.ndarray:
+    # avg[t] = alpha * x[t] + (1 - alpha) * avg[t-1], starting from seed where avg is still NaN
+    out = np.empty(x.shape)
+    avg = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        avg = np.where(np.isnan(avg), seed[:, t], alpha * x[:, t] + (1 - alpha) * avg)
+        out[:, t] = avg
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average (alpha = 2 / (span + 1)) seeded with each row's first value."""
+    return _smooth(x, 2.0 / (span + 1), x)
+
+
+def wilder(x: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's smoothing: seeded with the first full `period` SMA, then alpha = 1 / period."""
+    return _smooth(x, 1.0 / period, sma(x, period))
+
+
+def rsi(close: np.ndarray, period: int = 14, mode: str = "wilder") -> np.ndarray:
+    """Relative Strength Index; mode "sma" matches the rolling-mean RSI of calculate_rsi."""
+    if mode not in RSI_MODES:
+        raise ValueError(f"Unknown RSI mode {mode!r}, expected one of {RSI_MODES}")
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    gain, loss = np.clip(delta, 0, None), -np.clip(delta, None, 0)
+    average = wilder if mode == "wilder" else sma
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = average(gain, period) / average(loss, period)
+        return 100 - 100 / (1 + rs)
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> dict[str, np.ndarray]:
+    """MACD line, its signal line and the histogram between them."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return {"macd": line, "macd_signal": signal_line, "macd_histogram": line - signal_line}
+
+
+def bollinger(close: np.ndarray, window: int = 20, width: float = 2.0) -> dict[str, np.ndarray]:
+    """Bollinger bands and %B (where the close sits between the bands)."""
+    middle = sma(close, window)
+    spread = width * rolling_std(close, window)
+    upper, lower = middle + spread, middle - spread
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_b = (close - lower) / (upper - lower)
+    return {"bollinger_upper": upper, "bollinger_middle": middle, "bollinger_lower": lower,
+            "bollinger_percent_b": percent_b}
+
+
+def volatility(close: np.ndarray, period: int = 14) -> dict[str, np.ndarray]:
+    """ATR-style volatility from closes: Wilder average of absolute close-to-close moves.
+
+    The chart API has no intraday high/low, so the true range reduces to
+    |close[t] - close[t-1]|.
+    """
+    true_range = np.abs(np.diff(close, axis=1, prepend=np.nan))
+    atr = wilder(true_range, period)
+    return {"atr": atr, "atr_percent": 100 * atr / close}
+
+
+def volume_zscore(volume: np.ndarray, window: int = 20) -> np.ndarray:
+    """How many standard deviations each day's volume is from its trailing `window` mean."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (volume - sma(volume, window)) / rolling_std(volume, window)
+
+
+def pack_rows(x: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, tuple[np.ndarray, ...]]:
+    """Move each row's `valid` cells next to each other, ending at the last column.
+
+    Returns the packed array (NaN-padded on the left of shorter rows) and the
+    cell mapping that unpack_rows takes to spread values back.
+    """
+    counts = valid.sum(axis=1)
+    rows, days = np.nonzero(valid)
+    slots = counts.max(initial=0) - counts[rows] + np.cumsum(valid, axis=1)[rows, days] - 1
+    packed = np.full((x.shape[0], counts.max(initial=0)), np.nan)
+    packed[rows, slots] = x[rows, days]
+    return packed, (rows, days, slots)
+
+
+def unpack_rows(packed: np.ndarray, cells: tuple[np.ndarray, ...], shape: tuple[int, ...]) -> np.ndarray:
+    """Inverse of pack_rows: NaN on the cells that were left out."""
+    rows, days, slots = cells
+    out = np.full(shape, np.nan)
+    out[rows, days] = packed[rows, slots]
+    return out
+
+
+def compute_indicators(close: np.ndarray, volume: np.ndarray | None = None, rsi_period: int = 14,
+                       rsi_mode: str = "wilder", sma_windows: tuple[int, ...] = (20, 50, 200),
+                       ema_spans: tuple[int, ...] = (12, 26)) -> dict[str, np.ndarray]:
+    """Every indicator above for all symbols in one pass, keyed by indicator name.
+
+    Each row is computed over its own bars (the days its close is not NaN),
+    so a symbol's values do not depend on the other symbols' dates.
+    """
+    valid = ~np.isnan(close)
+    packed, cells = pack_rows(close, valid)
+    out = {"rsi": rsi(packed, rsi_period, rsi_mode)}
+    out.update({f"sma{w}": sma(packed, w) for w in sma_windows})
+    out.update({f"ema{s}": ema(packed, s) for s in ema_spans})
+    out.update(macd(packed))
+    out.update(bollinger(packed))
+    out.update(volatility(packed))
+    if volume is not None:
+        out["volume_zscore"] = volume_zscore(pack_rows(volume, valid)[0])
+    return {"close": close, **{name: unpack_rows(values, cells, close.shape) for name, values in out.items()}}
+
+
+def latest_values(dates: list[str], indicators: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+    """Each row's indicators on its most recent trading day (None where a value is NaN)."""
+    close = indicators["close"]
+    rows = []
+    for row in range(close.shape[0]):
+        valid = np.flatnonzero(~np.isnan(close[row]))
+        if not len(valid):
+            rows.append({"date": None})
+            continue
+        day = valid[-1]
+        snapshot: dict[str, Any] = {"date": dates[day]}
+        for name, values in indicators.items():
+            value = values[row, day]
+            snapshot[name] = None if np.isnan(value) else round(float(value), 4)
+        rows.append(snapshot)
+    return rows
@@ -0,0 +1,69 @@
+"""Deferred imports of the heavy third-party modules (pandas, NumPy, lxml).
+
+MCP clients start the server as a subprocess per session, and importing
+pandas and NumPy takes longer than everything else the server needs to
+answer `initialize`. Modules that use them bind a stand-in at import time:
+
+    pd = lazy_module("pandas")
+
+and the real import happens on the first attribute read (`pd.DataFrame`),
+i.e. in the first tool call that needs it. After that the stand-in holds a
+copy of the module's namespace, so reads cost what they always did.
+Annotations naming these modules must not be evaluated at import time
+(`from __future__ import annotations`, or quoted ones where FastMCP
+inspects them).
+
+`preload()` imports whatever is still deferred; the server runs it in the
+background shortly after startup. SCREENER_LAZY_IMPORTS=0 imports
+everything up front, as before.
+"""
+from types import ModuleType
+from typing import Any
+import importlib
+import os
+import sys
+
+SCREENER_LAZY_IMPORTS = os.getenv("SCREENER_LAZY_IMPORTS", "1") != "0"
+
+_deferred: dict[str, "LazyModule"] = {}
+
+
+class LazyModule(ModuleType):
+    """Stands in for a module until an attribute is first read from it."""
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(_load(self), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def _load(stand_in: LazyModule) -> ModuleType:
+    # Concurrent first reads are safe: the import system locks per module
+    module = importlib.import_module(stand_in.__name__)
+    stand_in.__dict__.update(module.__dict__)
+    _deferred.pop(stand_in.__name__, None)
+    return module
+
+
+def lazy_module(name: str) -> ModuleType:
+    """`name`, imported on first use (or now, if it already is or SCREENER_LAZY_IMPORTS is off)."""
+    if not SCREENER_LAZY_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    module = _deferred.get(name)
+    if module is None:
+        module = _deferred[name] = LazyModule(name)
+    return module
+
+
+def deferred() -> list[str]:
+    """Names of the modules bound lazily and not imported yet."""
+    return sorted(_deferred)
+
+
+def preload() -> None:
+    """Import every module that is still deferred."""
+    for name in deferred():
+        module = _deferred.get(name)
+        if module is not None:
+            _load(module)
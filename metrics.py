@@ -0,0 +1,264 @@
+"""In-process latency, size and outcome metrics for tools and upstream calls.
+
+Recorded while SCREENER_METRICS is on (the default):
+
+    screener_tool_seconds{tool, outcome}          every MCP tool call
+    screener_upstream_seconds{endpoint, status}   request sent -> body read
+    screener_upstream_bytes{endpoint}             response body size
+    screener_rate_limit_wait_seconds{endpoint}    time spent in the upstream rate limiter
+    screener_parse_seconds{parser}                worker-pool parse jobs, queueing included
+
+Histograms keep fixed bucket counts plus a count and sum, so recording is a
+bisect and three additions. Cache hits/misses, singleflight counters and
+the upstream retry/throttle/circuit counters (upstream.py) are read from
+their modules at export time. Everything is served as JSON by the
+`stats://metrics` MCP resource and as Prometheus text by
+`stats://metrics/prometheus`, and on http://127.0.0.1:<port>/metrics when
+SCREENER_METRICS_PORT is set.
+
+With SCREENER_METRICS=false none of the wrappers are installed at all.
+"""
+from bisect import bisect_left
+from typing import Any, AsyncIterator, Awaitable, Callable
+import asyncio
+import functools
+import logging
+import os
+import time
+
+import httpx
+
+from cache import get_cache
+from singleflight import singleflight_stats
+from upstream import endpoint_of, upstream_stats
+
+SCREENER_METRICS = os.getenv("SCREENER_METRICS", "true").lower() in ("1", "true", "yes")
+SCREENER_METRICS_PORT = int(os.getenv("SCREENER_METRICS_PORT", "0"))
+SCREENER_METRICS_HOST = os.getenv("SCREENER_METRICS_HOST", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 1e7)
+
+class Histogram:
+    """Counts of observations per bucket (upper bounds, plus +Inf), with their count and sum."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else None,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+
+Labels = tuple[tuple[str, str], ...]
+_histograms: dict[str, dict[Labels, Histogram]] = {}
+
+
+def observe(name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels: str) -> None:
+    series = _histograms.setdefault(name, {})
+    key = tuple(labels.items())
+    histogram = series.get(key)
+    if histogram is None:
+        histogram = series[key] = Histogram(buckets)
+    histogram.observe(value)
+
+
+def reset_metrics() -> None:
+    _histograms.clear()
+
+
+def instrument_tools(mcp: Any) -> None:
+    """Time every tool registered through `mcp.tool()` from now on.
+
+    The decorator still returns the undecorated function, so tools calling
+    each other directly are only timed once, as the tool the client called.
+    """
+    if not SCREENER_METRICS:
+        return
+    register = mcp.tool
+
+    def tool(*args: Any, **kwargs: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        decorator = register(*args, **kwargs)
+
+        def wrap(fn: Callable[..., Any]) -> Callable[..., Any]:
+            decorator(timed_tool(kwargs.get("name") or fn.__name__, fn))
+            return fn
+
+        return wrap
+
+    mcp.tool = tool
+
+
+def timed_tool(name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        outcome = "exception"
+        try:
+            result = await fn(*args, **kwargs)
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+            return result
+        finally:
+            observe("screener_tool_seconds", time.perf_counter() - start, tool=name, outcome=outcome)
+
+    return wrapper
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    """Response body that records latency and size once it has been read and closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, endpoint: str, status: int, start: float):
+        self._stream = stream
+        self._endpoint = endpoint
+        self._status = str(status)
+        self._start = start
+        self._bytes = 0
+        self._recorded = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._recorded:
+                self._recorded = True
+                observe("screener_upstream_seconds", time.perf_counter() - self._start,
+                        endpoint=self._endpoint, status=self._status)
+                observe("screener_upstream_bytes", self._bytes, SIZE_BUCKETS, endpoint=self._endpoint)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps the client's transport to time each upstream request and count its bytes."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        endpoint = endpoint_of(request.url.path)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            observe("screener_upstream_seconds", time.perf_counter() - start, endpoint=endpoint, status="failed")
+            raise
+        response.stream = _CountingStream(response.stream, endpoint, response.status_code, start)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def metrics_snapshot() -> dict[str, Any]:
+    """Every histogram's summary, plus cache hit ratios, singleflight and upstream governance counters."""
+    cache = get_cache().stats()
+    datasets = {name: {**s, "hit_ratio": s["hits"] / (s["hits"] + s["misses"]) if s["hits"] + s["misses"] else None}
+                for name, s in cache["datasets"].items()}
+    return {
+        "enabled": SCREENER_METRICS,
+        "histograms": {name: [{**dict(labels), **h.snapshot()} for labels, h in series.items()]
+                       for name, series in _histograms.items()},
+        "cache": {**cache, "datasets": datasets},
+        "coalescing": singleflight_stats(),
+        "upstream": upstream_stats(),
+    }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, series in sorted(_histograms.items()):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, h in series.items():
+            cumulative = 0
+            for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=str(bound))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+    cache = get_cache().stats()
+    for field in ("hits", "misses", "sets"):
+        lines.append(f"# TYPE screener_cache_{field}_total counter")
+        for dataset, stats in sorted(cache["datasets"].items()):
+            lines.append(f"screener_cache_{field}_total{_labels((('dataset', dataset),))} {stats[field]}")
+    lines.append("# TYPE screener_cache_memory_bytes gauge")
+    lines.append(f"screener_cache_memory_bytes {cache['memory']['bytes']}")
+    for field in ("executed", "coalesced"):
+        lines.append(f"# TYPE screener_singleflight_{field}_total counter")
+        for group, stats in sorted(singleflight_stats().items()):
+            lines.append(f"screener_singleflight_{field}_total{_labels((('group', group),))} {stats[field]}")
+    upstream = upstream_stats()
+    for field in ("retries", "throttled", "failures", "rejected"):
+        lines.append(f"# TYPE screener_upstream_{field}_total counter")
+        for endpoint, stats in sorted(upstream.items()):
+            lines.append(f"screener_upstream_{field}_total{_labels((('endpoint', endpoint),))} {stats.get(field, 0)}")
+    lines.append("# TYPE screener_upstream_rate gauge")
+    for endpoint, stats in sorted(upstream.items()):
+        if "rate" in stats:
+            lines.append(f"screener_upstream_rate{_labels((('endpoint', endpoint),))} {stats['rate']}")
+    lines.append("# TYPE screener_circuit_open gauge")
+    for endpoint, stats in sorted(upstream.items()):
+        if "circuit" in stats:
+            lines.append(f"screener_circuit_open{_labels((('endpoint', endpoint),))} {int(stats['circuit'] == 'open')}")
+    return "\n".join(lines) + "\n"
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass  # skip headers
+        if request_line.split(b" ")[1:2] == [b"/metrics"]:
+            status, body = "200 OK", prometheus_text().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int = SCREENER_METRICS_PORT,
+                               host: str = SCREENER_METRICS_HOST) -> asyncio.AbstractServer | None:
+    """Serve GET /metrics on `port` (nothing if metrics are off or the port is 0)."""
+    if not SCREENER_METRICS or not port:
+        return None
+    server = await asyncio.start_server(_serve_metrics, host, port)
+    logging.info(f"Prometheus metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,125 @@
+"""Off-loop HTML parsing for Screener.in pages.
+
+Parsing a company page with lxml takes long enough to stall every other
+tool call if it runs on the event loop, so parsers are run in a bounded
+worker pool instead. SCREENER_PARSE_POOL picks "thread" (default) or
+"process" and SCREENER_PARSE_WORKERS caps the number of workers.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+import asyncio
+import os
+import time
+
+from lazy_import import lazy_module, preload
+from metrics import SCREENER_METRICS, observe
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+lxml_html = lazy_module("lxml.html")
+
+SCREENER_PARSE_POOL = os.getenv("SCREENER_PARSE_POOL", "thread")
+SCREENER_PARSE_WORKERS = int(os.getenv("SCREENER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Executor | None = None
+
+
+def get_parse_pool() -> Executor:
+    global _executor
+    if _executor is None:
+        if SCREENER_PARSE_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=SCREENER_PARSE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=SCREENER_PARSE_WORKERS, thread_name_prefix="screener-parse")
+    return _executor
+
+
+def warm_parse_pool() -> None:
+    """Start the pool's workers ahead of the first parse, each with the parsing modules imported."""
+    pool = get_parse_pool()
+    # Submitted together, so a process pool starts a worker for each
+    for future in [pool.submit(preload) for _ in range(SCREENER_PARSE_WORKERS)]:
+        future.result()
+
+
+def shutdown_parse_pool() -> None:
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_parser(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a (picklable, module-level) parser in the worker pool and await its result."""
+    if not SCREENER_METRICS:
+        return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), fn, *args)
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), fn, *args)
+    finally:
+        observe("screener_parse_seconds", time.perf_counter() - start, parser=fn.__name__)
+
+
+# Where each fundamentals table lives on a company page: the id of its
+# enclosing section/div, and the index name the table is returned under.
+SECTIONS = {
+    "quarterly_results": ("quarters", "Quarter"),
+    "profit_loss": ("profit-loss", "Profit & Loss"),
+    "balance_sheet": ("balance-sheet", "Balance Sheet"),
+    "cash_flow": ("cash-flow", "Cash Flow"),
+    "ratios": ("ratios", "Ratios"),
+    "shareholding_pattern_quarterly": ("quarterly-shp", "Shareholding Pattern Quarterly"),
+    "shareholding_pattern_yearly": ("yearly-shp", "Shareholding Pattern Yearly"),
+}
+
+_NOT_NUMERIC = str.maketrans("", "", ",%\u20b9 \xa0")
+
+
+def _number(text: str) -> float:
+    """"1,263" -> 1263.0, "24.81%" -> 24.81, blank or non-numeric -> NaN."""
+    try:
+        return float(text.translate(_NOT_NUMERIC))
+    except ValueError:
+        return np.nan
+
+
+def _label(cell: lxml_html.HtmlElement) -> str:
+    # Expandable rows render as "Sales&nbsp;+" buttons; keep just the label
+    return cell.text_content().replace("\xa0", " ").strip().removesuffix("+").strip()
+
+
+def _table_frame(table: lxml_html.HtmlElement, name: str) -> pd.DataFrame:
+    header = [th.text_content().strip() for th in table.xpath("./thead/tr/th | ./tr[1]/th")][1:]
+    rows = [tr for tr in table.xpath("./tbody/tr | ./tr") if tr.find("td") is not None]
+    values = np.full((len(rows), len(header)), np.nan)
+    labels = []
+    for i, tr in enumerate(rows):
+        cells = tr.findall("td")
+        labels.append(_label(cells[0]))
+        for j, td in enumerate(cells[1:len(header) + 1]):
+            values[i, j] = _number(td.text_content())
+    return pd.DataFrame(values, index=pd.Index(labels, name=name), columns=header)
+
+
+def extract_tables(html: str | lxml_html.HtmlElement,
+                   sections: Iterable[str] = SECTIONS) -> dict[str, pd.DataFrame]:
+    """Parse the requested fundamentals tables (keys of SECTIONS) out of a company page.
+
+    Each table is found through its section anchor rather than its position
+    on the page, and cells are parsed straight into floats. A section missing
+    from the page comes back as an empty frame.
+    """
+    tree = lxml_html.fromstring(html) if isinstance(html, str) else html
+    tables = {}
+    for section in sections:
+        anchor, name = SECTIONS[section]
+        found = tree.xpath(f'//*[@id="{anchor}"]//table[contains(concat(" ", normalize-space(@class), " "), " data-table ")]')
+        tables[section] = _table_frame(found[0], name) if found else pd.DataFrame(index=pd.Index([], name=name))
+    return tables
+
+
+def parse_stock_tables(html: str | lxml_html.HtmlElement) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Parse the seven fundamentals tables out of a company page."""
+    return tuple(extract_tables(html).values())
@@ -0,0 +1,214 @@
+"""Incremental local store of daily chart series, one file per company.
+
+The chart API only ever returns whole windows, so re-reading a year of bars
+to pick up the latest one wastes most of each request. The store keeps every
+daily bar it has seen for a company (Price, DMA50, DMA200, Volume and
+delivery %) as NumPy columns in `<company_id>.npz`, plus the first date it is
+complete from and when it was last refreshed. A read then:
+
+- serves any `days` window straight from the file while it is fresh (the
+  "chart" TTL), and also within the "chart" stale grace period while it is
+  updated in the background,
+- otherwise fetches only the days since the last bar held plus a short
+  overlap (SCREENER_PRICE_OVERLAP_DAYS) and merges them in, newer values
+  winning,
+- when asked for history older than it holds, fetches that one window once.
+
+So windows longer than any single request become available as the store
+grows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any
+import asyncio
+import json
+import os
+import time
+
+from cache import SCREENER_CACHE_DIR, freshness, revalidate, stale_for, ttl_for
+from indicators import is_weekly
+from lazy_import import lazy_module
+from screener_api import fetch_chart
+from singleflight import get_group
+
+np = lazy_module("numpy")
+
+SCREENER_PRICE_STORE_DIR = os.getenv("SCREENER_PRICE_STORE_DIR", os.path.join(SCREENER_CACHE_DIR, "prices"))
+SCREENER_PRICE_OVERLAP_DAYS = int(os.getenv("SCREENER_PRICE_OVERLAP_DAYS", "5"))
+
+# Metrics held in the store; chart queries for anything else go straight to the API
+STORED_METRICS = ("Price", "DMA50", "DMA200", "Volume")
+FULL_QUERY = "-".join(STORED_METRICS)
+
+
+@dataclass
+class PriceSeries:
+    """Daily bars for one company, as parallel columns sorted by date."""
+
+    dates: np.ndarray                 # datetime64[D]
+    columns: dict[str, np.ndarray]    # STORED_METRICS plus "Delivery", NaN where missing
+    labels: dict[str, str]
+    complete_from: date               # no bars are missing from this date on
+    fetched_at: float
+
+    @property
+    def last_date(self) -> date | None:
+        return self.dates[-1].astype(date) if len(self.dates) else None
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any], complete_from: date) -> "PriceSeries":
+        datasets = {d["metric"]: d for d in payload.get("datasets", [])}
+        days = sorted({v[0] for d in datasets.values() for v in d["values"]})
+        position = {day: i for i, day in enumerate(days)}
+        columns = {name: np.full(len(days), np.nan) for name in (*STORED_METRICS, "Delivery")}
+        for metric in STORED_METRICS:
+            for value in datasets.get(metric, {}).get("values", []):
+                i = position[value[0]]
+                columns[metric][i] = float(value[1])
+                extra = value[2] if metric == "Volume" and len(value) > 2 and isinstance(value[2], dict) else {}
+                if isinstance(extra.get("delivery"), (int, float)):
+                    columns["Delivery"][i] = float(extra["delivery"])
+        labels = {metric: d.get("label", metric) for metric, d in datasets.items()}
+        return cls(np.array(days, dtype="datetime64[D]"), columns, labels, complete_from, time.time())
+
+    def merge(self, newer: "PriceSeries") -> "PriceSeries":
+        """Union of both series' dates; where both have a bar, `newer` wins."""
+        dates = np.union1d(self.dates, newer.dates)
+        columns = {}
+        for name, old_values in self.columns.items():
+            values = np.full(len(dates), np.nan)
+            values[np.searchsorted(dates, self.dates)] = old_values
+            new_values = newer.columns[name]
+            present = ~np.isnan(new_values)
+            values[np.searchsorted(dates, newer.dates[present])] = new_values[present]
+            columns[name] = values
+        complete_from = min(self.complete_from, newer.complete_from)
+        return PriceSeries(dates, columns, {**self.labels, **newer.labels}, complete_from, newer.fetched_at)
+
+    def to_payload(self, metrics: list[str], days: int, today: date) -> dict[str, Any]:
+        """Chart API shaped payload for the last `days` days up to `today`."""
+        keep = self.dates > np.datetime64(today - timedelta(days=days), "D")
+        dates = [str(d) for d in self.dates[keep]]
+        datasets = []
+        for metric in metrics:
+            values = self.columns[metric][keep]
+            present = ~np.isnan(values)
+            if metric == "Volume":
+                delivery = self.columns["Delivery"][keep]
+                rows = [[d, int(v)] + ([] if np.isnan(dv) else [{"delivery": int(dv)}])
+                        for d, v, dv, ok in zip(dates, values, delivery, present) if ok]
+            else:
+                rows = [[d, float(v)] for d, v, ok in zip(dates, values, present) if ok]
+            datasets.append({"metric": metric, "label": self.labels.get(metric, metric), "values": rows,
+                             "meta": {"is_weekly": False}})
+        return {"datasets": datasets}
+
+
+class PriceStore:
+    """Directory of per-company .npz series files."""
+
+    def __init__(self, directory: str = SCREENER_PRICE_STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, company_id: str, consolidated: bool) -> str:
+        suffix = "" if consolidated else "-standalone"
+        return os.path.join(self.directory, f"{company_id}{suffix}.npz")
+
+    def load(self, company_id: str, consolidated: bool = True) -> PriceSeries | None:
+        try:
+            with np.load(self._path(company_id, consolidated)) as f:
+                meta = json.loads(str(f["meta"]))
+                columns = {name: f[f"col_{name}"] for name in (*STORED_METRICS, "Delivery")}
+                return PriceSeries(f["dates"], columns, meta["labels"],
+                                   date.fromisoformat(meta["complete_from"]), meta["fetched_at"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, company_id: str, series: PriceSeries, consolidated: bool = True) -> None:
+        path = self._path(company_id, consolidated)
+        meta = {"labels": series.labels, "complete_from": series.complete_from.isoformat(),
+                "fetched_at": series.fetched_at, "last_date": str(series.last_date)}
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, dates=series.dates, meta=np.array(json.dumps(meta)),
+                 **{f"col_{name}": values for name, values in series.columns.items()})
+        # Readers never see a half-written file
+        os.replace(tmp, path)
+
+
+_store: PriceStore | None = None
+
+
+def get_price_store() -> PriceStore:
+    global _store
+    if _store is None:
+        _store = PriceStore()
+    return _store
+
+
+def configure_price_store(directory: str) -> PriceStore:
+    """Point the process-wide store at another directory (tests, alternate deployments)."""
+    global _store
+    _store = PriceStore(directory)
+    return _store
+
+
+async def _fetch(company_id: str, days: int, consolidated: bool) -> PriceSeries | None:
+    payload = await fetch_chart(company_id, FULL_QUERY, days, consolidated)
+    if is_weekly(payload):
+        # Long windows can come back as weekly bars, which can't be merged with daily ones
+        return None
+    return PriceSeries.from_payload(payload, date.today() - timedelta(days=days - 1))
+
+
+async def _update(company_id: str, days: int, consolidated: bool) -> PriceSeries | None:
+    store = get_price_store()
+    series = await asyncio.to_thread(store.load, company_id, consolidated)
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    ttl = ttl_for("chart")
+    state = "miss" if series is None else freshness(series.fetched_at + ttl, series.fetched_at + ttl + stale_for("chart"),
+                                                    ttl=ttl)
+
+    if series is None or series.last_date is None:
+        update = await _fetch(company_id, days, consolidated)
+    elif start < series.complete_from:
+        # Older history than the store holds: one request covering the whole window
+        update = await _fetch(company_id, days, consolidated)
+    elif state == "fresh":
+        return series
+    elif state == "stale":
+        revalidate(f"price_store:{company_id}:{consolidated}", lambda: _update(company_id, days, consolidated))
+        return series
+    else:
+        # Only the days since the last bar, re-reading a few held ones in case they were revised
+        tail = (today - series.last_date).days + SCREENER_PRICE_OVERLAP_DAYS
+        update = await _fetch(company_id, tail, consolidated)
+        if update is not None:
+            update.complete_from = series.complete_from
+
+    if update is None:
+        return None
+    series = update if series is None else series.merge(update)
+    await asyncio.to_thread(store.save, company_id, series, consolidated)
+    return series
+
+
+async def get_price_series(company_id: str, query: str = FULL_QUERY, days: int = 365,
+                           consolidated: bool = True) -> dict[str, Any]:
+    """Chart API payload for `query` over the last `days` days, served from the store.
+
+    Queries for metrics the store doesn't hold (and weekly windows) are passed
+    through to the chart API. Raises what fetch_chart raises.
+    """
+    metrics = query.split("-")
+    if not all(metric in STORED_METRICS for metric in metrics):
+        return await fetch_chart(company_id, query, days, consolidated)
+    # Concurrent reads of the same window share one refresh
+    series = await get_group("price_store").do(
+        (company_id, consolidated, days), lambda: _update(company_id, days, consolidated))
+    if series is None:
+        return await fetch_chart(company_id, query, days, consolidated)
+    return series.to_payload(metrics, days, date.today())
@@ -0,0 +1,55 @@
+"""Token-bucket rate limiting for outgoing Screener.in requests."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `burst`.
+
+    Callers that find the bucket empty reserve a future token (the balance
+    goes negative) and sleep until it is theirs, so waiters are served in
+    arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now."""
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the time waited."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate; tokens accrued so far are kept."""
+        self._refill()
+        self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """Hold the next acquisition back for at least `seconds` (e.g. a Retry-After)."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
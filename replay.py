@@ -0,0 +1,115 @@
+"""Record/replay transport: run the server against stored Screener.in responses.
+
+In "record" mode every request is passed to the real transport and its
+response saved in SCREENER_REPLAY_DIR. In "replay" mode responses come only
+from that directory, so tests and benchmarks need no network access (and no
+session cookies); a request with no recording fails with ReplayMissError.
+
+    SCREENER_REPLAY_MODE=replay     # or "record"; unset (default) talks to the site
+    SCREENER_REPLAY_DIR=benchmarks/fixtures/replay
+
+Each response is one gzipped JSON file named after its request. Requests are
+matched on method, path and query string; headers and form bodies (cookies,
+CSRF tokens) are ignored, so recordings made with one session replay under
+any other.
+"""
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import httpx
+
+SCREENER_REPLAY_MODE = os.getenv("SCREENER_REPLAY_MODE", "")
+SCREENER_REPLAY_DIR = os.getenv("SCREENER_REPLAY_DIR", os.path.join("benchmarks", "fixtures", "replay"))
+REPLAY_MODES = ("record", "replay")
+
+# Response headers worth keeping; the rest (dates, cookies, caching) only add noise to fixtures
+KEPT_HEADERS = ("content-type", "content-disposition", "location")
+
+
+class ReplayMissError(httpx.TransportError):
+    """No recorded response for a request in replay mode."""
+
+
+def request_key(request: httpx.Request) -> str:
+    query = urlencode(sorted(parse_qsl(request.url.query.decode(), keep_blank_values=True)))
+    return f"{request.method} {request.url.path}" + (f"?{query}" if query else "")
+
+
+def fixture_name(key: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", key).strip("_")[:80]
+    return f"{slug}-{hashlib.sha1(key.encode()).hexdigest()[:10]}.json.gz"
+
+
+def _is_text(content_type: str) -> bool:
+    # Match on the media type's suffix: the xlsx type merely contains "xml" ("openxmlformats")
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith(("json", "xml"))
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves responses from (and in "record" mode, saves them to) a fixture directory."""
+
+    def __init__(self, directory: str = SCREENER_REPLAY_DIR, mode: str = "replay",
+                 transport: httpx.AsyncBaseTransport | None = None):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}, expected one of {REPLAY_MODES}")
+        if mode == "record" and transport is None:
+            raise ValueError("Recording needs the transport to record from")
+        self.directory = directory
+        self.mode = mode
+        self._transport = transport
+        self.recorded: set[str] = set()
+        self.replayed: set[str] = set()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, fixture_name(key))
+
+    def load(self, key: str) -> dict[str, Any] | None:
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, response: httpx.Response) -> None:
+        content_type = response.headers.get("content-type", "")
+        body = ({"text": response.content.decode(response.encoding or "utf-8")} if _is_text(content_type)
+                else {"base64": base64.b64encode(response.content).decode()})
+        entry = {"request": key, "status": response.status_code,
+                 "headers": {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}, **body}
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        # mtime=0 keeps re-recordings of unchanged responses byte-identical
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(entry, indent=0, sort_keys=True).encode())
+        os.replace(tmp, self._path(key))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == "record":
+            response = await self._transport.handle_async_request(request)
+            content = await response.aread()
+            await response.aclose()
+            # The body is already decoded, so only the descriptive headers carry over
+            headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+            response = httpx.Response(response.status_code, headers=headers, content=content, request=request)
+            self.save(key, response)
+            self.recorded.add(key)
+            return response
+        entry = self.load(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded response for {key} in {self.directory}", request=request)
+        self.replayed.add(key)
+        content = entry["text"].encode() if "text" in entry else base64.b64decode(entry["base64"])
+        return httpx.Response(entry["status"], headers=entry["headers"], content=content, request=request)
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
@@ -0,0 +1,273 @@
+"""Downloaded Excel reports on disk: their manifest and a reader for their data.
+
+Screener's export workbook has a "Data Sheet" holding the raw P&L,
+quarterly results, balance sheet and cash flow, usually with more history
+than the company page shows. read_report turns those blocks into the same
+per-section frames parsing.extract_tables builds from HTML (values are
+floats, columns are "Mar 2024" style period labels). Rows are laid out as
+on the company page (PAGE_ROWS): workbook labels are renamed ("Net profit"
+is "Net Profit", the two "Total" rows of the balance sheet are "Total
+Liabilities" and "Total Assets"), the page's derived rows (Operating
+Profit, OPM %, Tax %, EPS in Rs, Dividend Payout %) are computed from the
+raw ones, and rows the page doesn't show are dropped. A section reads the
+same whichever source it came from; only the periods differ.
+
+Reading needs the optional openpyxl package; without it, reports are
+simply not used as a data source.
+
+Bulk-ingest a folder of reports, with no network traffic:
+
+    python report_store.py --dir reports
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Iterable
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from cache import get_cache, ttl_for
+from lazy_import import lazy_module
+from parsing import SECTIONS, run_parser
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+SCREENER_REPORTS_DIR = os.getenv("SCREENER_REPORTS_DIR", "./reports")
+
+# "Data Sheet" block headings -> fundamentals section
+REPORT_SECTIONS = {
+    "PROFIT & LOSS": "profit_loss",
+    "Quarters": "quarterly_results",
+    "BALANCE SHEET": "balance_sheet",
+    "CASH FLOW:": "cash_flow",
+}
+
+
+# Rows of each section on the company page, in page order
+_INCOME_ROWS = ["Sales", "Expenses", "Operating Profit", "OPM %", "Other Income", "Interest", "Depreciation",
+                "Profit before tax", "Tax %", "Net Profit", "EPS in Rs"]
+PAGE_ROWS = {
+    "quarterly_results": _INCOME_ROWS,
+    "profit_loss": _INCOME_ROWS + ["Dividend Payout %"],
+    "balance_sheet": ["Equity Capital", "Reserves", "Borrowings", "Other Liabilities", "Total Liabilities",
+                      "Fixed Assets", "CWIP", "Investments", "Other Assets", "Total Assets"],
+    "cash_flow": ["Cash from Operating Activity", "Cash from Investing Activity", "Cash from Financing Activity",
+                  "Net Cash Flow"],
+}
+# Workbook label -> page label
+REPORT_LABELS = {
+    "Net profit": "Net Profit",
+    "Equity Share Capital": "Equity Capital",
+    "Net Block": "Fixed Assets",
+    "Capital Work in Progress": "CWIP",
+}
+# The balance sheet block totals liabilities, then assets, under the same label
+BALANCE_SHEET_TOTALS = ["Total Liabilities", "Total Assets"]
+
+
+def _openpyxl_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ReportManifest:
+    """symbol -> {path, bytes, downloaded_at} for the reports in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "manifest.json")
+        self._lock = asyncio.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries: dict[str, dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def fresh(self, symbol: str, ttl: float) -> dict[str, Any] | None:
+        """The manifest entry for `symbol` if its file exists and is younger than `ttl` seconds."""
+        entry = self.entries.get(symbol)
+        if entry and time.time() - entry["downloaded_at"] < ttl and os.path.exists(entry["path"]):
+            return entry
+        return None
+
+    async def record(self, symbol: str, path: str, size: int, downloaded_at: float | None = None) -> dict[str, Any]:
+        entry = self.entries[symbol] = {"path": path, "bytes": size, "downloaded_at": downloaded_at or time.time()}
+        os.makedirs(self.directory, exist_ok=True)
+        async with self._lock:
+            # Snapshot in the loop, write in a thread, one writer at a time
+            await asyncio.to_thread(_write_atomically, self.path, json.dumps(self.entries, indent=1).encode())
+        return entry
+
+
+def _write_atomically(path: str, payload: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+_manifests: dict[str, ReportManifest] = {}
+
+
+def get_manifest(directory: str | None = None) -> ReportManifest:
+    """Manifest of `directory` (SCREENER_REPORTS_DIR by default)."""
+    directory = os.path.abspath(directory or SCREENER_REPORTS_DIR)
+    if directory not in _manifests:
+        _manifests[directory] = ReportManifest(directory)
+    return _manifests[directory]
+
+
+def _period(value: Any) -> str:
+    return f"{value:%b %Y}" if isinstance(value, (date, datetime)) else str(value)
+
+
+def _page_labels(section: str, labels: list[str]) -> list[str]:
+    totals = iter(BALANCE_SHEET_TOTALS if section == "balance_sheet" else [])
+    return [next(totals, label) if label == "Total" else REPORT_LABELS.get(label, label) for label in labels]
+
+
+def page_layout(section: str, table: pd.DataFrame, shares: float | None = None) -> pd.DataFrame:
+    """A section read from the workbook, with the company page's rows (see PAGE_ROWS).
+
+    `table` is indexed by page labels. Rows the page derives are computed
+    when the workbook lacks them; EPS needs the number of shares.
+    """
+    name = table.index.name
+    rows = {label: values for label, values in table[~table.index.duplicated()].iterrows()}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "Operating Profit" not in rows and {"Profit before tax", "Interest", "Depreciation"} <= set(rows):
+            rows["Operating Profit"] = (rows["Profit before tax"] + rows["Interest"] + rows["Depreciation"]
+                                        - rows.get("Other Income", 0.0))
+        if "Sales" in rows and "Operating Profit" in rows:
+            rows.setdefault("Expenses", rows["Sales"] - rows["Operating Profit"])
+            rows["OPM %"] = rows["Operating Profit"] / rows["Sales"] * 100
+        if {"Tax", "Profit before tax"} <= set(rows):
+            rows["Tax %"] = rows["Tax"] / rows["Profit before tax"] * 100
+        if "Net Profit" in rows and shares:
+            # Rs crore over a share count
+            rows["EPS in Rs"] = rows["Net Profit"] * 1e7 / shares
+        if {"Net Profit", "Dividend Amount"} <= set(rows):
+            rows["Dividend Payout %"] = rows["Dividend Amount"] / rows["Net Profit"] * 100
+    labels = [label for label in PAGE_ROWS.get(section, rows) if label in rows]
+    frame = pd.DataFrame([rows[label] for label in labels], index=pd.Index(labels, name=name), columns=table.columns)
+    return frame.round(2)
+
+
+def read_report(path: str, sections: Iterable[str] = REPORT_SECTIONS.values()) -> dict[str, pd.DataFrame]:
+    """Fundamentals frames for the requested sections found in a report's Data Sheet.
+
+    Sections the workbook doesn't carry are left out of the result.
+    """
+    from openpyxl import load_workbook
+
+    wanted = set(sections)
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        section = None
+        periods: list[str] = []
+        labels: list[str] = []
+        rows: list[list[float]] = []
+        blocks: dict[str, pd.DataFrame] = {}
+        shares = None
+
+        def close_block() -> None:
+            if section in wanted and labels:
+                values = np.array(rows, dtype=float).reshape(len(labels), len(periods))
+                index = pd.Index(_page_labels(section, labels), name=SECTIONS[section][1])
+                blocks[section] = pd.DataFrame(values, index=index, columns=periods)
+
+        for row in workbook["Data Sheet"].iter_rows(values_only=True):
+            head = row[0] if row else None
+            head = (head.strip() or None) if isinstance(head, str) else head
+            if head in REPORT_SECTIONS:
+                close_block()
+                section, periods, labels, rows = REPORT_SECTIONS[head], [], [], []
+            elif section is None:
+                if head == "Number of shares" and isinstance(row[1], (int, float)):
+                    shares = float(row[1])
+                continue
+            elif head == "Report Date":
+                cells = [c for c in row[1:] if c is not None]
+                periods = [_period(c) for c in cells]
+            elif head is None or not periods:
+                # A blank row ends the block
+                close_block()
+                section = None
+            else:
+                labels.append(str(head))
+                cells = row[1:len(periods) + 1]
+                rows.append([c if isinstance(c, (int, float)) else np.nan for c in cells]
+                            + [np.nan] * (len(periods) - len(cells)))
+        close_block()
+    finally:
+        workbook.close()
+    return {section: page_layout(section, table, shares) for section, table in blocks.items()}
+
+
+def fresh_report(symbol: str, directory: str | None = None) -> str | None:
+    """Path of a fresh downloaded report for `symbol` that can be read, if there is one."""
+    if not _openpyxl_available():
+        return None
+    entry = get_manifest(directory).fresh(symbol.strip().upper(), ttl_for("report"))
+    return entry["path"] if entry else None
+
+
+async def read_report_sections(symbol: str, sections: Iterable[str],
+                               directory: str | None = None) -> dict[str, pd.DataFrame]:
+    """Requested sections available from `symbol`'s fresh report (empty if there is none or it can't be read)."""
+    wanted = tuple(s for s in sections if s in REPORT_SECTIONS.values())
+    path = fresh_report(symbol, directory) if wanted else None
+    if path is None:
+        return {}
+    try:
+        return await run_parser(read_report, path, wanted)
+    except Exception as e:
+        logging.info(f"Could not read report {path}, falling back to the company page: {e}")
+        return {}
+
+
+async def ingest_reports(directory: str | None = None) -> dict[str, str]:
+    """Index every <SYMBOL>.xlsx in `directory` and load its sections into the fundamentals cache.
+
+    Files the manifest doesn't know yet are registered with their modification
+    time as download time. Returns symbol -> "ok" or why it was skipped.
+    """
+    manifest = get_manifest(directory)
+    cache = get_cache()
+    status = {}
+    for name in sorted(os.listdir(manifest.directory)) if os.path.isdir(manifest.directory) else []:
+        if not name.endswith(".xlsx"):
+            continue
+        symbol, path = name[:-len(".xlsx")].upper(), os.path.join(manifest.directory, name)
+        try:
+            tables = await run_parser(read_report, path)
+        except Exception as e:
+            status[symbol] = f"error: {e}"
+            continue
+        if symbol not in manifest.entries:
+            await manifest.record(symbol, path, os.path.getsize(path), os.path.getmtime(path))
+        remaining = ttl_for("report") - (time.time() - manifest.entries[symbol]["downloaded_at"])
+        if remaining <= 0:
+            status[symbol] = "stale, not loaded (older than the report TTL)"
+            continue
+        for section, table in tables.items():
+            await cache.set("fundamentals", f"{symbol}:{section}", table, ttl=remaining)
+        status[symbol] = "ok"
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load downloaded Excel reports into the local fundamentals dataset")
+    parser.add_argument("--dir", default=None, help="reports directory (default SCREENER_REPORTS_DIR)")
+    args = parser.parse_args()
+    for symbol, result in asyncio.run(ingest_reports(args.dir)).items():
+        print(f"{symbol}: {result}")
@@ -0,0 +1,75 @@
+"""Excel report downloads (Screener's "Export to Excel") with an on-disk artifact cache.
+
+Reports are streamed to a temporary file next to their destination and
+renamed into place once complete, so `<symbol>.xlsx` is never half-written.
+A manifest (`manifest.json` in the reports directory) records when each
+report was downloaded: a report younger than the "report" TTL is served from
+disk instead of downloaded again. Because the manifest is updated after
+every report, re-running an interrupted bulk download picks up where it
+stopped. Reading the downloaded workbooks back is report_store's job.
+"""
+from typing import Any, Awaitable, Callable
+import logging
+import os
+import tempfile
+
+from batch import run_batch
+from cache import ttl_for
+from http_client import data, get_client
+from report_store import get_manifest
+from symbol_index import normalize_symbol, resolve_company
+
+# Every .xlsx is a zip archive; anything else is usually the login page
+XLSX_MAGIC = b"PK\x03\x04"
+
+
+async def _stream_to(path: str, url: str) -> int:
+    """POST the export form and stream the body into `path`; returns its size."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async with get_client().stream("POST", url, data=data) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    if size == 0 and not chunk.startswith(XLSX_MAGIC):
+                        raise ValueError("response is not an Excel workbook, check the Screener.in session cookies")
+                    f.write(chunk)
+                    size += len(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return size
+
+
+async def fetch_report(symbol: str, directory: str | None = None, force: bool = False) -> dict[str, Any]:
+    """Download one symbol's report unless a fresh copy is on disk.
+
+    `directory` defaults to SCREENER_REPORTS_DIR. Returns {"symbol", "path",
+    "bytes", "downloaded_at", "cached"}. Raises
+    httpx.HTTPError or ValueError if the download fails.
+    """
+    symbol = normalize_symbol(symbol)
+    manifest = get_manifest(directory)
+    entry = None if force else manifest.fresh(symbol, ttl_for("report"))
+    if entry is not None:
+        return {"symbol": symbol, **entry, "cached": True}
+    ids = await resolve_company(symbol)
+    os.makedirs(manifest.directory, exist_ok=True)
+    path = os.path.join(manifest.directory, f"{symbol}.xlsx")
+    size = await _stream_to(path, f"/user/company/export/{ids.warehouse_id}/")
+    logging.info(f"Excel file created for: {symbol}")
+    return {"symbol": symbol, **await manifest.record(symbol, path, size), "cached": False}
+
+
+async def fetch_reports(symbols: list[str], directory: str | None = None, concurrency: int | None = None,
+                        force: bool = False,
+                        progress: Callable[[int, int], Awaitable[None]] | None = None) -> dict[str, Any]:
+    """fetch_report for many symbols at once; per-symbol failures are listed under "errors"."""
+    outcome = await run_batch(symbols, lambda s: fetch_report(s, directory, force), concurrency, progress)
+    reports = outcome["results"].values()
+    outcome["downloaded"] = sum(not r["cached"] for r in reports)
+    outcome["cached"] = sum(r["cached"] for r in reports)
+    outcome["results"] = {symbol: r["path"] for symbol, r in outcome["results"].items()}
+    return outcome
@@ -0,0 +1,204 @@
+"""Background refresher that keeps a watchlist of symbols warm.
+
+The watchlist lives in a JSON file (SCREENER_WATCHLIST_FILE) and can be
+edited there or through the `update_watchlist` tool:
+
+    {"symbols": ["WIPRO", "TCS", "INFY"], "interval": 1800}
+
+Every `interval` seconds each symbol's resolved IDs, company page,
+fundamentals tables and daily price series are refreshed, so queries about
+them are answered from the cache. A cycle gives each symbol an equal slot
+of the interval and refreshes it at a random point in its slot, so the
+requests trickle out instead of arriving at Screener as a burst. Refreshes
+run inside cache.refreshing(ahead=interval): anything that would go stale
+before the symbol's next turn is fetched again, anything fresher is kept.
+The file is re-read at the start of every cycle; while it cannot be parsed
+the last good watchlist is kept (an empty one at startup). With several server
+processes sharing a cache (serve.py) only one of them runs the refresher:
+SCREENER_WATCHLIST_REFRESH=false turns it off in the others.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Any
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from cache import refreshing
+from company_page import get_company_page, get_sections
+from price_store import get_price_series
+from symbol_index import normalize_symbol, resolve_company
+
+SCREENER_WATCHLIST_FILE = os.getenv("SCREENER_WATCHLIST_FILE", "watchlist.json")
+SCREENER_WATCHLIST_INTERVAL = float(os.getenv("SCREENER_WATCHLIST_INTERVAL", "1800"))
+# Whether this process runs the background refresher
+SCREENER_WATCHLIST_REFRESH = os.getenv("SCREENER_WATCHLIST_REFRESH", "true").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class Watchlist:
+    symbols: list[str] = field(default_factory=list)
+    interval: float = SCREENER_WATCHLIST_INTERVAL
+
+    @classmethod
+    def load(cls, path: str) -> "Watchlist":
+        """The watchlist in `path`; empty if the file does not exist.
+
+        Raises ValueError if the file is not JSON or not shaped like
+        {"symbols": [str, ...], "interval": seconds > 0}.
+        """
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if not isinstance(saved, dict):
+            raise ValueError(f"Expected a JSON object, got {type(saved).__name__}")
+        symbols = saved.get("symbols", [])
+        if not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols):
+            raise ValueError(f"symbols must be a list of strings, got {symbols!r}")
+        interval = saved.get("interval", SCREENER_WATCHLIST_INTERVAL)
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) or not interval > 0:
+            raise ValueError(f"interval must be a positive number of seconds, got {interval!r}")
+        return cls(list(dict.fromkeys(normalize_symbol(s) for s in symbols)), float(interval))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+        os.replace(tmp, path)
+
+
+async def warm_symbol(symbol: str, ahead: float = 0.0) -> None:
+    """Refresh whatever of a symbol's cached data would go stale within `ahead` seconds."""
+    with refreshing(ahead):
+        ids = await resolve_company(symbol)
+        await get_company_page(symbol)
+        await get_sections(symbol)
+        await get_price_series(ids.company_id)
+
+
+class WatchlistScheduler:
+    """Refreshes the watchlist symbols one at a time, spread over each interval."""
+
+    def __init__(self, path: str = SCREENER_WATCHLIST_FILE):
+        self.path = path
+        self.watchlist = Watchlist()
+        self.load_error: str | None = None
+        self.watchlist = self.reload()
+        self.refreshed: dict[str, dict[str, Any]] = {}
+        self.cycle_started_at: float | None = None
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> asyncio.Task:
+        if not self.running:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def reload(self) -> Watchlist:
+        """The watchlist file's contents, or the current watchlist if the file is malformed."""
+        try:
+            watchlist = Watchlist.load(self.path)
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            self.load_error = f"{type(e).__name__}: {e}"
+            logging.info(f"Ignoring malformed watchlist file {self.path}: {self.load_error}")
+            return self.watchlist
+        self.load_error = None
+        return watchlist
+
+    def update(self, add: list[str] | None = None, remove: list[str] | None = None,
+               interval: float | None = None) -> Watchlist:
+        """Edit the watchlist, save it and start a new cycle with it."""
+        watchlist = self.reload()
+        removed = {normalize_symbol(s) for s in remove or []}
+        symbols = [s for s in watchlist.symbols if s not in removed]
+        symbols += [normalize_symbol(s) for s in add or []]
+        watchlist = Watchlist(list(dict.fromkeys(symbols)), watchlist.interval if interval is None else interval)
+        watchlist.save(self.path)
+        self.watchlist, self.load_error = watchlist, None
+        if self._wake is not None:
+            self._wake.set()
+        return watchlist
+
+    def status(self) -> dict[str, Any]:
+        return {"file": self.path, "file_error": self.load_error, "running": self.running, **asdict(self.watchlist),
+                "cycle_started_at": self.cycle_started_at,
+                "refreshed": {s: self.refreshed[s] for s in self.watchlist.symbols if s in self.refreshed}}
+
+    async def refresh(self, symbol: str, ahead: float = 0.0) -> None:
+        start = time.time()
+        try:
+            await warm_symbol(symbol, ahead)
+            error = None
+        except Exception as e:
+            # Whatever went wrong (a locked SQLite file, an odd payload), the next symbols still get refreshed
+            error = f"{type(e).__name__}: {e}"
+            logging.info(f"Watchlist refresh of {symbol} failed: {error}")
+        self.refreshed[symbol] = {"at": start, "seconds": round(time.time() - start, 3), "error": error}
+
+    async def _sleep_until(self, when: float) -> bool:
+        """Sleep until `when` (time.monotonic); True if woken early by a watchlist change."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, when - time.monotonic()))
+        except asyncio.TimeoutError:
+            return False
+        self._wake.clear()
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            self.watchlist = self.reload()
+            symbols, interval = list(self.watchlist.symbols), self.watchlist.interval
+            cycle_start = time.monotonic()
+            self.cycle_started_at = time.time()
+            if not symbols:
+                await self._sleep_until(cycle_start + interval)
+                continue
+            slot = interval / len(symbols)
+            changed = False
+            for i, symbol in enumerate(symbols):
+                if await self._sleep_until(cycle_start + slot * (i + random.random())):
+                    changed = True
+                    break
+                # Keep it fresh until its turn in the next cycle, which can come up to a slot late
+                await self.refresh(symbol, ahead=interval + slot)
+            if not changed:
+                await self._sleep_until(cycle_start + interval)
+
+
+_scheduler: WatchlistScheduler | None = None
+
+
+def get_scheduler() -> WatchlistScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = WatchlistScheduler()
+    return _scheduler
+
+
+def configure_scheduler(path: str) -> WatchlistScheduler:
+    """Point the process-wide scheduler at another watchlist file (tests, alternate deployments)."""
+    global _scheduler
+    _scheduler = WatchlistScheduler(path)
+    return _scheduler
@@ -0,0 +1,61 @@
+"""Thin wrappers around the Screener.in endpoints the tools read from.
+
+Each call goes through the shared client, is cached under its dataset's TTL
+and is coalesced, so concurrent callers asking for the same data share one
+upstream request.
+"""
+from typing import Any
+
+from cache import cached
+from http_client import get_client
+from singleflight import coalesced
+
+
+@cached("search")
+@coalesced("search")
+async def search_companies(query: str) -> list[dict[str, Any]]:
+    """Companies matching `query` from /api/company/search/ (id, name, url)."""
+    response = await get_client().get("/api/company/search/", params={"q": query})
+    response.raise_for_status()
+    return response.json()
+
+
+@cached("chart")
+@coalesced("chart")
+async def fetch_chart(company_id: str, query: str = "Price-DMA50-DMA200-Volume", days: int = 365,
+                      consolidated: bool = True) -> dict[str, Any]:
+    """Raw /api/company/{company_id}/chart/ payload.
+
+    Raises httpx.HTTPError if the request fails and ValueError if the body is not JSON.
+    """
+    params = {
+        "q": query,
+        "days": str(days),
+        "consolidated": str(consolidated).lower(),
+    }
+    response = await get_client().get(f"/api/company/{company_id}/chart/", params=params, follow_redirects=True)
+    response.raise_for_status()
+    return response.json()
+
+
+@cached("screens")
+@coalesced("screens")
+async def fetch_screens_html(page: int | None = None) -> str:
+    """HTML of the public screens listing, page `page` (first page if None)."""
+    if page:
+        response = await get_client().get("/screens/", params={"page": page}, follow_redirects=True)
+    else:
+        response = await get_client().get("/screens", follow_redirects=True)
+    response.raise_for_status()
+    return response.text
+
+
+@coalesced("screen")
+async def fetch_screen_html(path: str, page: int = 1) -> str:
+    """HTML of page `page` of a screen's results, e.g. path "/screens/178/value-stocks/".
+
+    Not cached on its own: screens.run_screen caches the assembled result table.
+    """
+    response = await get_client().get(path, params={"page": page} if page > 1 else None, follow_redirects=True)
+    response.raise_for_status()
+    return response.text
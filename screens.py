@@ -0,0 +1,346 @@
+"""Searchable index of Screener.in's public screens.
+
+The screens listing is paginated (`/screens/?page=N`), so finding a screen
+used to mean walking it page by page. crawl_screens reads the first page to
+learn how many there are, fetches the rest concurrently and parses them with
+lxml. The resulting ScreensIndex keeps every screen's name, description,
+author and url in listing order, plus an inverted index from word to screens.
+Listing a page and searching are then in-memory lookups.
+
+The index is kept in the cache under the "screens_index" TTL. Once that
+passes, readers keep getting the old index while a background crawl builds
+a new one.
+
+run_screen executes one screen: its result pages are fetched concurrently,
+parsed into a frame with one typed column per screen column, and cached for
+the short "screen_results" TTL so the rows can be read back chunk by chunk.
+Every company id in the results is recorded in the symbol index, so the
+price tools can chart those symbols without looking them up again.
+
+Crawl from the command line (fills the persistent cache tier):
+
+    python screens.py
+    python screens.py --search "magic formula"
+    python screens.py --run /screens/178/value-stocks/
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import logging
+import re
+import time
+
+from batch import SCREENER_BATCH_CONCURRENCY
+from cache import get_cache, ttl_for
+from http_client import SCREENER_API_BASE
+from lazy_import import lazy_module
+from parsing import _number, run_parser
+from screener_api import fetch_screen_html, fetch_screens_html
+from singleflight import get_group
+from symbol_index import get_symbol_index
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+lxml_html = lazy_module("lxml.html")
+
+# A word in a screen's name counts for more than one in its description
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _text(element: lxml_html.HtmlElement | None) -> str:
+    return " ".join(element.text_content().split()) if element is not None else ""
+
+
+def parse_screens_page(html: str, page: int) -> tuple[list[dict[str, Any]], int]:
+    """The screens listed on one page, and the number of the last page linked from it."""
+    tree = lxml_html.fromstring(html)
+    entries = []
+    header = tree.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " flex-row ")'
+                        ' and contains(concat(" ", normalize-space(@class), " "), " flex-space-between ")]')
+    listing = header[0].xpath("following::ul[1]") if header else []
+    for li in listing[0].xpath("./li") if listing else []:
+        link = li.find(".//a")
+        if link is None or not link.get("href"):
+            continue
+        href = link.get("href")
+        description = link.find('.//span[@class="sub"]')
+        author = next((s for s in li.xpath('./span[contains(@class, "sub")]')), None)
+        name = " ".join(((link.text or "") + "".join(
+            (c.tail or "") for c in link if c is not description)).split()) or _text(link)
+        screen_id = re.search(r"/screens/(\d+)/", href)
+        entries.append({
+            "text": "".join(t.strip() for t in li.itertext()),
+            "href": SCREENER_API_BASE + href if href.startswith("/") else href,
+            "name": name,
+            "description": _text(description),
+            "author": _text(author).removeprefix("by ").strip(),
+            "id": int(screen_id.group(1)) if screen_id else None,
+            "page": page,
+        })
+    linked = [int(p) for p in re.findall(r"[?&]page=(\d+)", " ".join(tree.xpath("//a/@href")))]
+    return entries, max([page, *linked])
+
+
+@dataclass
+class ScreensIndex:
+    """Every public screen in listing order, with a word -> screens inverted index."""
+
+    entries: list[dict[str, Any]]
+    refreshed_at: float
+    _postings: dict[str, dict[int, float]] = field(default_factory=dict, repr=False)
+    _vocabulary: list[str] = field(default_factory=list, repr=False)
+    _pages: dict[int, list[int]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        for position, entry in enumerate(self.entries):
+            self._pages.setdefault(entry["page"], []).append(position)
+            for text, weight in ((entry["description"], DESCRIPTION_WEIGHT), (entry["name"], NAME_WEIGHT)):
+                for word in tokenize(text):
+                    postings = self._postings.setdefault(word, {})
+                    postings[position] = max(postings.get(position, 0.0), weight)
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def pages(self) -> int:
+        return max(self._pages, default=0)
+
+    def stale(self) -> bool:
+        return time.time() - self.refreshed_at >= ttl_for("screens_index")
+
+    def page(self, page: int) -> list[dict[str, Any]] | None:
+        positions = self._pages.get(page)
+        return None if positions is None else [self.entries[i] for i in positions]
+
+    def _terms(self, word: str) -> list[str]:
+        # The word itself or any word it starts ("grow" finds "growth" and "growing")
+        i = j = bisect_left(self._vocabulary, word)
+        while j < len(self._vocabulary) and self._vocabulary[j].startswith(word):
+            j += 1
+        return self._vocabulary[i:j]
+
+    def search(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Screens containing every word of `query`, best matches first (then listing order)."""
+        words = [self._terms(w) for w in dict.fromkeys(tokenize(query))]
+        if not words or not all(words):
+            return []
+        # Start from the rarest word so later words only score the screens still in the running
+        words.sort(key=lambda terms: sum(len(self._postings[t]) for t in terms))
+        scores: dict[int, float] = {}
+        for term in words[0]:
+            for position, weight in self._postings[term].items():
+                scores[position] = max(scores.get(position, 0.0), weight)
+        for terms in words[1:]:
+            postings = [self._postings[t] for t in terms]
+            scores = {p: s + max(w.get(p, 0.0) for w in postings) for p, s in scores.items()
+                      if any(p in w for w in postings)}
+            if not scores:
+                return []
+        ranked = sorted(scores, key=lambda p: (-scores[p], p))[:limit]
+        return [self.entries[p] for p in ranked]
+
+
+async def _fetch_page(page: int) -> tuple[list[dict[str, Any]], int]:
+    return await run_parser(parse_screens_page, await fetch_screens_html(page), page)
+
+
+async def crawl_screens(concurrency: int | None = None) -> ScreensIndex:
+    """Fetch and parse every screens page. Raises httpx.HTTPError if the first page fails."""
+    entries, pages = await _fetch_page(1)
+    semaphore = asyncio.Semaphore(max(1, concurrency or SCREENER_BATCH_CONCURRENCY))
+
+    async def one(page: int) -> list[dict[str, Any]]:
+        async with semaphore:
+            try:
+                return (await _fetch_page(page))[0]
+            except Exception as e:
+                # One missing page shouldn't cost the whole index
+                logging.info(f"Error fetching screens page {page}: {e}")
+                return []
+
+    for rest in await asyncio.gather(*(one(page) for page in range(2, pages + 1))):
+        entries += rest
+    logging.info(f"Indexed {len(entries)} screens from {pages} pages")
+    return ScreensIndex(entries, time.time())
+
+
+_index: ScreensIndex | None = None
+_refresh: asyncio.Task | None = None
+
+
+async def refresh_screens_index(concurrency: int | None = None) -> ScreensIndex:
+    """Crawl now (sharing a crawl already in progress) and make the result the current index."""
+    async def crawl() -> ScreensIndex:
+        global _index
+        _index = await crawl_screens(concurrency)
+        await get_cache().set("screens_index", "all", {"entries": _index.entries, "refreshed_at": _index.refreshed_at})
+        return _index
+
+    return await get_group("screens_index").do("all", crawl)
+
+
+def refresh_in_background() -> asyncio.Task:
+    """Start a background crawl unless one is already running."""
+    global _refresh
+    if _refresh is None or _refresh.done():
+        _refresh = asyncio.create_task(refresh_screens_index())
+        _refresh.add_done_callback(_log_refresh_failure)
+    return _refresh
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logging.info(f"Background screens crawl failed, keeping the previous index: {task.exception()}")
+
+
+async def get_screens_index() -> ScreensIndex:
+    """The current index: built on first use, refreshed in the background once stale."""
+    global _index
+    if _index is None:
+        hit, saved = await get_cache().get("screens_index", "all")
+        if hit:
+            _index = ScreensIndex(saved["entries"], saved["refreshed_at"])
+    if _index is None:
+        return await refresh_screens_index()
+    if _index.stale():
+        refresh_in_background()
+    return _index
+
+
+def reset_screens_index() -> None:
+    """Forget the in-process index (tests)."""
+    global _index, _refresh
+    _index, _refresh = None, None
+
+
+def screen_path(href: str) -> str:
+    """Path of a screen from its href or full url. Raises ValueError for anything else."""
+    path = urlsplit(href.strip()).path
+    if not re.match(r"^/screens/\d+(/|$)", path):
+        raise ValueError(f"Not a screen url: {href}")
+    return path if path.endswith("/") else path + "/"
+
+
+def parse_screen_results(html: str) -> tuple[pd.DataFrame, int]:
+    """One page of a screen's result table, and the number of the last result page.
+
+    Rows are indexed by symbol (taken from the company url) and carry the
+    company name, its Screener company id and one float column per screen column.
+    """
+    tree = lxml_html.fromstring(html)
+    tables = tree.xpath('//table[contains(concat(" ", normalize-space(@class), " "), " data-table ")]')
+    header, rows = [], []
+    for tr in tables[0].iter("tr") if tables else []:
+        if not header and tr.find("th") is not None:
+            header = [" ".join(th.text_content().split()) for th in tr.findall("th")]
+        elif tr.get("data-row-company-id"):
+            rows.append(tr)
+    columns = header[2:]  # after "S.No." and "Name"
+    symbols, names, company_ids = [], [], []
+    values = np.full((len(rows), len(columns)), np.nan)
+    for i, tr in enumerate(rows):
+        cells = tr.findall("td")
+        link = cells[1].find(".//a")
+        href = link.get("href", "") if link is not None else ""
+        slug = re.match(r"/company/([^/]+)/", href)
+        symbols.append(slug.group(1).upper() if slug else tr.get("data-row-company-id"))
+        names.append(" ".join(cells[1].text_content().split()))
+        company_ids.append(tr.get("data-row-company-id"))
+        for j, td in enumerate(cells[2:len(columns) + 2]):
+            values[i, j] = _number(td.text_content())
+    frame = pd.DataFrame(values, index=pd.Index(symbols, name="symbol"), columns=columns)
+    frame.insert(0, "company_id", company_ids)
+    frame.insert(0, "name", names)
+    linked = [int(p) for p in re.findall(r"[?&]page=(\d+)", " ".join(tree.xpath("//a/@href")))]
+    return frame, max([1, *linked])
+
+
+async def _screen_page(path: str, page: int) -> tuple[pd.DataFrame, int]:
+    return await run_parser(parse_screen_results, await fetch_screen_html(path, page))
+
+
+async def _load_screen(path: str, pages: int | None, concurrency: int | None,
+                       progress: Callable[[int, int], Awaitable[None]] | None) -> tuple[pd.DataFrame, int]:
+    first, available = await _screen_page(path, 1)
+    wanted = min(available, pages or available)
+    semaphore = asyncio.Semaphore(max(1, concurrency or SCREENER_BATCH_CONCURRENCY))
+    done = 1
+    if progress is not None:
+        await progress(done, wanted)
+
+    async def one(page: int) -> pd.DataFrame:
+        nonlocal done
+        async with semaphore:
+            frame = (await _screen_page(path, page))[0]
+        done += 1
+        if progress is not None:
+            await progress(done, wanted)
+        return frame
+
+    frames = [first, *await asyncio.gather(*(one(page) for page in range(2, wanted + 1)))]
+    results = pd.concat(frames)
+    results = results[~results.index.duplicated()]
+    get_symbol_index().put_listed([(symbol, company_id, f"/company/{symbol}/")
+                                   for symbol, company_id in zip(results.index, results["company_id"])])
+    return results, available
+
+
+async def run_screen(href: str, pages: int | None = None, concurrency: int | None = None,
+                     progress: Callable[[int, int], Awaitable[None]] | None = None) -> tuple[pd.DataFrame, int]:
+    """A screen's results over its first `pages` result pages (all of them if None).
+
+    Returns the results frame (see parse_screen_results) and how many result
+    pages the screen has. `progress`, if given, is awaited with (fetched, total)
+    pages. Raises ValueError for a bad href and httpx.HTTPError if the first page fails.
+    """
+    path = screen_path(href)
+    key = f"{path}:{pages}"
+    cache = get_cache()
+    hit, value = await cache.get("screen_results", key)
+    if hit:
+        return value
+
+    async def load() -> tuple[pd.DataFrame, int]:
+        value = await _load_screen(path, pages, concurrency, progress)
+        await cache.set("screen_results", key, value)
+        return value
+
+    return await get_group("screen_results").do(key, load)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl and index Screener.in's public screens")
+    parser.add_argument("--search", help="search the fresh index for these words")
+    parser.add_argument("--run", help="run this screen (href or url) and print its results")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        from http_client import close_client
+        try:
+            if args.run:
+                results, _ = await run_screen(args.run, concurrency=args.concurrency)
+                print(results.to_string())
+                return
+            index = await refresh_screens_index(args.concurrency)
+        finally:
+            await close_client()
+        print(f"{len(index)} screens from {index.pages} pages")
+        for entry in index.search(args.search) if args.search else []:
+            print(f"{entry['name']}: {entry['href']}")
+
+    asyncio.run(main())
@@ -0,0 +1,270 @@
+"""Serve the MCP server over HTTP (SSE) from several worker processes.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Clients connect to http://host:port/sse. With one worker that process
+serves the port itself. With more, this process only routes: an SSE
+session lives in the memory of the worker holding its stream, so each new
+session is handed to the worker with the fewest open sessions and the
+messages POSTed for it are forwarded to that worker. Workers listen on unix
+sockets and are restarted if they exit.
+
+Workers share what outlives a call through the filesystem: the persistent
+cache tier (the SQLite file in WAL mode, or Redis), the symbol index, the
+price store, reports and the warehouse. A page one worker scraped is a
+tier-2 hit for the others; only the memory tier is per worker.
+Settings that would multiply with the number of workers are split: each
+worker gets 1/N of SCREENER_RATE_LIMIT and SCREENER_RATE_BURST, only worker
+0 refreshes the watchlist, and with SCREENER_METRICS_PORT set worker k
+serves its metrics on that port + k.
+
+GET /health lists the workers and their open sessions.
+"""
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+import argparse
+import asyncio
+import logging
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from cache import SCREENER_CACHE_BACKEND
+from http_client import SCREENER_RATE_BURST, SCREENER_RATE_LIMIT
+from metrics import SCREENER_METRICS_PORT
+
+SCREENER_HOST = os.getenv("SCREENER_HOST", "127.0.0.1")
+SCREENER_PORT = int(os.getenv("SCREENER_PORT", "8000"))
+SCREENER_WORKERS = int(os.getenv("SCREENER_WORKERS", str(os.cpu_count() or 1)))
+
+# Seconds open connections get on shutdown; SSE streams never end by themselves
+SHUTDOWN_GRACE = 5
+# Seconds a worker gets to start answering /health
+WORKER_START_TIMEOUT = 60
+# Seconds between a worker's checks that the router that started it is still there
+ORPHAN_CHECK_INTERVAL = 1
+SESSION_ID = re.compile(rb"session_id=([0-9a-f]+)")
+HOP_BY_HOP = {"connection", "content-length", "host", "keep-alive", "transfer-encoding"}
+
+
+def worker_app() -> Starlette:
+    """The MCP server's SSE app, owning the process resources that all of its sessions share."""
+    from server import hosted_resources, mcp
+
+    router = os.getppid()
+
+    async def exit_if_orphaned() -> None:
+        # A router killed outright cannot stop its workers; they stop themselves
+        while os.getppid() == router:
+            await asyncio.sleep(ORPHAN_CHECK_INTERVAL)
+        logging.info("Router exited, stopping worker")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        async with hosted_resources():
+            watchdog = asyncio.create_task(exit_if_orphaned())
+            try:
+                yield
+            finally:
+                watchdog.cancel()
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"pid": os.getpid()})
+
+    return Starlette(routes=[*mcp.sse_app().routes, Route("/health", health)], lifespan=lifespan)
+
+
+def worker_env(index: int, workers: int) -> dict[str, str]:
+    """Environment of worker `index` of `workers`: its share of the upstream budget and of the background work."""
+    env = {**os.environ,
+           "SCREENER_RATE_LIMIT": str(SCREENER_RATE_LIMIT / workers),
+           "SCREENER_RATE_BURST": str(max(1.0, SCREENER_RATE_BURST / workers))}
+    if index > 0:
+        env["SCREENER_WATCHLIST_REFRESH"] = "false"
+    if SCREENER_METRICS_PORT:
+        env["SCREENER_METRICS_PORT"] = str(SCREENER_METRICS_PORT + index)
+    return env
+
+
+def _headers(headers: httpx.Headers | Any) -> dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP}
+
+
+class Worker:
+    """One server process listening on a unix socket, and the router's client for it."""
+
+    def __init__(self, index: int, workers: int, directory: str):
+        self.index = index
+        self.socket = os.path.join(directory, f"worker-{index}.sock")
+        self.env = worker_env(index, workers)
+        self.client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=self.socket), base_url="http://worker",
+                                        timeout=httpx.Timeout(30, read=None))
+        self.process: asyncio.subprocess.Process | None = None
+        self.sessions = 0
+        self.restarts = 0
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket):
+            os.unlink(self.socket)
+        # Its own session, so a Ctrl-C reaches the router only and workers are stopped in order
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker-socket", self.socket, env=self.env,
+            start_new_session=True)
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        while True:
+            try:
+                if (await self.client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if self.process.returncode is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Worker {self.index} did not start (exit code {self.process.returncode})")
+            await asyncio.sleep(0.05)
+
+    async def supervise(self) -> None:
+        """Restart the worker whenever it exits."""
+        while True:
+            code = await self.process.wait()
+            logging.info(f"Worker {self.index} exited with {code}, restarting it")
+            self.restarts += 1
+            await asyncio.sleep(1)
+            try:
+                await self.start()
+            except RuntimeError as e:
+                logging.info(str(e))
+
+    async def stop(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), SHUTDOWN_GRACE + 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        await self.client.aclose()
+
+
+class Router:
+    """Hands each new SSE session to the least busy worker and forwards the session's messages to it."""
+
+    def __init__(self, workers: list[Worker]):
+        self.workers = workers
+        self.sessions: dict[str, Worker] = {}
+
+    async def sse(self, request: Request) -> Response:
+        worker = min(self.workers, key=lambda w: w.sessions)
+        # Counted before connecting, so sessions opened at the same time spread out
+        worker.sessions += 1
+        try:
+            upstream = await worker.client.send(
+                worker.client.build_request("GET", request.url.path, headers=_headers(request.headers)), stream=True)
+        except httpx.TransportError as e:
+            worker.sessions -= 1
+            return Response(f"Worker unavailable: {e}", status_code=503)
+
+        async def relay():
+            session, head = None, b""
+            try:
+                async for chunk in upstream.aiter_raw():
+                    # The stream opens with an "endpoint" event naming the session's message url
+                    if session is None:
+                        head += chunk
+                        match = SESSION_ID.search(head)
+                        if match:
+                            session = match.group(1).decode()
+                            self.sessions[session] = worker
+                    yield chunk
+            finally:
+                worker.sessions -= 1
+                self.sessions.pop(session, None)
+                await upstream.aclose()
+
+        return StreamingResponse(relay(), status_code=upstream.status_code, headers=_headers(upstream.headers))
+
+    async def message(self, request: Request) -> Response:
+        worker = self.sessions.get(request.query_params.get("session_id", ""))
+        if worker is None:
+            return Response("Could not find session", status_code=404)
+        try:
+            response = await worker.client.post(request.url.path, params=request.query_params,
+                                                content=await request.body(), headers=_headers(request.headers))
+        except httpx.TransportError as e:
+            return Response(f"Worker unavailable: {e}", status_code=503)
+        return Response(response.content, status_code=response.status_code, headers=_headers(response.headers))
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"sessions": len(self.sessions), "workers": [
+            {"index": w.index, "pid": w.process.pid if w.process else None, "sessions": w.sessions,
+             "restarts": w.restarts} for w in self.workers]})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[Route("/sse", self.sse), Route("/messages/", self.message, methods=["POST"]),
+                                 Route("/health", self.health)])
+
+
+class _RouterServer(uvicorn.Server):
+    """uvicorn re-raises SIGINT/SIGTERM once it has shut down, which would end the router before its workers."""
+
+    @contextmanager
+    def capture_signals(self):
+        yield
+
+
+def _config(app: Starlette, **listen: Any) -> uvicorn.Config:
+    return uvicorn.Config(app, log_level="warning", access_log=False, timeout_graceful_shutdown=SHUTDOWN_GRACE,
+                          **listen)
+
+
+async def serve(host: str = SCREENER_HOST, port: int = SCREENER_PORT, workers: int = SCREENER_WORKERS) -> None:
+    """Serve on host:port until interrupted, from `workers` processes."""
+    if workers <= 1:
+        logging.info(f"Serving on http://{host}:{port}/sse")
+        await uvicorn.Server(_config(worker_app(), host=host, port=port)).serve()
+        return
+    if SCREENER_CACHE_BACKEND == "memory":
+        logging.info("SCREENER_CACHE_BACKEND=memory: workers will not share cached pages")
+    directory = tempfile.mkdtemp(prefix="screener-serve-")
+    pool = [Worker(i, workers, directory) for i in range(workers)]
+    supervisors: list[asyncio.Task] = []
+    try:
+        await asyncio.gather(*(w.start() for w in pool))
+        supervisors = [asyncio.create_task(w.supervise()) for w in pool]
+        server = _RouterServer(_config(Router(pool).app(), host=host, port=port))
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, setattr, server, "should_exit", True)
+        logging.info(f"Serving on http://{host}:{port}/sse from {workers} workers")
+        await server.serve()
+    finally:
+        for task in supervisors:
+            task.cancel()
+        await asyncio.gather(*(w.stop() for w in pool))
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Screener.in MCP server over HTTP (SSE).")
+    parser.add_argument("--host", default=SCREENER_HOST)
+    parser.add_argument("--port", type=int, default=SCREENER_PORT)
+    parser.add_argument("--workers", type=int, default=SCREENER_WORKERS)
+    parser.add_argument("--worker-socket", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.worker_socket:
+        uvicorn.run(worker_app(), uds=args.worker_socket, log_level="warning", access_log=False,
+                    timeout_graceful_shutdown=SHUTDOWN_GRACE)
+    else:
+        # Not one line per forwarded message
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        asyncio.run(serve(args.host, args.port, args.workers))
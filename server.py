@@ -1,221 +1,327 @@
+from contextlib import asynccontextmanager
 from typing import Any
+import asyncio
 import httpx
-from mcp.server.fastmcp import FastMCP
-import pandas as pd
+from mcp.server.fastmcp import Context, FastMCP
 import logging
 import json
-import re
-from dotenv import load_dotenv
 import os
-from bs4 import BeautifulSoup
-import traceback
-from aiocache import cached
-
-# Load environment variables from .env file
-load_dotenv()
+from http_client import client_lifespan, data, get_client
+from company_page import get_company_page, get_sections
+from metrics import instrument_tools, metrics_snapshot, prometheus_text, start_metrics_server
+from lazy_import import lazy_module, preload
+from indicators import (MOVING_AVERAGE_METRICS, RSI_METRICS, RSI_MODES, align_series, chart_query, combine_signals,
+                        compute_indicators, is_weekly, latest_values, moving_average_analysis, rsi_analysis)
+from parsing import SECTIONS, shutdown_parse_pool, warm_parse_pool
+from backtest import RANKINGS, backtest, parameter_grid, summarize
+from batch import run_batch
+from cache import get_cache
+from price_store import get_price_series
+from reports import fetch_report, fetch_reports
+from scheduler import SCREENER_WATCHLIST_REFRESH, get_scheduler
+from screens import get_screens_index, run_screen as run_screen_results, screen_path
+from singleflight import singleflight_stats
+from symbol_index import resolve_company, resolve_company_id
+from table_format import encode_chart, encode_table
+from warehouse import get_warehouse, ingest as ingest_warehouse
+
+# pandas, NumPy and lxml are imported on first use (lazy_import.py)
+pd = lazy_module("pandas")
+# Seconds after startup to import them, and start the parse workers, in the background; negative leaves both to first use
+SCREENER_PRELOAD_DELAY = float(os.getenv("SCREENER_PRELOAD_DELAY", "1"))
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+async def warm_up(delay: float) -> None:
+    """Once the client's handshake is out of the way, import the deferred modules and start the parse workers."""
+    await asyncio.sleep(delay)
+    await asyncio.to_thread(preload)
+    await asyncio.to_thread(warm_parse_pool)
+
+
+@asynccontextmanager
+async def process_resources():
+    """Own the shared HTTP client, the parse pool and the watchlist scheduler for the lifetime of the process."""
+    async with client_lifespan(mcp):
+        metrics_server = await start_metrics_server()
+        if SCREENER_WATCHLIST_REFRESH:
+            get_scheduler().start()
+        warming = asyncio.create_task(warm_up(SCREENER_PRELOAD_DELAY)) if SCREENER_PRELOAD_DELAY >= 0 else None
+        try:
+            yield
+        finally:
+            if warming is not None:
+                warming.cancel()
+            await get_scheduler().stop()
+            if metrics_server is not None:
+                metrics_server.close()
+            shutdown_parse_pool()
+
+
+_hosted = False
+
+
+@asynccontextmanager
+async def hosted_resources():
+    """Process resources for an HTTP app serving many sessions (serve.py), which then share them."""
+    global _hosted
+    async with process_resources():
+        _hosted = True
+        try:
+            yield
+        finally:
+            _hosted = False
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP):
+    """Runs per MCP session: over stdio that is the whole process, over HTTP the hosting app owns the resources."""
+    if _hosted:
+        yield {}
+        return
+    async with process_resources():
+        yield {}
+
+
 # Initialize the MCP server
-mcp = FastMCP("Screener.in Server")
-
-# Define Screener.in API base URL and headers
-SCREENER_API_BASE = "https://www.screener.in"
-SCREENER_CSRF_TOKEN = os.getenv("SCREENER_CSRF_TOKEN")
-SCREENER_SESSION_ID = os.getenv("SCREENER_SESSION_ID")
-SCREENER_CSRF_MIDDLEWARE_TOKEN = os.getenv("SCREENER_CSRF_MIDDLEWARE_TOKEN")
-
-
-cookies = {
-    'theme': 'auto',
-    'csrftoken': SCREENER_CSRF_TOKEN,
-    'sessionid': SCREENER_SESSION_ID,
-}
-
-# content-type might not be needed in get request headers
-headers = {
-    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-    'accept-language': 'en-GB,en-US;q=0.9,en;q=0.8',
-    'cache-control': 'max-age=0',
-    'content-type': 'application/x-www-form-urlencoded',
-    'origin': 'https://www.screener.in',
-    'priority': 'u=0, i',
-    'referer': 'https://www.screener.in',
-    'sec-ch-ua': '"Chromium";v="134", "Not:A-Brand";v="24", "Google Chrome";v="134"',
-    'sec-ch-ua-mobile': '?0',
-    'sec-ch-ua-platform': '"macOS"',
-    'sec-fetch-dest': 'document',
-    'sec-fetch-mode': 'navigate',
-    'sec-fetch-site': 'same-origin',
-    'sec-fetch-user': '?1',
-    'upgrade-insecure-requests': '1',
-    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36',
-    # 'cookie': 'theme=auto; csrftoken=qwe; sessionid=fgh',
-}
-
-data = {
-    'csrfmiddlewaretoken': SCREENER_CSRF_MIDDLEWARE_TOKEN,
-    'next': '/company/WIPRO/consolidated/',
-}
+mcp = FastMCP("Screener.in Server", lifespan=server_lifespan)
+# Every tool registered below is timed (unless SCREENER_METRICS is off)
+instrument_tools(mcp)
 
 # Helper function to make API requests
 async def make_screener_request(endpoint: str, req_type: str = "get", params: dict[str, Any] = None) -> dict[str, Any] | None:
-    async with httpx.AsyncClient() as client:
+    # Rate limiting, retries of GETs and the circuit breaker live in the client's transport (upstream.py)
+    client = get_client()
+    try:
+        if req_type == "post":
+            response = await client.post(f"/{endpoint}", data=data)
+        else:
+            # pd.read_html used to follow redirects (e.g. to the canonical company url), keep that for GETs
+            response = await client.get(f"/{endpoint}", params=params, follow_redirects=True)
+        response.raise_for_status()
+        return {"response": response}
+    except httpx.HTTPStatusError as e:
+        logging.info(f"Request to /{endpoint} failed with {e.response.status_code}: {e.response.text[:200]}")
+        return {"error": str(e)}
+    except httpx.HTTPError as e:
+        logging.info(f"Request to /{endpoint} failed: {e!r}")
+        return {"error": str(e)}
+
+# Progress callback for the long-running tools; a no-op when the tool is called outside an MCP request
+def progress_reporter(ctx: Context | None):
+    async def progress(done: int, total: int) -> None:
+        if ctx is None:
+            return
         try:
-            response = None
-            if req_type == "post":
-                response = await client.post(f"{SCREENER_API_BASE}/{endpoint}", headers=headers, cookies=cookies, data=data)
-            else:
-                response = await client.get(f"{SCREENER_API_BASE}/{endpoint}", headers=headers, params=params)
-            response.raise_for_status()
-            return {"response": response}
-        except Exception as e:
-            logging.info(f"response: {type(response)}, {response}, {response.has_redirect_location}, {response.next_request}")
-            logging.info(f"response.text: {response.text}")
-            return {"error": str(e)}
+            await ctx.report_progress(done, total)
+        except ValueError:
+            pass
+
+    return progress
 
 # Helper function to get warehouse id for downloading excel report
-async def get_warehouse_and_company_id(symbol):
+async def get_warehouse_and_company_id(symbol: str) -> tuple[str, str]:
+    """(warehouse id, company id) of a symbol; raises ValueError if they cannot be resolved."""
     logging.info("Getting warehouse id: " + symbol)
-    api = f"{SCREENER_API_BASE}/api/company/search/?q={symbol}"
-    async with httpx.AsyncClient() as client:
-        d = await client.get(api)
-        j = json.loads(d.content)[0]
-        html = await client.get('https://www.screener.in' + j['url'])
-        # print(f"html: {html.text}")
-        warehouse_id = re.findall('formaction=./user/company/export/(.*?)/.', html.text)
-        company_id = re.findall('formaction=./api/company/(.*?)/add/.', html.text)
-        return warehouse_id[0], company_id[0]
+    try:
+        ids = await resolve_company(symbol)
+    except httpx.HTTPError as e:
+        raise ValueError(f"Could not resolve company ids for {symbol}: {e}") from e
+    return ids.warehouse_id, ids.company_id
 
 
 @mcp.tool()
 async def download_report(symbol: str) -> str:
     """Download excel report for a stock from Screener.in."""
-    path = "./reports"
-    warehouseid, _ = await get_warehouse_and_company_id(symbol)
-    url = f'{SCREENER_API_BASE}/user/company/export/{warehouseid}/'
-    async with httpx.AsyncClient() as client:
-        r = await client.post(url, cookies=cookies, headers=headers, data=data)
-        logging.info(f"r.status_code: {r.status_code}")
-        r.raise_for_status()
-        path = f'{path}/{symbol.strip()}.xlsx'
-
-        if r.status_code == 200:
-            with open(path, 'wb') as f:
-                f.write(r.content)
-            logging.info(f"Excel file created for: {symbol}")
-            return path
-        else:
-            logging.info(f"Error in downloading report for: {symbol}")
-            return f"Error in downloading report for: {symbol}"
+    try:
+        report = await fetch_report(symbol)
+    except (httpx.HTTPError, ValueError) as e:
+        logging.info(f"Error in downloading report for: {symbol}: {e}")
+        return f"Error in downloading report for: {symbol}"
+    return report["path"]
+
+@mcp.tool()
+async def download_reports(symbols: list[str], concurrency: int | None = None, force: bool = False,
+                           ctx: Context = None) -> dict[str, Any]:
+    """
+    Download excel reports for many stocks from Screener.in.
+
+    Reports downloaded within the last day (SCREENER_TTL_REPORT) are reused from disk, so re-running
+    an interrupted download only fetches what is missing.
+
+    Args:
+        symbols: The ticker symbols to download reports for.
+        concurrency: How many reports to download at a time (defaults to SCREENER_BATCH_CONCURRENCY).
+        force: Download again even if a fresh report is on disk.
+
+    Returns:
+        Dictionary with each symbol's file path under "results", failures under "errors", and
+        how many reports were "downloaded" vs reused from disk ("cached").
+    """
+    return await fetch_reports(symbols, concurrency=concurrency, force=force, progress=progress_reporter(ctx))
 
-@cached(ttl=3600)  # Cache results for 1 hour
-async def read_stock_info(stock: str) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+async def read_stock_info(stock: str) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]":
     """Read detailed stock information from Screener.in."""
-    url = f"{SCREENER_API_BASE}/company/{stock}/"
-    df_list = pd.read_html(url)
-    print(f"Number of tables: {len(df_list)}")
-    df_list = [df for df in df_list if df.shape[1] > 1]
-    print(f"Number of tables after filtering: {len(df_list)}")
-    df_quarterly_results = df_list[0]
-    df_quarterly_results.index = df_quarterly_results['Unnamed: 0']
-    df_quarterly_results = df_quarterly_results.drop(columns=['Unnamed: 0'])
-    df_quarterly_results.index.name = 'Quarter'
-    df_profit_loss = df_list[1]
-    df_profit_loss.index = df_profit_loss['Unnamed: 0']
-    df_profit_loss = df_profit_loss.drop(columns=['Unnamed: 0'])
-    df_profit_loss.index.name = 'Profit & Loss'
-    df_balance_sheet = df_list[6]
-    df_balance_sheet.index = df_balance_sheet['Unnamed: 0']
-    df_balance_sheet = df_balance_sheet.drop(columns=['Unnamed: 0'])
-    df_balance_sheet.index.name = 'Balance Sheet'
-    df_cash_flow = df_list[7]
-    df_cash_flow.index = df_cash_flow['Unnamed: 0']
-    df_cash_flow = df_cash_flow.drop(columns=['Unnamed: 0'])
-    df_cash_flow.index.name = 'Cash Flow'
-    df_ratios = df_list[8]
-    df_ratios.index = df_ratios['Unnamed: 0']
-    df_ratios = df_ratios.drop(columns=['Unnamed: 0'])
-    df_ratios.index.name = 'Ratios'
-    df_shareholding_pattern_quarterly = df_list[9]
-    df_shareholding_pattern_quarterly.index = df_shareholding_pattern_quarterly['Unnamed: 0']
-    df_shareholding_pattern_quarterly = df_shareholding_pattern_quarterly.drop(columns=['Unnamed: 0'])
-    df_shareholding_pattern_quarterly.index.name = 'Shareholding Pattern Quarterly'
-    df_shareholding_pattern_yearly = df_list[10]
-    df_shareholding_pattern_yearly.index = df_shareholding_pattern_yearly['Unnamed: 0']
-    df_shareholding_pattern_yearly = df_shareholding_pattern_yearly.drop(columns=['Unnamed: 0'])
-    df_shareholding_pattern_yearly.index.name = 'Shareholding Pattern Yearly'
-
-    return (df_quarterly_results, df_profit_loss, df_balance_sheet, df_cash_flow, df_ratios, 
-            df_shareholding_pattern_quarterly, df_shareholding_pattern_yearly)
-
-# Multiple tool below which uses above func to get company details like quaterly results, pnl, etc
+    return tuple((await get_sections(stock)).values())
+
+# Fundamentals tools below each parse (and cache) only the section they return
+async def read_section(company_name: str, section: str) -> "pd.DataFrame":
+    return (await get_sections(company_name, [section]))[section]
+
+@mcp.tool()
+async def get_quarterly_results(company_name: str, compact: bool = False, periods: int | None = None,
+                                items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch quarterly results for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "quarterly_results"), compact, periods, items, precision)
+
+@mcp.tool()
+async def get_profit_loss(company_name: str, compact: bool = False, periods: int | None = None,
+                          items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch profit and loss statement for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "profit_loss"), compact, periods, items, precision)
+
+@mcp.tool()
+async def get_balance_sheet(company_name: str, compact: bool = False, periods: int | None = None,
+                            items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch balance sheet for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "balance_sheet"), compact, periods, items, precision)
+
+
 @mcp.tool()
-async def get_quarterly_results(company_name: str) -> dict[str, Any]:
-    """Fetch quarterly results for a company from Screener.in."""
-    df_quarterly_results, _, _, _, _, _, _ = await read_stock_info(company_name)
-    return df_quarterly_results.to_dict()
+async def get_cash_flow(company_name: str, compact: bool = False, periods: int | None = None,
+                        items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch cash flow statement for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "cash_flow"), compact, periods, items, precision)
+
 
 @mcp.tool()
-async def get_profit_loss(company_name: str) -> dict[str, Any]:
-    """Fetch profit and loss statement for a company from Screener.in."""
-    _, df_profit_loss, _, _, _, _, _ = await read_stock_info(company_name)
-    return df_profit_loss.to_dict()
+async def get_ratios(company_name: str, compact: bool = False, periods: int | None = None,
+                     items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch financial ratios for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "ratios"), compact, periods, items, precision)
+
 
 @mcp.tool()
-async def get_balance_sheet(company_name: str) -> dict[str, Any]:
-    """Fetch balance sheet for a company from Screener.in."""
-    _, _, df_balance_sheet, _, _, _, _ = await read_stock_info(company_name)
-    return df_balance_sheet.to_dict()
+async def get_shareholding_pattern_quarterly(company_name: str, compact: bool = False, periods: int | None = None,
+                                             items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch quarterly shareholding pattern for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "shareholding_pattern_quarterly"), compact, periods, items, precision)
 
 
 @mcp.tool()
-async def get_cash_flow(company_name: str) -> dict[str, Any]:
-    """Fetch cash flow statement for a company from Screener.in."""
-    _, _, _, df_cash_flow, _, _, _ = await read_stock_info(company_name)
-    return df_cash_flow.to_dict()
+async def get_shareholding_pattern_yearly(company_name: str, compact: bool = False, periods: int | None = None,
+                                          items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch yearly shareholding pattern for a company from Screener.in. Output options as in get_fundamentals."""
+    return encode_table(await read_section(company_name, "shareholding_pattern_yearly"), compact, periods, items, precision)
 
 
 @mcp.tool()
-async def get_ratios(company_name: str) -> dict[str, Any]:
-    """Fetch financial ratios for a company from Screener.in."""
-    _, _, _, _, df_ratios, _, _ = await read_stock_info(company_name)
-    return df_ratios.to_dict()
+async def get_fundamentals(company_name: str, sections: list[str] | None = None, compact: bool = False,
+                           periods: int | None = None, items: list[str] | None = None,
+                           precision: int | None = None) -> dict[str, Any]:
+    """
+    Fetch several fundamentals tables for a company from Screener.in in one call.
+
+    Args:
+        company_name: The company's Screener.in symbol.
+        sections: Any of quarterly_results, profit_loss, balance_sheet, cash_flow, ratios,
+            shareholding_pattern_quarterly, shareholding_pattern_yearly (all of them if omitted).
+        compact: Return each table as {"name", "index", "columns", "data"} (labels once, then value rows)
+            instead of a column -> row -> value dict.
+        periods: Only the last N periods (columns).
+        items: Only these line items (rows), e.g. ["Sales", "Net Profit"].
+        precision: Round values to this many decimals.
+
+    Returns:
+        Dictionary mapping each requested section to its table.
+    """
+    try:
+        tables = await get_sections(company_name, sections or SECTIONS)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {section: encode_table(table, compact, periods, items, precision) for section, table in tables.items()}
 
 
 @mcp.tool()
-async def get_shareholding_pattern_quarterly(company_name: str) -> dict[str, Any]:
-    """Fetch quarterly shareholding pattern for a company from Screener.in."""
-    _, _, _, _, _, df_shareholding_pattern_quarterly, _ = await read_stock_info(company_name)
-    return df_shareholding_pattern_quarterly.to_dict()
+async def load_warehouse(symbols: list[str], concurrency: int | None = None) -> dict[str, Any]:
+    """
+    Add companies to the local fundamentals warehouse that screen_companies queries.
+
+    Args:
+        symbols: The companies' Screener.in symbols; already loaded ones are refreshed.
+        concurrency: How many companies to fetch at a time (defaults to SCREENER_BATCH_CONCURRENCY).
+
+    Returns:
+        Dictionary with the loaded symbols under "results", failures under "errors"
+        and the warehouse size under "universe".
+    """
+    return await ingest_warehouse(symbols, concurrency)
 
 
 @mcp.tool()
-async def get_shareholding_pattern_yearly(company_name: str) -> dict[str, Any]:
-    """Fetch yearly shareholding pattern for a company from Screener.in."""
-    _, _, _, _, _, _, df_shareholding_pattern_yearly = await read_stock_info(company_name)
-    return df_shareholding_pattern_yearly.to_dict()
+async def get_warehouse_fields(section: str | None = None) -> dict[str, Any]:
+    """List the fields screen_companies expressions can use, optionally for one section prefix (q, pl, bs, cf, ratios, shq, shy)."""
+    warehouse = get_warehouse()
+    fields = [f for f in warehouse.fields if section is None or f.startswith(f"{section}_")]
+    return {"universe": len(warehouse), "fields": fields}
+
+
+@mcp.tool()
+async def screen_companies(expression: str, rank_by: str | None = None, descending: bool = True, limit: int = 50,
+                           fields: list[str] | None = None) -> dict[str, Any]:
+    """
+    Screen every company in the local warehouse with one filter expression.
+
+    Fields are named <section>_<line item>[_<periods back>], e.g. ratios_roce_pct (latest ROCE %),
+    bs_borrowings_1 (borrowings one year before the latest), q_sales_4 (sales four quarters back).
+    Yearly sections count back from the latest full financial year (no TTM or half-year columns).
+    See get_warehouse_fields for the full list and load_warehouse to add companies.
+
+    Args:
+        expression: A condition over fields, e.g. "ratios_roce_pct > 20 and bs_borrowings < bs_borrowings_1".
+            Only fields, numbers, + - * / // %, comparisons and and/or/not are allowed.
+        rank_by: Optional expression to sort the matches by, e.g. "pl_net_profit / pl_net_profit_1".
+        descending: Sort the largest rank first.
+        limit: Return at most this many companies.
+        fields: Extra fields to include for each match.
+
+    Returns:
+        Dictionary with the universe size, the number of matches and the matching companies
+        with the fields the expressions use, and under "periods" the latest period of each of their sections.
+    """
+    warehouse = get_warehouse()
+    if not len(warehouse):
+        return {"error": "The warehouse is empty, add companies with load_warehouse first"}
+    try:
+        matches = await asyncio.to_thread(warehouse.screen, expression, rank_by, descending, fields or ())
+    except ValueError as e:
+        return {"error": str(e)}
+    shown = matches.head(limit).round(4)
+    results = shown.astype(object).where(shown.notna(), None).reset_index().to_dict(orient="records")
+    # The period each section's fields count back from, so rows can be compared
+    prefixes = list(dict.fromkeys(column.split("_")[0] for column in shown.columns if column != "rank"))
+    for row in results:
+        periods = warehouse.periods.get(row["symbol"], {})
+        row["periods"] = {prefix: periods.get(prefix) for prefix in prefixes}
+    return {
+        "universe": len(warehouse),
+        "matched": len(matches),
+        "results": results,
+    }
 
 
 @mcp.tool()
 async def get_company_details(company_name: str) -> str:
     """Fetch company details from Screener.in."""
-    result = await make_screener_request(f"company/{company_name}/", req_type='get')
-    if "error" in result:
-        return f"Error fetching details for {company_name}: {result['error']}"
     try:
-        html = result["response"].text
-        soup = BeautifulSoup(html, 'html.parser')
-        modal_content = soup.find('div', class_='sub show-more-box about')
-        all_p = modal_content.find_all('p')
-        about_section = "\n".join(p.get_text(strip=True) for p in all_p)
-    except Exception:
-        # logging.info(f"HTML response: {result['response'].text}")
-        return f"Error in details json for {company_name} for result: {result}: {traceback.format_exc()}"
-
-    # extract relevant info from details page in some way like using beautiful soap etc
-    return about_section
+        page = await get_company_page(company_name)
+    except ValueError as e:
+        return f"Error fetching details for {company_name}: {e}"
+    if page.about is None:
+        return f"Error in details for {company_name}: about section not found on {page.url}"
+    return page.about
 
 
 # Resource: Fetch Explore page
@@ -231,43 +337,91 @@ async def get_company_details(company_name: str) -> str:
 
 @mcp.tool()
 async def get_screens_page(page: int = None) -> str:
-    """Fetch screens page from Screener.in."""
-    if page:
-        result = await make_screener_request(f"screens/?page={page}")
-    else:
-        result = await make_screener_request(f"screens")
-    if "error" in result:
-        return f"Error fetching details for screens page: {result['error']}"
+    """Fetch screens page from Screener.in (served from the screens index)."""
+    try:
+        index = await get_screens_index()
+    except httpx.HTTPError as e:
+        return f"Error fetching details for screens page: {str(e)}"
+    entries = index.page(page or 1)
+    if entries is None:
+        return f"Error in get_screen_page func for page {page}: there are {index.pages} screens pages"
+    return json.dumps(entries)
+
+
+@mcp.tool()
+async def search_screens(query: str, limit: int = 10) -> dict[str, Any]:
+    """
+    Search Screener.in's public screens by name and description.
+
+    Args:
+        query: Words to look for, e.g. "low debt high roce"; every word must match (prefixes count).
+        limit: Return at most this many screens.
+
+    Returns:
+        Dictionary with the number of screens indexed and the matching screens
+        (name, description, author, href), best matches first.
+    """
     try:
-        html = result["response"].text
-        soup = BeautifulSoup(html, 'html.parser')
-        header_content = soup.find('div', class_='flex-row flex-space-between')
-        body_content = header_content.find_next('ul').find_all('li')
-        # logging.info(f"body_content: {body_content}")
-        # return json of all li element text and href
-        return json.dumps([{"text": li.get_text(strip=True), "href": SCREENER_API_BASE+li.a['href']} for li in body_content])
-    except Exception:
-        # logging.info(f"HTML response: {result['response'].text}")
-        return f"Error in get_screen_page func for page {page}: {traceback.format_exc()}"
+        index = await get_screens_index()
+    except httpx.HTTPError as e:
+        return {"error": f"Error fetching screens pages: {str(e)}"}
+    return {"indexed": len(index), "results": index.search(query, limit)}
+
 
 @mcp.tool()
-async def get_price_info(symbol: str, query: str = "Price-DMA50-DMA200-Volume", days: int = 365, consolidated: bool = True) -> dict[str, Any]:
-    """Fetch price and related information for a company from Screener.in."""
-    params = {
-        "q": query,
-        "days": str(days),
-        "consolidated": str(consolidated).lower(),
+async def run_screen(href: str, pages: int | None = None, offset: int = 0, limit: int = 50,
+                     ctx: Context = None) -> dict[str, Any]:
+    """
+    Run a Screener.in screen and return its result table, a chunk of rows at a time.
+
+    The full result is fetched once (result pages in parallel) and cached for a few minutes,
+    so reading the next chunk with offset=next_offset costs no requests. The returned symbols
+    can be passed straight to get_price_info and the indicator tools.
+
+    Args:
+        href: The screen's url or path, e.g. an href from search_screens or get_screens_page.
+        pages: Only the first N result pages (all of them if omitted).
+        offset: Index of the first row to return.
+        limit: Return at most this many rows.
+
+    Returns:
+        Dictionary with the screen path, the number of result pages and rows ("total"), and
+        the rows as {"index": symbols, "columns": [...], "data": [[...], ...]}, plus
+        "next_offset" while more rows remain.
+    """
+    try:
+        results, available = await run_screen_results(href, pages, progress=progress_reporter(ctx))
+    except ValueError as e:
+        return {"error": str(e)}
+    except httpx.HTTPError as e:
+        return {"error": f"Error fetching screen {href}: {str(e)}"}
+    end = offset + limit
+    return {
+        "screen": screen_path(href),
+        "result_pages": available,
+        "total": len(results),
+        "offset": offset,
+        "next_offset": end if end < len(results) else None,
+        **encode_table(results.iloc[offset:end], compact=True),
     }
-    _, company_id = await get_warehouse_and_company_id(symbol)
-    print(f"company_id: {company_id}")
-    if not company_id:
-        return {"error": f"Company ID not found for symbol: {symbol}"}
-    result = await make_screener_request(f"api/company/{company_id}/chart/", params=params)
-    if "error" in result:
-        return {"error": f"Error fetching price info for company {company_id}: {result['error']}"}
+
+@mcp.tool()
+async def get_price_info(symbol: str, query: str = "Price-DMA50-DMA200-Volume", days: int = 365, consolidated: bool = True,
+                         compact: bool = False, periods: int | None = None, precision: int | None = None) -> dict[str, Any]:
+    """Fetch price and related information for a company from Screener.in.
+
+    compact=True returns {"dates": [...], "series": {metric: [...]}} instead of the chart API payload;
+    periods keeps the last N days and precision rounds values.
+    """
     try:
-        return result["response"].json()
-    except Exception as e:
+        company_id = await resolve_company_id(symbol)
+    except (ValueError, httpx.HTTPError) as e:
+        return {"error": f"Error resolving company ID for {symbol}: {e}"}
+    try:
+        return encode_chart(await get_price_series(company_id, query, days, consolidated), compact, periods, precision)
+    except httpx.HTTPError as e:
+        return {"error": f"Error fetching price info for company {company_id}: {str(e)}"}
+    except ValueError as e:
         logging.info(f"Error parsing JSON response: {str(e)}")
         return {"error": f"Error parsing JSON response for company {company_id}: {str(e)}"}
 
@@ -283,136 +437,25 @@ async def calculate_moving_average(symbol: str) -> dict[str, Any]:
         Dictionary with stock analysis and recommendation.
     """
     # Fetch price info
-    price_data = await get_price_info(symbol)
-    if "error" in price_data:
-        return {"error": f"Failed to fetch price info for {symbol}: {price_data['error']}"}
-
-    # Extract datasets
-    datasets = {dataset["metric"]: dataset for dataset in price_data.get("datasets", [])}
-
-    # Ensure required metrics are available
-    required_metrics = ["Price", "DMA50", "DMA200", "Volume"]
-    if not all(metric in datasets for metric in required_metrics):
-        return {"error": f"Missing required metrics for {symbol}: {required_metrics}"}
-
-    # Get latest values
-    latest_price = float(datasets["Price"]["values"][-1][1])
-    latest_dma50 = float(datasets["DMA50"]["values"][-1][1])
-    latest_dma200 = float(datasets["DMA200"]["values"][-1][1])
-    latest_volume = datasets["Volume"]["values"][-1][1]
-    avg_volume = sum(v[1] for v in datasets["Volume"]["values"]) / len(datasets["Volume"]["values"])
-
-    # Determine signal
-    if latest_price > latest_dma50 > latest_dma200:
-        signal = "BULLISH"
-    elif latest_price < latest_dma50 < latest_dma200:
-        signal = "BEARISH"
-    else:
-        signal = "NEUTRAL"
-
-    # Volume analysis
-    unusual_volume = latest_volume > 1.5 * avg_volume
-
-    # Recommendation
-    if signal == "BULLISH" and unusual_volume:
-        recommendation = "STRONG BUY"
-    elif signal == "BULLISH":
-        recommendation = "BUY"
-    elif signal == "BEARISH" and unusual_volume:
-        recommendation = "STRONG SELL"
-    elif signal == "BEARISH":
-        recommendation = "SELL"
-    else:
-        recommendation = "HOLD"
-
-    return {
-        "symbol": symbol,
-        "latest_price": latest_price,
-        "latest_dma50": latest_dma50,
-        "latest_dma200": latest_dma200,
-        "latest_volume": latest_volume,
-        "average_volume": avg_volume,
-        "signal": signal,
-        "unusual_volume": unusual_volume,
-        "recommendation": recommendation,
-        "analysis": f"""Stock Analysis for {symbol}:
-Latest Price: {latest_price}
-50 DMA: {latest_dma50}
-200 DMA: {latest_dma200}
-Signal: {signal}
-Unusual Volume: {"Yes" if unusual_volume else "No"}
-Recommendation: {recommendation}
-"""
-    }
+    price_data = await get_price_info(symbol, query=chart_query(MOVING_AVERAGE_METRICS))
+    return moving_average_analysis(symbol, price_data)
 
 @mcp.tool()
-async def calculate_rsi(symbol: str, period: int = 14) -> dict[str, Any]:
+async def calculate_rsi(symbol: str, period: int = 14, mode: str = "sma") -> dict[str, Any]:
     """
     Calculate Relative Strength Index (RSI) for a symbol.
 
     Args:
         symbol: The ticker symbol to analyze.
         period: RSI calculation period.
+        mode: "sma" for rolling-mean averages of gains and losses, "wilder" for Wilder smoothing.
 
     Returns:
         Dictionary with RSI data and analysis.
     """
     # Fetch price info
-    price_data = await get_price_info(symbol, query="Price", days=365)
-    if "error" in price_data:
-        return {"error": f"Failed to fetch price info for {symbol}: {price_data['error']}"}
-
-    # Extract price data
-    datasets = {dataset["metric"]: dataset for dataset in price_data.get("datasets", [])}
-    if "Price" not in datasets:
-        return {"error": f"Price data not available for {symbol}"}
-
-    # Convert price values to a DataFrame
-    price_values = datasets["Price"]["values"]
-    df = pd.DataFrame(price_values, columns=["date", "close"])
-    df["close"] = df["close"].astype(float)
-
-    # Calculate price changes
-    delta = df["close"].diff()
-
-    # Create gain and loss series
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    # Calculate average gain and loss
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-
-    # Calculate RS and RSI
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    # Get latest RSI
-    latest_rsi = rsi.iloc[-1]
-
-    # Determine signal
-    if latest_rsi < 30:
-        signal = "OVERSOLD (Potential buy opportunity)"
-    elif latest_rsi > 70:
-        signal = "OVERBOUGHT (Potential sell opportunity)"
-    else:
-        signal = "NEUTRAL"
-
-    return {
-        "symbol": symbol,
-        "period": period,
-        "rsi": latest_rsi,
-        "signal": signal,
-        "analysis": f"""RSI Analysis for {symbol}:
-            {period}-period RSI: {latest_rsi:.2f}
-            Signal: {signal}
-            
-            Recommendation: {
-                "BUY" if latest_rsi < 30 else
-                "SELL" if latest_rsi > 70 else
-                "HOLD"
-            }"""
-    }
+    price_data = await get_price_info(symbol, query=chart_query(RSI_METRICS), days=365)
+    return rsi_analysis(symbol, price_data, period, mode)
 
 @mcp.tool()
 async def trade_recommendation(symbol: str) -> dict[str, Any]:
@@ -425,92 +468,176 @@ async def trade_recommendation(symbol: str) -> dict[str, Any]:
     Returns:
         Dictionary with trading recommendation and supporting data.
     """
-    # Calculate individual indicators
-    ma_data = await calculate_moving_average(symbol)
-    rsi_data = await calculate_rsi(symbol)
-
-    # Check for errors in the data
-    if "error" in ma_data:
-        return {"error": f"Error in moving average data: {ma_data['error']}"}
-    if "error" in rsi_data:
-        return {"error": f"Error in RSI data: {rsi_data['error']}"}
-
-    # Extract signals
-    ma_signal = ma_data["signal"]
-    rsi_value = rsi_data["rsi"]
-    rsi_signal = rsi_data["signal"]
-
-    # Determine overall signal strength
-    signal_strength = 0
-
-    # MA contribution
-    if "BULLISH" in ma_signal:
-        signal_strength += 1
-    elif "BEARISH" in ma_signal:
-        signal_strength -= 1
-
-    # RSI contribution
-    if "OVERSOLD" in rsi_signal:
-        signal_strength += 1.5
-    elif "OVERBOUGHT" in rsi_signal:
-        signal_strength -= 1.5
-
-    # Determine final recommendation
-    if signal_strength >= 2:
-        recommendation = "STRONG BUY"
-    elif signal_strength > 0:
-        recommendation = "BUY"
-    elif signal_strength <= -2:
-        recommendation = "STRONG SELL"
-    elif signal_strength < 0:
-        recommendation = "SELL"
-    else:
-        recommendation = "HOLD"
-
-    # Calculate risk level
-    risk_level = "MEDIUM"
-    if abs(signal_strength) > 3:
-        risk_level = "LOW"  # Strong signal, lower risk
-    elif abs(signal_strength) < 1:
-        risk_level = "HIGH"  # Weak signal, higher risk
-
-    analysis = f"""# Trading Recommendation for {symbol}
-
-        ## Summary
-        Recommendation: {recommendation}
-        Risk Level: {risk_level}
-        Signal Strength: {signal_strength:.1f} / 4.5
-        
-        ## Technical Indicators
-        Moving Averages: {ma_signal}
-        RSI ({rsi_data["period"]}): {rsi_value:.2f} - {rsi_signal}
-        
-        ## Reasoning
-        This recommendation is based on a combination of Moving Average analysis and RSI indicators.
-        {
-            f"The RSI indicates the stock is {rsi_signal.split(' ')[0].lower()}. " if "NEUTRAL" not in rsi_signal else ""
-        }
-        
-        ## Action Plan
-        {
-            "Consider immediate entry with a stop loss at the recent low. Target the next resistance level." if recommendation == "STRONG BUY" else
-            "Look for a good entry point on small dips. Set reasonable stop loss." if recommendation == "BUY" else
-            "Consider immediate exit or setting tight stop losses to protect gains." if recommendation == "STRONG SELL" else
-            "Start reducing position on strength or set trailing stop losses." if recommendation == "SELL" else
-            "Monitor the position but no immediate action needed."
-        }
-        """
+    # Fetch the union of the metrics both indicators need once, then run each on it
+    price_data = await get_price_info(symbol, query=chart_query(MOVING_AVERAGE_METRICS, RSI_METRICS), days=365)
+    ma_data = moving_average_analysis(symbol, price_data)
+    rsi_data = rsi_analysis(symbol, price_data)
+    return combine_signals(symbol, ma_data, rsi_data)
 
-    return {
-        "symbol": symbol,
-        "recommendation": recommendation,
-        "risk_level": risk_level,
-        "signal_strength": signal_strength,
-        "ma_signal": ma_signal,
-        "rsi_signal": rsi_signal,
-        "current_price": ma_data["latest_price"],
-        "analysis": analysis
-    }
+@mcp.tool()
+async def calculate_indicators(symbols: list[str], days: int = 365, rsi_period: int = 14, rsi_mode: str = "wilder",
+                               concurrency: int | None = None) -> dict[str, Any]:
+    """
+    Latest technical indicators for several symbols, computed together in one vectorized pass.
+
+    Covers RSI, SMA 20/50/200, EMA 12/26, MACD, Bollinger bands, ATR-style volatility and volume z-score.
+
+    Args:
+        symbols: The ticker symbols to analyze.
+        days: Days of price history to compute over.
+        rsi_period: RSI calculation period.
+        rsi_mode: "wilder" for Wilder smoothing, "sma" for rolling-mean averages.
+        concurrency: How many price series to fetch at a time (defaults to SCREENER_BATCH_CONCURRENCY).
+
+    Returns:
+        Dictionary with each symbol's latest indicator values under "results" and failures under "errors".
+    """
+    if rsi_mode not in RSI_MODES:
+        return {"error": f"Unknown RSI mode {rsi_mode!r}, expected one of {RSI_MODES}"}
+    fetched = await run_batch(symbols, lambda s: get_price_info(s, query="Price-Volume", days=days), concurrency)
+    payloads = fetched["results"]
+    if payloads:
+        dates, close = align_series(payloads, "Price")
+        _, volume = align_series(payloads, "Volume")
+        indicators = compute_indicators(close, volume, rsi_period=rsi_period, rsi_mode=rsi_mode)
+        fetched["results"] = dict(zip(payloads, latest_values(dates, indicators)))
+    return fetched
+
+@mcp.tool()
+async def backtest_strategy(symbols: list[str], params: dict[str, Any] | None = None, days: int = 1095,
+                            rank_by: str = "total_return", top: int = 10,
+                            concurrency: int | None = None) -> dict[str, Any]:
+    """
+    Backtest the trade_recommendation rule over each symbol's price history, for one or many parameter sets.
+
+    Every bar is scored as trade_recommendation scores the latest one; a long position opens on a score of at
+    least min_strength and closes when the score drops to 0 or below. All symbols and parameter sets are
+    evaluated together in one vectorized pass.
+
+    Args:
+        symbols: The ticker symbols to test on.
+        params: Rule parameters; a list of values sweeps that parameter and every combination is tested.
+            rsi_period (14), rsi_mode ("sma"), oversold (30), overbought (70), ma_fast (50), ma_slow (200),
+            volume_multiplier (0: entries need volume above this multiple of its volume_window-day average),
+            volume_window (50), min_strength (0.5; 2 for STRONG BUY only), cost_bps (0, per side).
+        days: Days of price history to test over; symbols the chart API answers with weekly bars are reported
+            under "errors".
+        rank_by: "total_return", "annual_return", "sharpe", "hit_rate" or "max_drawdown" (averaged over symbols).
+        top: How many of the ranked parameter sets to return.
+        concurrency: How many price series to fetch at a time (defaults to SCREENER_BATCH_CONCURRENCY).
+
+    Returns:
+        Dictionary with the ranked parameter sets under "results" (returns, drawdowns and hit rates as
+        fractions), the best set per symbol under "best", and fetch failures under "errors".
+    """
+    try:
+        grid = parameter_grid(params)
+        if rank_by not in RANKINGS:
+            raise ValueError(f"Unknown ranking {rank_by!r}, expected one of {list(RANKINGS)}")
+    except ValueError as e:
+        return {"error": str(e)}
+    fetched = await run_batch(symbols, lambda s: get_price_info(s, query="Price-Volume", days=days), concurrency)
+    payloads = fetched.pop("results")
+    # Windows and annualization count trading days, so weekly bars would be misread
+    for symbol in [s for s, data in payloads.items() if is_weekly(data)]:
+        del payloads[symbol]
+        fetched["errors"][symbol] = f"The chart API returned weekly bars for {days} days; backtest fewer days"
+        fetched["succeeded"] -= 1
+        fetched["failed"] += 1
+    if not payloads:
+        return {"error": "No price history to backtest", **fetched}
+    dates, close = align_series(payloads, "Price")
+    _, volume = align_series(payloads, "Volume")
+    try:
+        metrics = backtest(close, volume, grid)
+    except ValueError as e:
+        return {"error": str(e), **fetched}
+    return {"from": dates[0], "to": dates[-1], **summarize(list(payloads), grid, metrics, rank_by, top), **fetched}
+
+# Batch variants of the price and indicator tools
+@mcp.tool()
+async def get_price_info_batch(symbols: list[str], query: str = "Price-DMA50-DMA200-Volume", days: int = 365,
+                               consolidated: bool = True, concurrency: int | None = None) -> dict[str, Any]:
+    """Fetch price information for several symbols at once; per-symbol errors are reported, not raised."""
+    return await run_batch(symbols, lambda s: get_price_info(s, query, days, consolidated), concurrency)
+
+@mcp.tool()
+async def calculate_moving_average_batch(symbols: list[str], concurrency: int | None = None) -> dict[str, Any]:
+    """Moving average analysis (see calculate_moving_average) for several symbols at once."""
+    return await run_batch(symbols, calculate_moving_average, concurrency)
+
+@mcp.tool()
+async def calculate_rsi_batch(symbols: list[str], period: int = 14, mode: str = "sma",
+                              concurrency: int | None = None) -> dict[str, Any]:
+    """RSI analysis (see calculate_rsi, including its "sma" / "wilder" mode) for several symbols at once."""
+    if mode not in RSI_MODES:
+        return {"error": f"Unknown RSI mode {mode!r}, expected one of {RSI_MODES}"}
+    return await run_batch(symbols, lambda s: calculate_rsi(s, period, mode), concurrency)
+
+@mcp.tool()
+async def trade_recommendation_batch(symbols: list[str], concurrency: int | None = None) -> dict[str, Any]:
+    """
+    Trade recommendations (see trade_recommendation) for a watchlist in one call.
+
+    Args:
+        symbols: The ticker symbols to analyze.
+        concurrency: How many symbols to analyze at a time (defaults to SCREENER_BATCH_CONCURRENCY).
+
+    Returns:
+        Dictionary with per-symbol recommendations under "results" and failures under "errors".
+    """
+    return await run_batch(symbols, trade_recommendation, concurrency)
+
+# Watchlist kept warm in the background by the scheduler
+@mcp.tool()
+async def get_watchlist() -> dict[str, Any]:
+    """Symbols the server keeps warm in the background, the refresh interval and when each was last refreshed.
+
+    "file_error" says why the watchlist file could not be read; the last good watchlist is used meanwhile.
+    """
+    return get_scheduler().status()
+
+@mcp.tool()
+async def update_watchlist(add: list[str] | None = None, remove: list[str] | None = None,
+                           interval: float | None = None) -> dict[str, Any]:
+    """
+    Add or remove symbols from the background-refreshed watchlist, or change its refresh interval.
+
+    Args:
+        add: Symbols to start keeping warm (fundamentals, company IDs and price series).
+        remove: Symbols to stop refreshing.
+        interval: Seconds between refreshes of each symbol.
+
+    Returns:
+        The updated watchlist status (see get_watchlist). Changes are saved to the watchlist file.
+    """
+    if interval is not None and interval <= 0:
+        return {"error": "interval must be positive"}
+    get_scheduler().update(add, remove, interval)
+    return get_scheduler().status()
+
+# Resource: upstream request coalescing counters
+@mcp.resource("stats://coalescing")
+def get_coalescing_stats() -> str:
+    """Executed vs coalesced upstream calls for each fetcher (company page, chart, search, ...)."""
+    return json.dumps(singleflight_stats())
+
+# Resource: cache hit/miss/eviction metrics
+@mcp.resource("stats://cache")
+def get_cache_stats() -> str:
+    """Hit, miss and eviction counts for the memory and persistent cache tiers, per dataset."""
+    return json.dumps(get_cache().stats())
+
+# Resource: tool and upstream latency metrics
+@mcp.resource("stats://metrics")
+def get_metrics() -> str:
+    """Tool latency, upstream latency and bytes by endpoint, parse time, cache hit ratios and coalescing counters."""
+    return json.dumps(metrics_snapshot())
+
+@mcp.resource("stats://metrics/prometheus", mime_type="text/plain")
+def get_prometheus_metrics() -> str:
+    """The same metrics in the Prometheus text exposition format."""
+    return prometheus_text()
 
 @mcp.prompt()
 def analyze_ticker(symbol: str) -> str:
@@ -552,7 +679,7 @@ def compare_tickers(symbols: str) -> str:
         For each stock in the list, please:
         
         1. Check the current market data using the appropriate resource
-        2. Generate a comprehensive trade recommendation using the trade_recommendation tool
+        2. Generate trade recommendations for all of them in one call using the trade_recommendation_batch tool
         3. Compare all stocks based on:
            - Current trend direction and strength
            - Technical indicator signals
@@ -0,0 +1,75 @@
+"""In-flight request coalescing ("singleflight") for upstream fetchers.
+
+A cache only helps once the first call has finished. If several tools miss
+on the same key at the same moment, each would go upstream on its own.
+Wrapping the fetcher in a SingleFlight group runs the first caller's fetch
+as a task that every caller with the same key, the first included, awaits;
+a caller that is cancelled stops waiting without cancelling the fetch.
+"""
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+import asyncio
+import functools
+
+T = TypeVar("T")
+
+_groups: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            # A task of its own: cancelling the caller that started it must not cancel the others' result
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.executed += 1
+            task.add_done_callback(functools.partial(self._finished, key))
+        else:
+            self.coalesced += 1
+        # shield: one waiter being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark retrieved so a call with no waiters left doesn't log a warning
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+def get_group(name: str) -> SingleFlight:
+    if name not in _groups:
+        _groups[name] = SingleFlight(name)
+    return _groups[name]
+
+
+def coalesced(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator: coalesce concurrent calls to an async function with equal arguments."""
+    group = get_group(name)
+
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            key = (args, tuple(sorted(kwargs.items())))
+            return await group.do(key, lambda: fn(*args, **kwargs))
+
+        wrapper.singleflight = group
+        return wrapper
+
+    return decorator
+
+
+def singleflight_stats() -> dict[str, dict[str, int]]:
+    """Executed / coalesced / in-flight counts for every group."""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,192 @@
+"""Persistent symbol -> (warehouse_id, company_id, url) resolution index.
+
+Screener's IDs never change for a listed company, so once a symbol has been
+resolved from its company page (found through the search API when the symbol
+is not a page slug) it is stored in a local SQLite file and every later
+lookup is a single indexed read.
+
+Bulk pre-seed from the command line:
+
+    python symbol_index.py TCS WIPRO INFY
+    python symbol_index.py --file nifty500.txt
+"""
+from dataclasses import dataclass
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+
+from batch import run_batch
+from cache import SCREENER_CACHE_DIR
+from company_page import get_company_page, normalize_symbol
+from screener_api import search_companies
+from singleflight import coalesced
+
+SCREENER_SYMBOL_INDEX = os.getenv("SCREENER_SYMBOL_INDEX", os.path.join(SCREENER_CACHE_DIR, "symbols.sqlite3"))
+
+
+@dataclass(frozen=True)
+class CompanyIds:
+    symbol: str
+    warehouse_id: str
+    company_id: str
+    url: str
+
+
+class SymbolIndex:
+    """SQLite-backed map of normalized symbol to resolved Screener IDs."""
+
+    def __init__(self, path: str = SCREENER_SYMBOL_INDEX):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # WAL and a busy timeout: several server processes (serve.py) share the index
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS symbols ("
+            " symbol TEXT PRIMARY KEY, warehouse_id TEXT NOT NULL, company_id TEXT NOT NULL,"
+            " url TEXT NOT NULL, resolved_at REAL NOT NULL)"
+        )
+        # Company ids seen in listings (e.g. screen results) that carry no warehouse id
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS listed ("
+            " symbol TEXT PRIMARY KEY, company_id TEXT NOT NULL, url TEXT NOT NULL, seen_at REAL NOT NULL)"
+        )
+
+    def get(self, symbol: str) -> CompanyIds | None:
+        row = self._conn.execute(
+            "SELECT symbol, warehouse_id, company_id, url FROM symbols WHERE symbol = ?",
+            (normalize_symbol(symbol),),
+        ).fetchone()
+        return CompanyIds(*row) if row else None
+
+    def put(self, ids: CompanyIds) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?)",
+            (normalize_symbol(ids.symbol), ids.warehouse_id, ids.company_id, ids.url, time.time()),
+        )
+
+    def company_id(self, symbol: str) -> str | None:
+        """Company id of `symbol` from a full resolution or, failing that, a listing."""
+        row = self._conn.execute(
+            "SELECT company_id FROM symbols WHERE symbol = ?1"
+            " UNION ALL SELECT company_id FROM listed WHERE symbol = ?1 LIMIT 1",
+            (normalize_symbol(symbol),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_listed(self, rows: list[tuple[str, str, str]]) -> None:
+        """Record (symbol, company_id, url) rows seen in a listing."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO listed VALUES (?, ?, ?, ?)",
+            [(normalize_symbol(symbol), company_id, url, now) for symbol, company_id, url in rows],
+        )
+
+    def remove(self, symbol: str) -> None:
+        self._conn.execute("DELETE FROM symbols WHERE symbol = ?", (normalize_symbol(symbol),))
+        self._conn.execute("DELETE FROM listed WHERE symbol = ?", (normalize_symbol(symbol),))
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_index: SymbolIndex | None = None
+
+
+def get_symbol_index() -> SymbolIndex:
+    global _index
+    if _index is None:
+        _index = SymbolIndex()
+    return _index
+
+
+def configure_symbol_index(path: str) -> SymbolIndex:
+    """Point the process-wide index at another file (tests, alternate deployments)."""
+    global _index
+    if _index is not None:
+        _index.close()
+    _index = SymbolIndex(path)
+    return _index
+
+
+async def _lookup(symbol: str) -> CompanyIds:
+    logging.info("Resolving company ids: " + symbol)
+    try:
+        # Same page (and cache entry) the fundamentals tools use
+        page = await get_company_page(symbol)
+    except ValueError:
+        # Not a valid page slug, ask the search API for the company url
+        matches = await search_companies(symbol)
+        if not matches:
+            raise ValueError(f"No company found for symbol: {symbol}")
+        page = await get_company_page(matches[0]['url'].strip("/").removeprefix("company/"))
+    if not page.warehouse_id or not page.company_id:
+        raise ValueError(f"Company IDs not found on page {page.url} for symbol: {symbol}")
+    return CompanyIds(normalize_symbol(symbol), page.warehouse_id, page.company_id, page.url)
+
+
+async def resolve_company(symbol: str) -> CompanyIds:
+    """Resolve a symbol from the index, falling back to Screener on a miss.
+
+    Concurrent misses for the same symbol share one upstream lookup.
+    """
+    key = normalize_symbol(symbol)
+    ids = get_symbol_index().get(key)
+    if ids is not None:
+        return ids
+    return await _resolve_and_store(key)
+
+
+async def resolve_company_id(symbol: str) -> str:
+    """Company id (all the chart API needs) of a symbol, without a lookup if any listing has shown it."""
+    company_id = get_symbol_index().company_id(symbol)
+    if company_id is not None:
+        return company_id
+    return (await resolve_company(symbol)).company_id
+
+
+@coalesced("resolve")
+async def _resolve_and_store(key: str) -> CompanyIds:
+    ids = await _lookup(key)
+    get_symbol_index().put(ids)
+    return ids
+
+
+async def seed(symbols: list[str], concurrency: int = 5) -> dict[str, str]:
+    """Resolve many symbols up front; returns symbol -> "ok" or an error message."""
+    outcome = await run_batch([normalize_symbol(s) for s in symbols], resolve_company, concurrency)
+    status = {symbol: "ok" for symbol in outcome["results"]}
+    status.update({symbol: f"error: {error}" for symbol, error in outcome["errors"].items()})
+    return status
+
+
+if __name__ == "__main__":
+    from http_client import close_client
+
+    parser = argparse.ArgumentParser(description="Pre-seed the Screener.in symbol index.")
+    parser.add_argument("symbols", nargs="*", help="ticker symbols to resolve")
+    parser.add_argument("--file", help="file with one symbol per line")
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip()]
+
+    async def main() -> None:
+        try:
+            status = await seed(symbols, args.concurrency)
+        finally:
+            await close_client()
+        for symbol, result in sorted(status.items()):
+            print(f"{symbol}: {result}")
+        print(f"{len(get_symbol_index())} symbols in {get_symbol_index().path}")
+
+    asyncio.run(main())
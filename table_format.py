@@ -0,0 +1,105 @@
+"""Result encodings for the table- and series-returning tools.
+
+By default the tools keep returning `df.to_dict()` (column -> row -> value)
+and the raw chart payload. With `compact=True` they return a split layout
+instead: row labels and column labels once, then a list of value rows. NaN
+becomes null and whole numbers are written without a trailing ".0". Either
+layout can be cut down to the last `periods` columns (or chart days) and to
+selected line `items`, and rounded to `precision` decimals.
+"""
+from __future__ import annotations
+
+from typing import Any
+import math
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+
+def _scalar(value: Any, precision: int | None) -> Any:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if precision is not None:
+            value = round(value, precision)
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def _tail(values: list, periods: int | None) -> list:
+    return values[-periods:] if periods else values
+
+
+def _round_point(point: list, precision: int | None) -> list:
+    # [date, value, extras...] with the value rounded, as the chart API shapes points
+    return point if precision is None else [point[0], _scalar(float(point[1]), precision), *point[2:]]
+
+
+def _compact_values(df: pd.DataFrame, precision: int | None) -> list[list[Any]]:
+    if not all(pd.api.types.is_float_dtype(dtype) or pd.api.types.is_integer_dtype(dtype) for dtype in df.dtypes):
+        return [[_scalar(v, precision) for v in row] for row in df.itertuples(index=False, name=None)]
+    return _compact_array(df.to_numpy(dtype=float), precision)
+
+
+def _compact_array(values: np.ndarray, precision: int | None) -> list[list[Any]]:
+    # Converted in bulk rather than cell by cell: whole numbers to int, NaN to None
+    if precision is not None:
+        values = values.round(precision)
+    missing = np.isnan(values)
+    whole = ~missing & (values == np.trunc(values))
+    out = values.astype(object)
+    out[whole] = values[whole].astype(np.int64)
+    out[missing] = None
+    return out.tolist()
+
+
+def slice_table(df: pd.DataFrame, periods: int | None = None, items: list[str] | None = None) -> pd.DataFrame:
+    """Keep the last `periods` columns and the rows named in `items` (in that order)."""
+    if items:
+        df = df.loc[[item for item in items if item in df.index]]
+    if periods:
+        df = df.iloc[:, -periods:]
+    return df
+
+
+def encode_table(df: pd.DataFrame, compact: bool = False, periods: int | None = None,
+                 items: list[str] | None = None, precision: int | None = None) -> dict[str, Any]:
+    """A fundamentals table as a tool result."""
+    df = slice_table(df, periods, items)
+    if not compact:
+        return (df if precision is None else df.round(precision)).to_dict()
+    return {
+        "name": df.index.name,
+        "index": df.index.tolist(),
+        "columns": df.columns.tolist(),
+        "data": _compact_values(df, precision),
+    }
+
+
+def encode_chart(payload: dict[str, Any], compact: bool = False, periods: int | None = None,
+                 precision: int | None = None) -> dict[str, Any]:
+    """A chart API payload as a tool result.
+
+    The compact layout puts every metric on one date axis:
+    {"dates": [...], "series": {"Price": [...], "Volume": [...]}}.
+    """
+    if "error" in payload:
+        return payload
+    datasets = payload.get("datasets", [])
+    if not compact:
+        if periods or precision is not None:
+            payload = {**payload, "datasets": [{**d, "values": [_round_point(v, precision) for v in _tail(d["values"], periods)]}
+                                               for d in datasets]}
+        return payload
+    dates = _tail(sorted({v[0] for d in datasets for v in d["values"]}), periods)
+    position = {day: i for i, day in enumerate(dates)}
+    values = np.full((len(datasets), len(dates)), np.nan)
+    for row, d in enumerate(datasets):
+        kept = [(position[v[0]], v[1]) for v in d["values"] if v[0] in position]
+        if kept:
+            columns, points = zip(*kept)
+            values[row, list(columns)] = np.array(points, dtype=float)
+    return {"dates": dates, "series": dict(zip((d["metric"] for d in datasets), _compact_array(values, precision)))}
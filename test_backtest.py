@@ -0,0 +1,97 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from backtest import DEFAULT_PARAMS, backtest, parameter_grid, summarize
+from benchmarks.bench_backtest import loop_backtest
+from benchmarks.stub_server import chart_payload, company_ids
+from server import backtest_strategy
+
+
+def random_walk(symbols: int, days: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (symbols, days)), axis=1))
+    volume = rng.integers(100_000, 5_000_000, (symbols, days)).astype(float)
+    return close, volume
+
+
+def test_backtest_matches_a_bar_by_bar_loop():
+    close, volume = random_walk(3, 600)
+    grid = parameter_grid({"rsi_period": [7, 14], "volume_multiplier": [0, 1.2], "ma_fast": 20, "ma_slow": 60})
+    metrics = backtest(close, volume, grid)
+    assert metrics["total_return"].shape == (4, 3)
+    for i, p in enumerate(grid):
+        for s in range(3):
+            expected = loop_backtest(list(close[s]), list(volume[s]), p)
+            assert metrics["total_return"][i, s] == pytest.approx(expected["total_return"])
+            assert metrics["max_drawdown"][i, s] == pytest.approx(expected["max_drawdown"])
+            assert (metrics["trades"][i, s], metrics["wins"][i, s]) == (expected["trades"], expected["wins"])
+    assert metrics["buy_and_hold"][0] == pytest.approx(close[:, -1] / close[:, 0] - 1)
+
+
+def test_costs_and_missing_history():
+    close, volume = random_walk(2, 400)
+    close[1, :150] = np.nan
+    free, costly = parameter_grid({"cost_bps": [0, 10], "ma_fast": 20, "ma_slow": 60})
+    metrics = backtest(close, volume, [free, costly])
+    assert metrics["buy_and_hold"][0, 1] == pytest.approx(close[1, -1] / close[1, 150] - 1)
+    assert np.all(metrics["trades"][0] > 0)
+    # Each trade pays 2 x 10 bps
+    expected = np.log1p(metrics["total_return"][0]) + metrics["trades"][0] * math.log1p(-0.002)
+    assert np.log1p(metrics["total_return"][1]) == pytest.approx(expected)
+    assert metrics["total_return"][1, 0] == pytest.approx(loop_backtest(list(close[0]), list(volume[0]), costly)["total_return"])
+
+
+def test_parameter_grid_validates_and_caps_the_sweep(monkeypatch):
+    assert parameter_grid() == [DEFAULT_PARAMS]
+    assert len(parameter_grid({"rsi_period": [7, 14, 21], "volume_multiplier": [0, 1.5]})) == 6
+    for params in ({"period": 14}, {"rsi_mode": "ema"}, {"ma_fast": 0}, {"oversold": "low"}):
+        with pytest.raises(ValueError):
+            parameter_grid(params)
+    monkeypatch.setattr("backtest.SCREENER_BACKTEST_MAX_COMBINATIONS", 4)
+    with pytest.raises(ValueError, match="6 parameter combinations"):
+        parameter_grid({"rsi_period": [7, 14, 21], "volume_multiplier": [0, 1.5]})
+
+
+def test_summarize_ranks_the_sweep():
+    close, volume = random_walk(4, 500)
+    grid = parameter_grid({"rsi_period": [7, 14], "oversold": [25, 35], "ma_fast": 20, "ma_slow": 60})
+    summary = summarize(["A", "B", "C", "D"], grid, backtest(close, volume, grid), rank_by="max_drawdown", top=3)
+    assert summary["combinations"] == 4 and len(summary["results"]) == 3
+    assert set(summary["results"][0]["params"]) == {"rsi_period", "oversold"}
+    drawdowns = [r["max_drawdown"] for r in summary["results"]]
+    assert drawdowns == sorted(drawdowns)
+    assert set(summary["best"]["per_symbol"]) == {"A", "B", "C", "D"}
+
+
+def test_backtest_strategy_against_stub(run_against_stub):
+    async def run(stub):
+        outcome = await backtest_strategy(["TCS", "INFY"], {"rsi_period": [7, 14], "volume_multiplier": [0, 1.5]},
+                                          days=730)
+        return outcome, dict(stub.hits), await backtest_strategy(["TCS"], {"rsi_period": "x"})
+
+    outcome, hits, invalid = run_against_stub(run)
+    assert hits["chart"] == 2 and outcome["failed"] == 0
+    assert outcome["combinations"] == 4 and len(outcome["results"]) == 4
+    assert set(outcome["best"]["per_symbol"]) == {"TCS", "INFY"}
+    assert "error" in invalid
+
+
+def test_weekly_bars_are_reported_not_backtested(run_against_stub):
+    def weekly_infy(method, path, query):
+        if path == f"/api/company/{company_ids('INFY')[1]}/chart/":
+            payload = chart_payload("INFY", query["q"][0], int(query["days"][0]))
+            for dataset in payload["datasets"]:
+                dataset["meta"]["is_weekly"] = True
+            return 200, {"content-type": "application/json"}, json.dumps(payload).encode()
+        return None
+
+    async def run(stub):
+        return await backtest_strategy(["TCS", "INFY"], days=730), await backtest_strategy(["INFY"], days=730)
+
+    outcome, weekly_only = run_against_stub(run, weekly_infy)
+    assert (outcome["succeeded"], outcome["failed"]) == (1, 1)
+    assert list(outcome["best"]["per_symbol"]) == ["TCS"] and "weekly" in outcome["errors"]["INFY"]
+    assert "error" in weekly_only and "weekly" in weekly_only["errors"]["INFY"]
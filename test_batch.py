@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import http_client
+from batch import run_batch
+from benchmarks.stub_server import StubScreener
+from rate_limit import TokenBucket
+from server import calculate_rsi, calculate_rsi_batch, trade_recommendation_batch
+
+
+def test_batch_reports_partial_results_with_per_symbol_errors():
+    async def run():
+        async with StubScreener() as stub:
+            # BROKEN has no company page and no search match
+            stub.responder = lambda method, path, query: (
+                (404, {}, b"") if path == "/company/BROKEN/" else
+                (200, {"content-type": "application/json"}, b"[]") if query.get("q") == ["BROKEN"] else None)
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                return await trade_recommendation_batch(["TCS", "BROKEN", "INFY", "TCS"])
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+
+    outcome = asyncio.run(run())
+    assert (outcome["requested"], outcome["succeeded"], outcome["failed"]) == (3, 2, 1)
+    assert set(outcome["results"]) == {"TCS", "INFY"}
+    assert outcome["results"]["TCS"]["recommendation"] in {"STRONG BUY", "BUY", "HOLD", "SELL", "STRONG SELL"}
+    assert "BROKEN" in outcome["errors"]
+
+
+def test_batch_respects_the_concurrency_limit():
+    in_flight = peak = 0
+
+    async def work(symbol):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"symbol": symbol}
+
+    outcome = asyncio.run(run_batch([f"S{i}" for i in range(12)], work, concurrency=3))
+    assert outcome["succeeded"] == 12
+    assert peak == 3
+
+
+def test_rsi_batch_against_stub():
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                return await calculate_rsi_batch(["WIPRO", "HDFCBANK"], period=14)
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+
+    outcome = asyncio.run(run())
+    assert outcome["failed"] == 0
+    assert 0 <= outcome["results"]["WIPRO"]["rsi"] <= 100
+
+
+def test_rsi_batch_forwards_the_mode(run_against_stub):
+    async def run(stub):
+        wilder = await calculate_rsi_batch(["WIPRO", "HDFCBANK"], period=14, mode="wilder")
+        single = await calculate_rsi("WIPRO", 14, "wilder"), await calculate_rsi("WIPRO", 14)
+        return wilder, single, await calculate_rsi_batch(["WIPRO"], mode="ema")
+
+    wilder, (single_wilder, single_sma), invalid = run_against_stub(run)
+    assert wilder["failed"] == 0
+    assert wilder["results"]["WIPRO"]["rsi"] == single_wilder["rsi"] != single_sma["rsi"]
+    assert "ema" in invalid["error"]
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    async def run():
+        bucket = TokenBucket(rate=100, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 2 immediate, then 4 more at 100/s
+    assert 0.03 <= asyncio.run(run()) < 0.2
@@ -0,0 +1,159 @@
+import asyncio
+
+import pandas as pd
+
+import cache
+from benchmarks.stub_redis import MiniRedis
+from cache import DiskTier, MemoryLRU, RedisTier, TieredCache
+
+
+def test_memory_tier_evicts_least_recently_used_by_size():
+    lru = MemoryLRU(max_bytes=100)
+    lru.set("a", "A", 40, expires_at=float("inf"))
+    lru.set("b", "B", 40, expires_at=float("inf"))
+    assert lru.get("a") == (True, "A")  # "b" is now the least recently used
+    lru.set("c", "C", 40, expires_at=float("inf"))
+    assert lru.get("b") == (False, None)
+    assert lru.get("a")[0] and lru.get("c")[0]
+    assert lru.bytes == 80
+    assert lru.stats.evictions == 1
+
+
+def test_expired_entries_are_misses():
+    lru = MemoryLRU(max_bytes=100)
+    lru.set("a", "A", 10, expires_at=0)
+    assert lru.get("a") == (False, None)
+    assert lru.stats.expired == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    frame = pd.DataFrame({"Mar 2024": [1.0, 2.0]}, index=["Sales", "Expenses"])
+
+    async def write():
+        await TieredCache(1 << 20, DiskTier(path)).set("balance_sheet", "WIPRO", frame)
+
+    async def read():
+        fresh = TieredCache(1 << 20, DiskTier(path))
+        return await fresh.get("balance_sheet", "WIPRO"), fresh.stats()
+
+    asyncio.run(write())
+    (hit, value), stats = asyncio.run(read())
+    assert hit
+    pd.testing.assert_frame_equal(value, frame)
+    assert stats["second_tier"]["hits"] == 1
+    assert stats["memory"]["entries"] == 1  # promoted
+
+
+def test_redis_tier_against_local_stand_in():
+    async def run():
+        async with MiniRedis() as redis:
+            tiered = TieredCache(1 << 20, RedisTier(redis.url))
+            await tiered.set("chart", "TCS", {"datasets": []}, ttl=60)
+            tiered.memory.clear()
+            hit = await tiered.get("chart", "TCS")
+            await tiered.set("chart", "short", 1, ttl=0.01)
+            await asyncio.sleep(0.05)
+            tiered.memory.clear()
+            expired = await tiered.get("chart", "short")
+            return hit, expired, redis.commands
+
+    hit, expired, commands = asyncio.run(run())
+    assert hit == (True, {"datasets": []})
+    assert expired == (False, None)
+    assert commands >= 4
+
+
+def test_unreachable_second_tier_degrades_to_a_miss():
+    async def run():
+        tiered = TieredCache(1 << 20, RedisTier("redis://127.0.0.1:1/0"))
+        await tiered.set("chart", "TCS", 1)
+        tiered.memory.clear()
+        return await tiered.get("chart", "TCS"), tiered.stats()
+
+    result, stats = asyncio.run(run())
+    assert result == (False, None)
+    assert stats["second_tier"]["errors"] == 2
+
+
+def test_per_dataset_ttl_policy(monkeypatch):
+    assert cache.ttl_for("chart") < cache.ttl_for("search")
+    monkeypatch.setenv("SCREENER_TTL_CHART", "42")
+    assert cache.ttl_for("chart") == 42
+
+
+def test_cached_decorator_counts_hits_per_dataset():
+    calls = 0
+
+    @cache.cached("search")
+    async def lookup(query):
+        nonlocal calls
+        calls += 1
+        return [query]
+
+    async def run():
+        await lookup("TCS")
+        await lookup("TCS")
+        return cache.get_cache().stats()["datasets"]["search"]
+
+    stats = asyncio.run(run())
+    assert calls == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_stale_results_are_served_while_refreshed_in_the_background(monkeypatch, tmp_path):
+    monkeypatch.setenv("SCREENER_TTL_SEARCH", "0.3")
+    monkeypatch.setenv("SCREENER_STALE_SEARCH", "60")
+    cache.configure_cache(backend="disk", path=str(tmp_path / "cache.sqlite3"))
+    calls = 0
+
+    @cache.cached("search")
+    async def lookup(query):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [query, calls]
+
+    async def run():
+        first = await lookup("TCS")
+        await asyncio.sleep(0.35)
+        stale = await lookup("TCS")
+        again = await lookup("TCS")  # the refresh is still running: stale again, no second refresh
+        await asyncio.sleep(0.05)
+        refreshed = await lookup("TCS")
+        cache.get_cache().memory.clear()
+        # Refreshing ahead reaches at most half a TTL, so let the entry get that close to expiry
+        await asyncio.sleep(0.2)
+        with cache.refreshing(ahead=10):
+            forced = await lookup("TCS")
+        return first, stale, again, refreshed, forced, cache.get_cache().stats()["datasets"]["search"]
+
+    first, stale, again, refreshed, forced, stats = asyncio.run(run())
+    assert first == stale == again == ["TCS", 1]
+    assert refreshed == ["TCS", 2]
+    assert forced == ["TCS", 3]
+    assert stats["stale"] == 2
+
+
+def test_freshness_honours_the_refreshing_context():
+    now = 1000.0
+    assert cache.freshness(1010, 1100, now) == "fresh"
+    assert cache.freshness(990, 1100, now) == "stale"
+    assert cache.freshness(900, 990, now) == "miss"
+    with cache.refreshing():
+        assert cache.freshness(1010, 1100, now) == "fresh"
+        assert cache.freshness(990, 1100, now) == "miss"
+    with cache.refreshing(ahead=30):
+        assert cache.freshness(1010, 1100, now) == "miss"
+    assert cache.freshness(990, 1100, now) == "stale"
+
+
+def test_entries_from_before_stale_while_revalidate_still_read(tmp_path):
+    import pickle
+
+    async def run():
+        tier = DiskTier(str(tmp_path / "cache.sqlite3"))
+        await tier.set("screener:search:TCS", pickle.dumps(["old"]), 60)
+        return await TieredCache(1 << 20, tier).lookup("search", "TCS")
+
+    assert asyncio.run(run()) == ("fresh", ["old"])
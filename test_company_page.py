@@ -0,0 +1,70 @@
+import asyncio
+
+import http_client
+from benchmarks.stub_server import StubScreener, company_ids, render_company_page
+import company_page
+from cache import get_cache
+from company_page import parse_company_page
+from parsing import SECTIONS
+from server import get_company_details, get_fundamentals, get_quarterly_results, get_ratios, get_warehouse_and_company_id
+
+
+def test_parse_company_page_exposes_about_and_ids():
+    page = parse_company_page("WIPRO", "/company/WIPRO/", render_company_page("WIPRO"))
+    assert (page.warehouse_id, page.company_id) == company_ids("WIPRO")
+    assert page.about.startswith("WIPRO Ltd is a diversified company")
+    assert len(page.about.splitlines()) == 2
+
+
+def test_tools_share_a_single_page_fetch():
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                # Any spelling of the symbol is the same page
+                await get_quarterly_results("shared")
+                await get_ratios("SHARED")
+                about = await get_company_details("Shared ")
+                ids = await get_warehouse_and_company_id("shared")
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+            return about, ids, dict(stub.hits)
+
+    about, ids, hits = asyncio.run(run())
+    assert "SHARED Ltd" in about
+    assert ids == company_ids("SHARED")
+    assert hits == {"company": 1}
+
+
+def test_sections_are_parsed_and_cached_only_when_asked_for(monkeypatch):
+    parsed = []
+
+    def counting_parse(compressed, sections):
+        parsed.append(sections)
+        return real_parse(compressed, sections)
+
+    real_parse = company_page._parse_sections
+    monkeypatch.setattr(company_page, "_parse_sections", counting_parse)
+
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                await get_ratios("LAZY")
+                cached_after_ratios = [(await get_cache().get("fundamentals", f"LAZY:{s}"))[0] for s in SECTIONS]
+                tables = await get_fundamentals("LAZY", ["ratios", "cash_flow", "balance_sheet"])
+                unknown = await get_fundamentals("LAZY", ["ratios", "dividends"])
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+            return cached_after_ratios, tables, unknown, dict(stub.hits)
+
+    cached_after_ratios, tables, unknown, hits = asyncio.run(run())
+    assert cached_after_ratios == [section == "ratios" for section in SECTIONS]
+    # The second call only parses the two sections it hadn't seen
+    assert parsed == [("ratios",), ("cash_flow", "balance_sheet")]
+    assert list(tables) == ["ratios", "cash_flow", "balance_sheet"]
+    assert "ROCE %" in tables["ratios"]["Mar 2025"]
+    assert "dividends" in unknown["error"]
+    assert hits == {"company": 1}
@@ -1,14 +1,20 @@
-import asyncio
-import logging
-from server import download_report
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from report_store import get_manifest
+from server import download_report, download_reports
+from test_server import replayed
 
-async def test_download_report():
-    symbol = "WIPRO"
-    path = "./reports"
-    await download_report(symbol, path)
 
-if __name__ == "__main__":
-    asyncio.run(test_download_report())
\ No newline at end of file
+def test_download_report():
+    path, _ = replayed(lambda: download_report("WIPRO"))
+    assert os.path.basename(path) == "WIPRO.xlsx" and os.path.getsize(path) > 0
+    assert get_manifest().fresh("WIPRO", 3600) is not None
+
+
+def test_download_reports_serves_fresh_reports_from_disk():
+    first, _ = replayed(lambda: download_reports(["WIPRO", "TCS"]))
+    assert first["downloaded"] == 2 and not first["errors"]
+    again, transport = replayed(lambda: download_reports(["WIPRO", "TCS"]))
+    assert again["downloaded"] == 0 and again["cached"] == 2
+    assert again["results"] == first["results"]
+    assert not any(key.startswith("POST") for key in transport.replayed)
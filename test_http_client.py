@@ -0,0 +1,61 @@
+import asyncio
+
+import http_client
+from benchmarks.stub_server import StubScreener
+from server import make_screener_request, mcp
+
+
+async def _with_stub(coro_fn):
+    async with StubScreener() as stub:
+        http_client.configure_client(base_url=stub.base_url)
+        try:
+            return await coro_fn(stub)
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+
+def test_requests_share_one_connection():
+    async def run(stub):
+        for _ in range(6):
+            result = await make_screener_request("company/WIPRO/")
+            assert result["response"].status_code == 200
+        return stub.connections, stub.requests
+
+    connections, requests = asyncio.run(_with_stub(run))
+    assert requests == 6
+    assert connections == 1
+
+
+def test_client_is_reused_within_a_loop_and_rebuilt_across_loops():
+    async def grab():
+        return http_client.get_client(), http_client.get_client()
+
+    first, again = asyncio.run(grab())
+    assert first is again
+    second, _ = asyncio.run(grab())
+    assert second is not first
+    asyncio.run(http_client.close_client())
+
+
+def test_lifespan_closes_client():
+    async def run():
+        async with http_client.client_lifespan(mcp):
+            client = http_client.get_client()
+            assert not client.is_closed
+        return client
+
+    assert asyncio.run(run()).is_closed
+
+
+def test_session_cookies_are_set_once_on_the_client():
+    async def run():
+        client = http_client.get_client()
+        try:
+            return dict(client.cookies), client.headers["user-agent"]
+        finally:
+            await http_client.close_client()
+
+    client_cookies, user_agent = asyncio.run(run())
+    assert client_cookies["theme"] == "auto"
+    assert user_agent == http_client.headers["user-agent"]
@@ -0,0 +1,120 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import http_client
+from benchmarks.stub_server import StubScreener
+from indicators import (MOVING_AVERAGE_METRICS, RSI_METRICS, align_series, chart_query, combine_signals,
+                        compute_indicators, ema, latest_values, rsi, sma)
+from server import calculate_indicators, calculate_moving_average, calculate_rsi, trade_recommendation
+
+
+def test_chart_query_is_the_ordered_union_of_metrics():
+    assert chart_query(MOVING_AVERAGE_METRICS, RSI_METRICS) == "Price-DMA50-DMA200-Volume"
+    assert chart_query(RSI_METRICS) == "Price"
+
+
+def test_trade_recommendation_fetches_one_chart_series():
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                recommendation = await trade_recommendation("TCS")
+                hits = dict(stub.hits)
+                ma = await calculate_moving_average("TCS")
+                rsi = await calculate_rsi("TCS")
+                return recommendation, hits, ma, rsi
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+
+    recommendation, hits, ma, rsi = asyncio.run(run())
+    assert hits["chart"] == 1
+    assert recommendation == combine_signals("TCS", ma, rsi)
+
+
+def test_combine_signals_reports_the_first_error():
+    rsi = {"error": "Price data not available for TCS"}
+    assert combine_signals("TCS", {"error": "boom"}, rsi) == {"error": "Error in moving average data: boom"}
+    assert combine_signals("TCS", {"signal": "BULLISH"}, rsi) == {"error": f"Error in RSI data: {rsi['error']}"}
+
+
+def _closes(rows=3, days=60, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1, (rows, days)), axis=1)
+
+
+def test_engine_matches_pandas_rolling_and_ewm():
+    close = _closes()
+    frame = pd.DataFrame(close.T)
+    np.testing.assert_allclose(sma(close, 20), frame.rolling(20).mean().T.to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(ema(close, 12), frame.ewm(span=12, adjust=False).mean().T.to_numpy())
+    delta = frame.diff()
+    gain, loss = delta.clip(lower=0).rolling(14).mean(), (-delta.clip(upper=0)).rolling(14).mean()
+    np.testing.assert_allclose(rsi(close, 14, "sma"), (100 - 100 / (1 + gain / loss)).T.to_numpy(), equal_nan=True)
+
+
+def test_wilder_rsi_is_seeded_with_the_first_full_window():
+    close = _closes(rows=1, days=40)
+    delta = np.diff(close[0])
+    gain, loss = np.clip(delta, 0, None), -np.clip(delta, None, 0)
+    avg_gain, avg_loss = gain[:14].mean(), loss[:14].mean()
+    for g, l in zip(gain[14:], loss[14:]):
+        avg_gain, avg_loss = (avg_gain * 13 + g) / 14, (avg_loss * 13 + l) / 14
+    values = rsi(close, 14, "wilder")[0]
+    assert np.isnan(values[13]) and not np.isnan(values[14])
+    assert values[-1] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss))
+
+
+def test_align_series_pads_missing_days_with_nan():
+    payloads = {
+        "A": {"datasets": [{"metric": "Price", "values": [["2024-01-01", "10"], ["2024-01-02", "11"]]}]},
+        "B": {"datasets": [{"metric": "Price", "values": [["2024-01-02", "20"], ["2024-01-03", "21"]]}]},
+    }
+    dates, close = align_series(payloads, "Price")
+    assert dates == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    np.testing.assert_array_equal(close, [[10, 11, np.nan], [np.nan, 20, 21]])
+    latest = latest_values(dates, compute_indicators(close))
+    assert (latest[0]["date"], latest[0]["close"]) == ("2024-01-02", 11)
+    assert (latest[1]["date"], latest[1]["close"]) == ("2024-01-03", 21)
+
+
+def test_each_symbol_is_computed_over_its_own_dates():
+    dates = [str(day) for day in pd.bdate_range("2024-01-01", periods=300).date]
+    a, b = _closes(rows=2, days=300)
+    volume = np.random.default_rng(3).integers(1_000, 9_000, 300)
+
+    def payload(close, days):
+        return {"datasets": [{"metric": "Price", "values": [[d, str(close[i])] for i, d in enumerate(dates) if i in days]},
+                             {"metric": "Volume", "values": [[d, int(volume[i])] for i, d in enumerate(dates) if i in days]}]}
+
+    # A misses the first weeks, B misses one day near the end
+    payloads = {"A": payload(a, range(40, 300)), "B": payload(b, set(range(300)) - {280})}
+    snapshots = {}
+    for batch in (payloads, {"B": payloads["B"]}):
+        days, close = align_series(batch, "Price")
+        _, volume_rows = align_series(batch, "Volume")
+        snapshots[len(batch)] = latest_values(days, compute_indicators(close, volume_rows))[-1]
+    assert snapshots[2] == snapshots[1]
+    assert None not in (snapshots[2]["rsi"], snapshots[2]["atr"], snapshots[2]["sma20"], snapshots[2]["macd"])
+
+
+def test_calculate_indicators_against_stub():
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                return await calculate_indicators(["TCS", "INFY"]), dict(stub.hits)
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+
+    outcome, hits = asyncio.run(run())
+    assert outcome["failed"] == 0 and hits["chart"] == 2
+    tcs = outcome["results"]["TCS"]
+    assert 0 <= tcs["rsi"] <= 100
+    assert tcs["bollinger_lower"] <= tcs["bollinger_middle"] <= tcs["bollinger_upper"]
+    assert tcs["macd_histogram"] == pytest.approx(tcs["macd"] - tcs["macd_signal"], abs=1e-3)
+    assert tcs["atr"] > 0 and tcs["volume_zscore"] is not None
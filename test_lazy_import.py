@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+
+import lazy_import
+from lazy_import import LazyModule, lazy_module
+
+HEAVY = ["lxml.html", "numpy", "pandas"]
+
+
+def run_python(code: str, **env: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env={**os.environ, **env}, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_importing_the_server_defers_pandas_numpy_and_lxml():
+    code = """
+import json, sys
+import server, lazy_import
+before = {"loaded": [m for m in %r if m in sys.modules], "deferred": lazy_import.deferred()}
+lazy_import.preload()
+print(json.dumps({**before, "after": [m for m in %r if m in sys.modules], "left": lazy_import.deferred()}))
+""" % (HEAVY, HEAVY)
+    state = run_python(code, SCREENER_LAZY_IMPORTS="1")
+    assert state["loaded"] == [] and state["deferred"] == HEAVY
+    assert state["after"] == HEAVY and state["left"] == []
+
+
+def test_lazy_imports_can_be_turned_off():
+    state = run_python("import json, sys, server; print(json.dumps([m for m in %r if m in sys.modules]))" % HEAVY,
+                       SCREENER_LAZY_IMPORTS="0")
+    assert state == HEAVY
+
+
+def test_a_lazy_module_is_imported_on_first_attribute_read(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    monkeypatch.setattr(lazy_import, "_deferred", {})
+    monkeypatch.setattr(lazy_import, "SCREENER_LAZY_IMPORTS", True)
+    colorsys = lazy_module("colorsys")
+    assert isinstance(colorsys, LazyModule) and "colorsys" not in sys.modules
+    assert lazy_import.deferred() == ["colorsys"]
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert "colorsys" in sys.modules and lazy_import.deferred() == []
+    # Later reads come from the stand-in's own copy of the namespace
+    assert "rgb_to_hsv" in vars(colorsys)
+    # Modules already imported are returned as they are
+    assert lazy_module("json") is json
@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+
+import http_client
+import metrics
+from benchmarks.stub_server import StubScreener
+from metrics import Histogram, instrument_tools, metrics_snapshot, prometheus_text, start_metrics_server
+from server import mcp
+
+
+def series(name):
+    return {tuple(v for k, v in entry.items() if k in ("tool", "outcome", "endpoint", "status", "parser")): entry
+            for entry in metrics_snapshot()["histograms"].get(name, [])}
+
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram((0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        h.observe(value)
+    assert h.counts == [1, 2, 1, 1]
+    assert (h.count, round(h.sum, 3)) == (5, 5.605)
+    assert (h.quantile(0.5), h.quantile(0.8), h.quantile(0.99)) == (0.1, 1.0, None)
+
+
+def test_tool_calls_and_upstream_requests_are_recorded():
+    metrics.reset_metrics()
+
+    async def run():
+        async with StubScreener() as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                await mcp.call_tool("get_price_info", {"symbol": "TCS", "days": 30})
+                await mcp.call_tool("get_ratios", {"company_name": "TCS"})
+                await mcp.call_tool("screen_companies", {"expression": "x > 1"})
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+
+    asyncio.run(run())
+    tools = series("screener_tool_seconds")
+    assert tools[("get_price_info", "ok")]["count"] == 1
+    assert tools[("get_ratios", "ok")]["count"] == 1
+    assert tools[("screen_companies", "error")]["count"] == 1
+
+    upstream = series("screener_upstream_seconds")
+    assert upstream[("company", "200")]["count"] == 1  # shared by the id lookup and get_ratios
+    assert upstream[("chart", "200")]["count"] == 1
+    sizes = series("screener_upstream_bytes")
+    assert sizes[("company",)]["sum"] > 10_000 and sizes[("chart",)]["sum"] > 0
+    assert series("screener_parse_seconds")[("_parse_sections",)]["count"] == 1
+    assert metrics_snapshot()["cache"]["datasets"]["company_html"]["hit_ratio"] == 0.5
+
+    text = prometheus_text()
+    assert 'screener_tool_seconds_bucket{tool="get_price_info",outcome="ok",le="+Inf"} 1' in text
+    assert 'screener_upstream_seconds_count{endpoint="chart",status="200"} 1' in text
+    assert 'screener_cache_hits_total{dataset="company_html"} 1' in text
+
+
+def test_prometheus_endpoint():
+    async def run():
+        assert await start_metrics_server(port=0) is None  # port 0 means no endpoint
+        server = await asyncio.start_server(metrics._serve_metrics, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with httpx.AsyncClient() as client:
+                return (await client.get(f"http://127.0.0.1:{port}/metrics"),
+                        await client.get(f"http://127.0.0.1:{port}/other"))
+        finally:
+            server.close()
+
+    found, missing = asyncio.run(run())
+    assert found.status_code == 200 and "# TYPE screener_cache_hits_total counter" in found.text
+    assert missing.status_code == 404
+
+
+def test_disabled_metrics_leave_tools_unwrapped(monkeypatch):
+    monkeypatch.setattr(metrics, "SCREENER_METRICS", False)
+
+    class Registry:
+        def tool(self):
+            return lambda fn: fn
+
+    registry = Registry()
+    original = registry.tool
+    instrument_tools(registry)
+    assert registry.tool == original
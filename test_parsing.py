@@ -0,0 +1,57 @@
+import asyncio
+import io
+
+import numpy as np
+import pandas as pd
+
+import http_client
+import parsing
+from benchmarks.stub_server import StubScreener, render_company_page
+from server import read_stock_info
+
+
+def test_parse_stock_tables_finds_all_seven_sections():
+    tables = parsing.parse_stock_tables(render_company_page("WIPRO"))
+    names = [df.index.name for df in tables]
+    assert names == ['Quarter', 'Profit & Loss', 'Balance Sheet', 'Cash Flow', 'Ratios',
+                     'Shareholding Pattern Quarterly', 'Shareholding Pattern Yearly']
+    assert "Equity Capital" in tables[2].index
+    assert "ROCE %" in tables[4].index
+
+
+def test_read_stock_info_fetches_async_and_parses_in_pool():
+    async def run():
+        async with StubScreener(latency=0.01) as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                tables = await asyncio.gather(*(read_stock_info(f"POOL{i}") for i in range(4)))
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+            return tables, stub.hits["company"]
+
+    tables, company_hits = asyncio.run(run())
+    assert company_hits == 4
+    assert all(len(t) == 7 for t in tables)
+    parsing.shutdown_parse_pool()
+
+
+def test_extractor_parses_cells_into_floats_and_cleans_labels():
+    html = render_company_page("WIPRO")
+    tables = parsing.extract_tables(html)
+    legacy = [df for df in pd.read_html(io.StringIO(html)) if df.shape[1] > 1]
+    shareholding = tables["shareholding_pattern_quarterly"]
+    assert all(dtype == np.float64 for dtype in shareholding.dtypes)
+    assert "Promoters" in shareholding.index
+    # Same numbers the whole-page pd.read_html path found, without "%" and ","
+    expected = legacy[9].iloc[0, 1:].str.rstrip("%").astype(float).to_numpy()
+    np.testing.assert_allclose(shareholding.loc["Promoters"].to_numpy(), expected)
+    assert list(tables["balance_sheet"].columns) == list(legacy[6].columns[1:])
+
+
+def test_extractor_builds_only_requested_sections():
+    page = render_company_page("WIPRO").replace('id="cash-flow"', 'id="something-else"')
+    tables = parsing.extract_tables(page, ["ratios", "cash_flow"])
+    assert list(tables) == ["ratios", "cash_flow"]
+    assert "ROCE %" in tables["ratios"].index
+    assert tables["cash_flow"].empty and tables["cash_flow"].index.name == "Cash Flow"
@@ -0,0 +1,83 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.stub_server import chart_payload
+from price_store import PriceSeries, get_price_series, get_price_store
+
+# The stub serves a chart for an unknown company id as if it were a symbol
+COMPANY_ID = "1234"
+
+
+def chart_days(requested: list[int]):
+    """Stub responder recording the `days` of every chart request."""
+    return lambda method, path, query: requested.append(int(query["days"][0])) if "chart" in path else None
+
+
+def closes(payload):
+    return [(d, round(float(v), 2)) for d, v, *_ in payload["datasets"][0]["values"]]
+
+
+def test_window_is_fetched_once_and_then_served_from_the_store(run_against_stub):
+    async def reads(stub):
+        first = await get_price_series(COMPANY_ID, "Price-Volume", 365)
+        second = await get_price_series(COMPANY_ID, "Price", 200)
+        return first, second
+
+    requested = []
+    first, second = run_against_stub(reads, chart_days(requested))
+    assert requested == [365]
+    expected = chart_payload(COMPANY_ID, "Price-Volume", 365)
+    assert closes(first) == closes(expected)
+    assert first["datasets"][1]["values"] == expected["datasets"][1]["values"]
+    assert closes(second) == closes(expected)[-200:]
+
+
+def test_stale_store_fetches_only_the_missing_tail(run_against_stub):
+    async def reads(stub):
+        await get_price_series(COMPANY_ID, "Price", 365)
+        # Pretend the store was last refreshed ten days ago
+        store = get_price_store()
+        series = store.load(COMPANY_ID)
+        keep = series.dates <= np.datetime64(date.today() - timedelta(days=10))
+        store.save(COMPANY_ID, PriceSeries(series.dates[keep], {k: v[keep] for k, v in series.columns.items()},
+                                           series.labels, series.complete_from, time.time() - 3600))
+        return await get_price_series(COMPANY_ID, "Price", 365)
+
+    requested = []
+    payload = run_against_stub(reads, chart_days(requested))
+    assert requested == [365, 10 + 5]
+    assert closes(payload) == closes(chart_payload(COMPANY_ID, "Price", 365))
+
+
+def test_longer_window_is_backfilled_once(run_against_stub):
+    async def reads(stub):
+        await get_price_series(COMPANY_ID, "Price", 365)
+        long = await get_price_series(COMPANY_ID, "Price", 730)
+        middle = await get_price_series(COMPANY_ID, "Price", 500)
+        return long, middle
+
+    requested = []
+    long, middle = run_against_stub(reads, chart_days(requested))
+    assert requested == [365, 730]
+    assert closes(long) == closes(chart_payload(COMPANY_ID, "Price", 730))
+    assert closes(middle) == closes(chart_payload(COMPANY_ID, "Price", 500))
+
+
+def test_metrics_outside_the_store_pass_through(run_against_stub):
+    requested = []
+    run_against_stub(lambda stub: get_price_series(COMPANY_ID, "Price-EPS", 365), chart_days(requested))
+    assert requested == [365]
+    assert get_price_store().load(COMPANY_ID) is None
+
+
+def test_merge_prefers_newer_bars():
+    old = PriceSeries.from_payload({"datasets": [{"metric": "Price", "values": [["2024-01-01", "10"], ["2024-01-02", "11"]]}]},
+                                   date(2024, 1, 1))
+    new = PriceSeries.from_payload({"datasets": [{"metric": "Price", "values": [["2024-01-02", "12"], ["2024-01-03", "13"]]}]},
+                                   date(2024, 1, 2))
+    merged = old.merge(new)
+    assert [str(d) for d in merged.dates] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert merged.columns["Price"].tolist() == [10, 12, 13]
+    assert merged.complete_from == date(2024, 1, 1)
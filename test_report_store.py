@@ -0,0 +1,78 @@
+import asyncio
+
+import company_page
+import report_store
+from benchmarks.stub_server import render_report_workbook
+from cache import get_cache
+from reports import fetch_reports
+from server import get_fundamentals
+
+
+def test_read_report_builds_section_frames_from_the_data_sheet(tmp_path):
+    path = tmp_path / "TCS.xlsx"
+    path.write_bytes(render_report_workbook("TCS"))
+    tables = report_store.read_report(str(path), ["profit_loss", "cash_flow"])
+    assert list(tables) == ["profit_loss", "cash_flow"]
+    profit_loss = tables["profit_loss"]
+    assert profit_loss.index.name == "Profit & Loss"
+    assert (profit_loss.columns[0], profit_loss.columns[-1]) == ("Mar 2004", "Mar 2025")
+    assert profit_loss.loc["Net Profit"].notna().all()
+
+
+def test_fundamentals_are_served_from_a_fresh_report(run_against_stub, monkeypatch):
+    parsed = []
+    real_parse = company_page._parse_sections
+    monkeypatch.setattr(company_page, "_parse_sections",
+                        lambda compressed, sections: parsed.append(sections) or real_parse(compressed, sections))
+
+    async def run(stub):
+        await fetch_reports(["TCS"])
+        return await get_fundamentals("TCS", ["profit_loss", "ratios"])
+
+    tables = run_against_stub(run)
+    # P&L comes from the workbook (20+ years), ratios are not in it and come from the page
+    assert "Mar 2004" in tables["profit_loss"]
+    assert "ROCE %" in tables["ratios"]["Mar 2025"]
+    assert parsed == [("ratios",)]
+
+
+def test_report_sections_have_the_page_rows(tmp_path, run_against_stub):
+    sections = list(report_store.REPORT_SECTIONS.values())
+    page = run_against_stub(lambda stub: company_page.get_sections("WIPRO", sections))
+    path = tmp_path / "WIPRO.xlsx"
+    path.write_bytes(render_report_workbook("WIPRO"))
+    report = report_store.read_report(str(path), sections)
+    for section in sections:
+        assert report[section].index.equals(page[section].index), section
+        assert report[section].index.name == page[section].index.name
+    assert report["balance_sheet"].loc["Total Assets"].notna().all()
+    assert report["profit_loss"].loc["EPS in Rs"].notna().all()
+
+
+def test_unreadable_report_falls_back_to_the_page(tmp_path, run_against_stub):
+    async def run(stub):
+        manifest = report_store.get_manifest()
+        await fetch_reports(["INFY"])
+        with open(manifest.entries["INFY"]["path"], "wb") as f:
+            f.write(b"PK\x03\x04 truncated")
+        return await get_fundamentals("INFY", ["profit_loss"])
+
+    tables = run_against_stub(run)
+    assert "Mar 2004" not in tables["profit_loss"]
+    assert "Sales" in tables["profit_loss"]["Mar 2025"]
+
+
+def test_ingest_indexes_a_folder_without_network(tmp_path, monkeypatch):
+    folder = tmp_path / "ingest"
+    folder.mkdir()
+    (folder / "WIPRO.xlsx").write_bytes(render_report_workbook("WIPRO"))
+    (folder / "BROKEN.xlsx").write_bytes(b"not a workbook")
+
+    status = asyncio.run(report_store.ingest_reports(str(folder)))
+    assert status["WIPRO"] == "ok" and status["BROKEN"].startswith("error")
+    assert "WIPRO" in report_store.get_manifest(str(folder)).entries
+    hit, table = asyncio.run(get_cache().get("fundamentals", "WIPRO:balance_sheet"))
+    assert hit and table.index.name == "Balance Sheet"
+
+    monkeypatch.setenv("SCREENER_TTL_REPORT", "0")
+    assert asyncio.run(report_store.ingest_reports(str(folder)))["WIPRO"].startswith("stale")
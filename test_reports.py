@@ -0,0 +1,57 @@
+import os
+
+from reports import fetch_reports
+from server import download_report
+
+
+async def exporting(stub, call):
+    """`call`'s result and the number of workbooks the stub exported."""
+    return await call, stub.hits["export"]
+
+
+def test_reports_are_streamed_to_disk_and_reused_while_fresh(tmp_path, run_against_stub):
+    tmp_path = tmp_path / "reports"
+    symbols = ["TCS", "INFY", "WIPRO"]
+    seen = []
+
+    async def progress(done, total):
+        seen.append((done, total))
+
+    first, exports = run_against_stub(
+        lambda stub: exporting(stub, fetch_reports(symbols, str(tmp_path), progress=progress)))
+    assert (first["succeeded"], first["downloaded"], exports) == (3, 3, 3)
+    assert seen[-1] == (3, 3)
+    with open(first["results"]["TCS"], "rb") as f:
+        assert f.read().startswith(b"PK\x03\x04")
+    assert sorted(os.listdir(tmp_path)) == ["INFY.xlsx", "TCS.xlsx", "WIPRO.xlsx", "manifest.json"]
+
+    again, exports = run_against_stub(
+        lambda stub: exporting(stub, fetch_reports(symbols + ["HDFCBANK"], str(tmp_path))))
+    assert (again["downloaded"], again["cached"], exports) == (1, 3, 1)
+
+    forced, exports = run_against_stub(lambda stub: exporting(stub, fetch_reports(["TCS"], str(tmp_path), force=True)))
+    assert (forced["downloaded"], exports) == (1, 1)
+
+
+def test_stale_reports_are_downloaded_again(tmp_path, run_against_stub, monkeypatch):
+    tmp_path = tmp_path / "reports"
+    run_against_stub(lambda stub: fetch_reports(["TCS"], str(tmp_path)))
+    monkeypatch.setenv("SCREENER_TTL_REPORT", "0")
+    outcome, exports = run_against_stub(lambda stub: exporting(stub, fetch_reports(["TCS"], str(tmp_path))))
+    assert (outcome["downloaded"], exports) == (1, 1)
+
+
+def test_non_workbook_response_leaves_no_file(tmp_path, run_against_stub):
+    tmp_path = tmp_path / "reports"
+    login_page = lambda method, path, query: (200, {"content-type": "text/html"}, b"<html>Login</html>") \
+        if path.startswith("/user/company/export/") else None
+    outcome = run_against_stub(lambda stub: fetch_reports(["TCS"], str(tmp_path)), login_page)
+    assert "not an Excel workbook" in outcome["errors"]["TCS"]
+    assert os.listdir(tmp_path) == []  # no workbook and no leftover .part file
+
+
+def test_download_report_tool_writes_into_reports_dir(tmp_path, run_against_stub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path, exports = run_against_stub(lambda stub: exporting(stub, download_report("tcs")))
+    assert exports == 1
+    assert os.path.samefile(path, tmp_path / "reports" / "TCS.xlsx")
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from company_page import get_sections
+from price_store import get_price_series, get_price_store
+from scheduler import Watchlist, WatchlistScheduler, get_scheduler
+from server import get_quarterly_results, get_watchlist, trade_recommendation, update_watchlist
+from symbol_index import resolve_company_id
+
+
+def test_watchlist_file_round_trip(tmp_path):
+    path = str(tmp_path / "conf" / "watchlist.json")
+    assert Watchlist.load(path).symbols == []
+    Watchlist(["WIPRO", "TCS"], 600).save(path)
+    with open(path) as f:
+        assert json.load(f) == {"symbols": ["WIPRO", "TCS"], "interval": 600}
+    assert Watchlist.load(path) == Watchlist(["WIPRO", "TCS"], 600)
+
+
+def test_malformed_watchlist_files_are_reported_and_the_last_good_one_kept(tmp_path):
+    path = tmp_path / "watchlist.json"
+    for content in ('{"symbols": ["TCS",', '["TCS"]', '{"symbols": "TCS"}', '{"symbols": [1]}',
+                    '{"symbols": ["TCS"], "interval": 0}', '{"symbols": ["TCS"], "interval": "600"}'):
+        path.write_text(content)
+        with pytest.raises(ValueError):
+            Watchlist.load(str(path))
+
+    scheduler = WatchlistScheduler(str(path))
+    assert scheduler.watchlist == Watchlist() and "interval" in scheduler.status()["file_error"]
+    Watchlist(["WIPRO"], 600).save(str(path))
+    assert scheduler.reload() == Watchlist(["WIPRO"], 600) and scheduler.load_error is None
+    scheduler.watchlist = scheduler.reload()
+    path.write_text('{"symbols": "TCS"}')
+    assert scheduler.reload() == Watchlist(["WIPRO"], 600) and "symbols" in scheduler.load_error
+
+
+def test_refresher_survives_a_malformed_watchlist_file(tmp_path, monkeypatch):
+    import scheduler
+
+    path = tmp_path / "watchlist.json"
+    Watchlist(["WIPRO"], 0.05).save(str(path))
+    warmed = []
+
+    async def warm(symbol, ahead=0.0):
+        warmed.append(symbol)
+        path.write_text("not json")
+
+    monkeypatch.setattr(scheduler, "warm_symbol", warm)
+
+    async def run():
+        refresher = WatchlistScheduler(str(path))
+        task = refresher.start()
+        await asyncio.sleep(0.3)
+        try:
+            return not task.done(), refresher.status()
+        finally:
+            await refresher.stop()
+
+    running, status = asyncio.run(run())
+    assert running and len(warmed) > 1 and set(warmed) == {"WIPRO"}
+    assert status["symbols"] == ["WIPRO"] and "JSONDecodeError" in status["file_error"]
+
+
+def test_update_watchlist_tool_saves_and_normalizes():
+    async def calls():
+        await update_watchlist(add=["wipro", "TCS", "WIPRO"], interval=600)
+        await update_watchlist(add=["infy"], remove=["tcs"])
+        return await get_watchlist(), await update_watchlist(interval=0)
+
+    status, invalid = asyncio.run(calls())
+    assert status["symbols"] == ["WIPRO", "INFY"] and status["interval"] == 600
+    assert Watchlist.load(status["file"]).symbols == ["WIPRO", "INFY"]
+    assert "error" in invalid
+
+
+def test_scheduler_spreads_refreshes_and_keeps_the_watchlist_warm(run_against_stub):
+    symbols = ["WIPRO", "TCS", "INFY"]
+    interval = 0.6
+
+    async def run(stub):
+        scheduler = get_scheduler()
+        refreshes = []
+        refresh = scheduler.refresh
+
+        async def logged(symbol, ahead=0.0):
+            started = time.monotonic()
+            await refresh(symbol, ahead)
+            refreshes.append((symbol, started, dict(stub.hits)))
+
+        scheduler.refresh = logged
+        scheduler.update(add=symbols, interval=interval)
+        start = time.monotonic()
+        scheduler.start()
+        while len(refreshes) < 3:
+            await asyncio.sleep(0.01)
+        first_cycle = dict(stub.hits)
+        # Queries for watchlist symbols are answered without going upstream
+        await get_quarterly_results("WIPRO")
+        await trade_recommendation("TCS")
+        served_warm = dict(stub.hits) == first_cycle
+        while len(refreshes) < 6:
+            await asyncio.sleep(0.01)
+        return start, refreshes, first_cycle, served_warm, scheduler.status()
+
+    start, refreshes, first_cycle, served_warm, status = run_against_stub(run, rate_limit=0)
+    assert [symbol for symbol, _, _ in refreshes] == symbols * 2
+    assert first_cycle["company"] == 3 and first_cycle["chart"] == 3
+    assert served_warm
+    # Nothing came near its TTL, so the second cycle had nothing to fetch
+    assert refreshes[-1][2] == first_cycle
+    assert all(status["refreshed"][s]["error"] is None for s in symbols)
+    # One refresh per slot of the interval, in both cycles: never early, late only by a slow refresh before it
+    slot = interval / len(symbols)
+    offsets = [started - start for _, started, _ in refreshes]
+    assert all(i * slot - 0.01 <= offset <= (i + 1) * slot + 0.5 for i, offset in enumerate(offsets))
+
+
+def test_entries_expiring_before_the_next_turn_are_fetched_ahead(monkeypatch, run_against_stub):
+    for dataset in ("COMPANY_HTML", "COMPANY_PAGE", "FUNDAMENTALS", "CHART"):
+        monkeypatch.setenv(f"SCREENER_TTL_{dataset}", "2")
+
+    async def run(stub):
+        scheduler = get_scheduler()
+        await scheduler.refresh("WIPRO", ahead=1)
+        first = dict(stub.hits)
+        # Asking for more than a TTL ahead never refetches what was just fetched
+        await scheduler.refresh("WIPRO", ahead=60)
+        kept = dict(stub.hits)
+        await asyncio.sleep(1.1)
+        await scheduler.refresh("WIPRO", ahead=1)
+        return first, kept, dict(stub.hits)
+
+    first, kept, ahead = run_against_stub(run, rate_limit=0)
+    assert (first["company"], first["chart"]) == (1, 1)
+    assert kept == first
+    assert (ahead["company"], ahead["chart"]) == (2, 2)
+
+
+def test_refresh_errors_are_recorded_not_raised(run_against_stub):
+    async def run(stub):
+        stub.responder = lambda method, path, query: (500, {}, b"down") if "NOPE" in path.upper() else None
+        await get_scheduler().refresh("NOPE")
+        return get_scheduler().refreshed["NOPE"]
+
+    refreshed = run_against_stub(run, rate_limit=0, retries=0)
+    assert "NOPE" in refreshed["error"]
+
+
+def test_unexpected_errors_do_not_stop_the_refresh_cycle(monkeypatch, run_against_stub):
+    import scheduler
+
+    warm_symbol = scheduler.warm_symbol
+
+    async def flaky(symbol, ahead=0.0):
+        if symbol == "WIPRO":
+            raise KeyError("datasets")
+        await warm_symbol(symbol, ahead)
+
+    monkeypatch.setattr(scheduler, "warm_symbol", flaky)
+
+    async def run(stub):
+        scheduler = get_scheduler()
+        scheduler.update(add=["WIPRO", "TCS"], interval=0.2)
+        task = scheduler.start()
+
+        async def both_refreshed():
+            while "TCS" not in scheduler.refreshed:
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait({task, asyncio.ensure_future(both_refreshed())}, timeout=10,
+                           return_when=asyncio.FIRST_COMPLETED)
+        return scheduler.status()
+
+    status = run_against_stub(run, rate_limit=0)
+    assert status["running"]
+    assert status["refreshed"]["WIPRO"]["error"] == "KeyError: 'datasets'"
+    assert status["refreshed"]["TCS"]["error"] is None
+
+
+def test_stale_price_series_is_served_and_updated_in_the_background(run_against_stub):
+    async def run(stub):
+        company_id = await resolve_company_id("TCS")
+        await get_price_series(company_id)
+        store = get_price_store()
+        series = store.load(company_id)
+        series.fetched_at -= 400  # past the 300 s "chart" TTL, within its grace period
+        store.save(company_id, series)
+        before = stub.hits["chart"]
+        start = time.perf_counter()
+        await get_price_series(company_id)
+        served_in = time.perf_counter() - start
+        hits_when_served = stub.hits["chart"]
+        await asyncio.sleep(0.1)
+        return before, hits_when_served, stub.hits["chart"], served_in, store.load(company_id).fetched_at
+
+    before, when_served, after, served_in, fetched_at = run_against_stub(run, rate_limit=0)
+    assert when_served == before and after == before + 1
+    assert time.time() - fetched_at < 5
+
+
+def test_stale_fundamentals_are_served_and_reloaded_in_the_background(monkeypatch, run_against_stub):
+    monkeypatch.setenv("SCREENER_TTL_FUNDAMENTALS", "0.2")
+    monkeypatch.setenv("SCREENER_TTL_COMPANY_HTML", "0.2")
+
+    async def run(stub):
+        first = await get_sections("WIPRO", ["ratios"])
+        await asyncio.sleep(0.3)
+        stale = await get_sections("WIPRO", ["ratios"])
+        hits_when_served = stub.hits["company"]
+        await asyncio.sleep(0.1)
+        return first, stale, hits_when_served, stub.hits["company"]
+
+    first, stale, when_served, after = run_against_stub(run, rate_limit=0)
+    assert stale["ratios"].equals(first["ratios"])
+    assert (when_served, after) == (1, 2)
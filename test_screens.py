@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from benchmarks.stub_server import SCREEN_COLUMNS, company_ids, render_screens_page, screen_symbols
+import screens
+from cache import get_cache
+from screens import ScreensIndex, get_screens_index, parse_screens_page
+from server import get_price_info, get_screens_page, run_screen, search_screens
+
+
+def test_parse_screens_page():
+    entries, pages = parse_screens_page(render_screens_page(2), 2)
+    assert pages == 5 and len(entries) == 20
+    assert entries[0] == {
+        "text": "Stub screen 21Companies with growing sales 21by user0",
+        "href": "https://www.screener.in/screens/1021/stub-screen-21/",
+        "name": "Stub screen 21",
+        "description": "Companies with growing sales 21",
+        "author": "user0",
+        "id": 1021,
+        "page": 2,
+    }
+
+
+def test_pages_and_search_are_served_from_one_crawl(run_against_stub):
+    async def calls(stub):
+        page = json.loads(await get_screens_page(3))
+        found = await search_screens("growing sales 42")
+        missing = await get_screens_page(9)
+        return page, found, missing, stub.hits["screens"]
+
+    page, found, missing, fetched = run_against_stub(calls)
+    assert fetched == 5
+    assert [e["name"] for e in page] == [f"Stub screen {n}" for n in range(41, 61)]
+    assert found["indexed"] == 100
+    assert [e["name"] for e in found["results"]] == ["Stub screen 42"]
+    assert "there are 5 screens pages" in missing
+
+
+def test_search_ranks_name_matches_first_and_matches_prefixes():
+    entries = [
+        {"name": "Debt free", "description": "Low debt and high roce", "page": 1},
+        {"name": "Quality compounders", "description": "High ROCE with low debt", "page": 1},
+        {"name": "High ROCE, low debt", "description": "Capital efficient", "page": 1},
+    ]
+    index = ScreensIndex(entries, 0.0)
+    assert [e["name"] for e in index.search("low debt roce")] == \
+        ["High ROCE, low debt", "Debt free", "Quality compounders"]
+    assert [e["name"] for e in index.search("compound")] == ["Quality compounders"]
+    assert index.search("debt", limit=1)[0]["name"] == "Debt free"
+    assert index.search("momentum") == [] and index.search("  ") == []
+
+
+def test_stale_index_is_served_while_a_background_crawl_refreshes_it(run_against_stub, monkeypatch):
+    renamed = lambda method, path, query: (200, {"content-type": "text/html"},
+                                           render_screens_page(int(query.get("page", ["1"])[0])).replace(
+                                               "Stub screen", "Fresh screen").encode())
+
+    async def run(stub):
+        first = await get_screens_index()
+        stub.responder = renamed
+        monkeypatch.setenv("SCREENER_TTL_SCREENS_INDEX", "0")
+        # The listing changed upstream and the cached pages are gone
+        await get_cache().clear()
+        served = await get_screens_index()
+        await screens._refresh
+        return first, served, await get_screens_index()
+
+    first, served, refreshed = run_against_stub(run)
+    assert served is first
+    assert refreshed is not first
+    assert len(refreshed.search("fresh screen", limit=200)) == 100
+
+
+def test_run_screen_pages_rows_and_feeds_the_price_path(run_against_stub):
+    async def calls(stub):
+        first = await run_screen("https://www.screener.in/screens/1007/stub-screen-7/", limit=25)
+        second = await run_screen("/screens/1007/stub-screen-7", offset=first["next_offset"], limit=50)
+        fetched = stub.hits["screen"]
+        price = await get_price_info(first["index"][0], query="Price", days=30)
+        return first, second, fetched, price, stub.hits
+
+    first, second, fetched, price, hits = run_against_stub(calls)
+    assert fetched == 3  # three result pages, fetched once for both chunks
+    assert (first["total"], first["result_pages"], first["next_offset"]) == (60, 3, 25)
+    assert first["index"] == screen_symbols(1007)[:25]
+    assert first["columns"] == ["name", "company_id", *SCREEN_COLUMNS]
+    assert first["data"][0][:2] == ["S1007CO1 Ltd", company_ids("S1007CO1")[1]]
+    assert all(isinstance(v, (int, float)) for v in first["data"][0][2:])
+    assert second["index"] == screen_symbols(1007)[25:] and second["next_offset"] is None
+    # The screen already told us the company id: no company page or search request for the chart
+    assert price["datasets"] and hits["company"] == hits["search"] == 0
+
+
+def test_run_screen_limits_pages_and_rejects_other_urls(run_against_stub):
+    partial = run_against_stub(lambda stub: run_screen("/screens/1003/x/", pages=2))
+    assert (partial["total"], partial["result_pages"]) == (50, 3)
+    assert "error" in asyncio.run(run_screen("/company/TCS/"))
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+import serve
+from benchmarks.bench_serve import free_port
+from benchmarks.stub_server import StubScreener
+
+
+def test_workers_split_the_upstream_budget_and_background_work(monkeypatch):
+    monkeypatch.setattr(serve, "SCREENER_RATE_LIMIT", 10.0)
+    monkeypatch.setattr(serve, "SCREENER_RATE_BURST", 20.0)
+    monkeypatch.setattr(serve, "SCREENER_METRICS_PORT", 9100)
+    first, second = serve.worker_env(0, 4), serve.worker_env(1, 4)
+    assert (first["SCREENER_RATE_LIMIT"], first["SCREENER_RATE_BURST"]) == ("2.5", "5.0")
+    assert "SCREENER_WATCHLIST_REFRESH" not in first and second["SCREENER_WATCHLIST_REFRESH"] == "false"
+    assert (first["SCREENER_METRICS_PORT"], second["SCREENER_METRICS_PORT"]) == ("9100", "9101")
+
+
+def test_sessions_are_spread_over_workers_that_share_one_cache(tmp_path):
+    async def run():
+        async with StubScreener() as stub:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            env = {**os.environ, "SCREENER_API_BASE": stub.base_url, "SCREENER_RATE_LIMIT": "0",
+                   "SCREENER_CACHE_DIR": str(tmp_path / "cache"), "SCREENER_REPORTS_DIR": str(tmp_path / "reports"),
+                   "SCREENER_WATCHLIST_FILE": str(tmp_path / "watchlist.json"), "SCREENER_REPLAY_MODE": "",
+                   "SCREENER_PRELOAD_DELAY": "-1"}
+            server = await asyncio.create_subprocess_exec(sys.executable, "serve.py", "--workers", "2",
+                                                          "--port", str(port), env=env,
+                                                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                                                          stderr=asyncio.subprocess.DEVNULL)
+            try:
+                async with httpx.AsyncClient(base_url=url) as client:
+                    for _ in range(600):
+                        try:
+                            if (await client.get("/health")).status_code == 200:
+                                break
+                        except httpx.TransportError:
+                            await asyncio.sleep(0.1)
+                    async with sse_client(f"{url}/sse") as first, sse_client(f"{url}/sse") as second:
+                        async with ClientSession(*first) as a, ClientSession(*second) as b:
+                            await asyncio.gather(a.initialize(), b.initialize())
+                            health = (await client.get("/health")).json()
+                            results = [await a.call_tool("get_company_details", {"company_name": "WIPRO"}),
+                                       await b.call_tool("get_company_details", {"company_name": "WIPRO"})]
+                    await asyncio.sleep(0.2)
+                    closed = (await client.get("/health")).json()
+            finally:
+                server.terminate()
+                await server.wait()
+            return health, results, closed, stub.hits["company"], server.returncode
+
+    health, results, closed, fetched, code = asyncio.run(run())
+    assert [w["sessions"] for w in health["workers"]] == [1, 1]
+    assert all(not r.isError and r.content[0].text.startswith("WIPRO") for r in results)
+    # The second worker found the page the first one fetched
+    assert fetched == 1
+    assert closed["sessions"] == 0 and [w["sessions"] for w in closed["workers"]] == [0, 0]
+    assert code == 0
@@ -1,147 +1,135 @@
-import time
-import random
 import asyncio
-import logging
-from server import (download_report, get_warehouse_and_company_id, get_company_details, get_screens_page,
-                    read_stock_info)
-from server import (
-    get_quarterly_results,
-    get_profit_loss,
-    get_balance_sheet,
-    get_cash_flow,
-    get_ratios,
-    get_shareholding_pattern_quarterly,
-    get_shareholding_pattern_yearly,
-    get_price_info,
-    calculate_moving_average,
-    calculate_rsi,
-    trade_recommendation
-)
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
-async def test_download_report():
-    symbol = "WIPRO"
-    await download_report(symbol)
-
-async def test_get_warehouse_and_company_id():
-    symbol = "WIPRO"
-    warehouse_id, company_id = await get_warehouse_and_company_id(symbol)
-    print(f"Warehouse and Company ID for {symbol}: {warehouse_id}, {company_id}")
-
-async def test_get_company_details():
-    company_name = "WIPRO"
-    details = await get_company_details(company_name)
-    print(f"Company details for {company_name}: {details}")
-
-# async def test_get_explore_page():
-#     explore_page = await get_explore_page()
-#     print(f"Explore page details: {explore_page}")
-
-async def test_get_screens_page(page="1"):
-    screens_page = await get_screens_page(page)
-    print(f"Screens page details for page {page}: {screens_page}")
-
-# def test_read_stock_info():
-#     url = "WIPRO"
-#     df1, df2, df3, df4, df5, df6, df = read_stock_info(url)
-#     print(df.head())
-#     print(df.tail())
-#     print(df.columns)
-#     print(df.index)
-#     print(df.shape)
-
-# add new unit test of all remaining functions after and including get_quarterly_results
-async def test_get_quarterly_results():
-    company_name = "WIPRO"
-    results = await get_quarterly_results(company_name)
-    print(f"Quarterly Results for {company_name}: {results}")
-
-async def test_get_profit_loss():
-    company_name = "WIPRO"
-    results = await get_profit_loss(company_name)
-    print(f"Profit & Loss for {company_name}: {results}")
-
-async def test_get_balance_sheet():
-    company_name = "WIPRO"
-    results = await get_balance_sheet(company_name)
-    print(f"Balance Sheet for {company_name}: {results}")
-
-async def test_get_cash_flow():
-    company_name = "WIPRO"
-    results = await get_cash_flow(company_name)
-    print(f"Cash Flow for {company_name}: {results}")
-
-async def test_get_ratios():
-    company_name = "WIPRO"
-    results = await get_ratios(company_name)
-    print(f"Ratios for {company_name}: {results}")
-
-async def test_get_shareholding_pattern_quarterly():
-    company_name = "WIPRO"
-    results = await get_shareholding_pattern_quarterly(company_name)
-    print(f"Quarterly Shareholding Pattern for {company_name}: {results}")
-
-async def test_get_shareholding_pattern_yearly():
-    company_name = "WIPRO"
-    results = await get_shareholding_pattern_yearly(company_name)
-    print(f"Yearly Shareholding Pattern for {company_name}: {results}")
-
-async def test_get_price_info():
-    symbol = "TCS"
-    query = "Price-DMA50-DMA200-Volume"
-    days= 365
-    consolidated= True
-    results = await get_price_info(symbol, query, days, consolidated)
-    print(f"Price Info for {symbol}: {results}")
-
-async def test_calculate_moving_average():
-    symbol = "TCS"
-    results = await calculate_moving_average(symbol)
-    print(results)
-
-async def test_calculate_rsi():
-    symbol = "TCS"
-    period = 14
-    rsi_value = await calculate_rsi(symbol, period)
-    print(f"RSI for {symbol} with period {period}: {rsi_value}")
-
-async def test_trade_recommendation():
-    symbol = "TCS"
-    recommendation = await trade_recommendation(symbol)
-    print(f"Trade Recommendation for {symbol}: {recommendation}")
-
-if __name__ == "__main__":
-    # asyncio.run(test_download_report())
-    # time.sleep(random.randint(1, 5))
-    #
-    # asyncio.run(test_get_warehouse_and_company_id())
-    # time.sleep(random.randint(1, 5))
-    #
-    # asyncio.run(test_get_company_details())
-    # time.sleep(random.randint(1, 5))
-    #
-    # # test_read_stock_info()
-    # asyncio.run(test_get_quarterly_results())
-    # asyncio.run(test_get_profit_loss())
-    # asyncio.run(test_get_balance_sheet())
-    # asyncio.run(test_get_cash_flow())
-    # asyncio.run(test_get_ratios())
-    # asyncio.run(test_get_shareholding_pattern_quarterly())
-    # asyncio.run(test_get_shareholding_pattern_yearly())
-    # time.sleep(random.randint(1, 5))
-    #
-    # # asyncio.run(test_get_explore_page())
-    # # time.sleep(random.randint(1, 5))
-    #
-    # asyncio.run(test_get_screens_page(page="1"))
-    # time.sleep(random.randint(1, 5))
-
-    # asyncio.run(test_get_price_info())
-
-    # asyncio.run(test_calculate_moving_average())
-
-    # asyncio.run(test_calculate_rsi())
-
-    asyncio.run(test_trade_recommendation())
\ No newline at end of file
+import json
+import os
+
+import httpx
+import pytest
+
+import http_client
+from benchmarks.scenarios import COMPANY_NAME, SCENARIOS, tool_error
+from replay import ReplayMissError, ReplayTransport, fixture_name, request_key
+from server import (calculate_moving_average, calculate_rsi, download_report, get_company_details,
+                    get_price_info, get_quarterly_results, get_screens_page, get_warehouse_and_company_id, mcp,
+                    trade_recommendation)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "replay")
+
+
+def replayed(fn, directory=FIXTURES):
+    """Run `fn()` with every upstream response served from the replay fixtures."""
+    transport = ReplayTransport(directory)
+
+    async def run():
+        http_client.configure_client(transport=transport, rate_limit=0)
+        try:
+            return await fn()
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+    return asyncio.run(run()), transport
+
+
+@pytest.mark.parametrize("tool,arguments", SCENARIOS, ids=[f"{i}-{tool}" for i, (tool, _) in enumerate(SCENARIOS)])
+def test_every_tool_runs_offline(tool, arguments):
+    async def call():
+        if tool == "screen_companies":
+            await mcp.call_tool("load_warehouse", {"symbols": ["WIPRO", "TCS", "INFY"]})
+        return (await mcp.call_tool(tool, arguments))[0].text
+
+    text, _ = replayed(call)
+    assert tool_error(json.loads(text) if text[:1] in "{[" else text) is None
+
+
+def test_company_details_and_ids():
+    async def calls():
+        return await get_company_details("WIPRO"), await get_warehouse_and_company_id("WIPRO")
+
+    (details, ids), _ = replayed(calls)
+    assert details.startswith("WIPRO Ltd is a diversified company")
+    assert ids == ("62101", "8870")
+
+
+def test_quarterly_results():
+    results, transport = replayed(lambda: get_quarterly_results("WIPRO"))
+    assert len(results) > 4
+    assert {"Sales", "Net Profit", "EPS in Rs"} <= set(next(iter(results.values())))
+    assert transport.replayed == {"GET /company/WIPRO/"}
+
+
+def test_price_tools_share_one_chart_request():
+    async def calls():
+        return (await get_price_info("TCS"), await calculate_moving_average("TCS"), await calculate_rsi("TCS"),
+                await trade_recommendation("TCS"))
+
+    (prices, average, rsi, recommendation), transport = replayed(calls)
+    assert prices["datasets"][0]["metric"] == "Price"
+    assert average["signal"] in ("BULLISH", "BEARISH")
+    assert 0 <= rsi["rsi"] <= 100
+    assert recommendation["recommendation"] in ("BUY", "SELL", "HOLD")
+    assert recommendation["current_price"] == average["latest_price"]
+    assert len([key for key in transport.replayed if "/chart/" in key]) == 1
+
+
+def test_download_report_writes_workbook():
+    path, transport = replayed(lambda: download_report("WIPRO"))
+    with open(path, "rb") as f:
+        assert f.read(4) == b"PK\x03\x04"
+    assert "POST /user/company/export/62101/" in transport.replayed
+
+
+def test_symbol_resolution_falls_back_to_search():
+    path, transport = replayed(lambda: download_report(COMPANY_NAME))
+    assert path.endswith("TATA CONSULTANCY.xlsx")
+    assert "GET /api/company/search/?q=TATA+CONSULTANCY" in transport.replayed
+
+
+def test_screens_page():
+    text, _ = replayed(lambda: get_screens_page(1))
+    entries = json.loads(text)
+    assert len(entries) == 20 and entries[0]["name"] == "Stub screen 1"
+
+
+def test_missing_fixture_is_an_error_not_a_network_call(tmp_path):
+    async def fetch():
+        return await http_client.get_client().get("/company/NOPE/")
+
+    with pytest.raises(ReplayMissError, match="GET /company/NOPE/"):
+        replayed(fetch, str(tmp_path))
+    details, _ = replayed(lambda: get_company_details("NOPE"), str(tmp_path))
+    assert details.startswith("Error fetching details for NOPE")
+
+
+def test_record_then_replay(tmp_path):
+    async def upstream(request):
+        return httpx.Response(200, json={"q": request.url.params["q"]}, headers={"set-cookie": "session=1"})
+
+    directory = str(tmp_path / "fixtures")
+    recorder = ReplayTransport(directory, "record", httpx.MockTransport(upstream))
+
+    async def search():
+        client = http_client.get_client()
+        return (await client.get("/api/company/search/", params={"q": "TCS", "fields": "name"})).json()
+
+    async def record():
+        http_client.configure_client(transport=recorder, rate_limit=0)
+        try:
+            return await search()
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+    assert asyncio.run(record()) == {"q": "TCS"}
+    key = "GET /api/company/search/?fields=name&q=TCS"
+    assert recorder.recorded == {key}
+    assert os.listdir(directory) == [fixture_name(key)]
+    assert recorder.load(key)["headers"] == {"content-type": "application/json"}
+
+    found, transport = replayed(search, directory)
+    assert found == {"q": "TCS"} and transport.replayed == {key}
+
+
+def test_request_key_ignores_query_order():
+    a = httpx.Request("GET", "https://www.screener.in/api/x/?b=2&a=1")
+    b = httpx.Request("GET", "https://www.screener.in/api/x/?a=1&b=2")
+    assert request_key(a) == request_key(b) == "GET /api/x/?a=1&b=2"
@@ -0,0 +1,105 @@
+import asyncio
+
+import http_client
+import singleflight
+from benchmarks.stub_server import StubScreener
+from server import get_balance_sheet, get_profit_loss, get_quarterly_results, get_ratios
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(group.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert calls == 1
+    assert group.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_every_waiter_and_are_not_remembered():
+    group = SingleFlight("test-errors")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(group.do("key", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group.stats()["in_flight"] == 0
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    group = SingleFlight("test-cancel")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        first = asyncio.create_task(group.do("key", fetch))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(group.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        try:
+            await first
+        except asyncio.CancelledError:
+            return result, True
+        return result, False
+
+    assert asyncio.run(run()) == ("value", True)
+    assert calls == 1 and group.stats()["in_flight"] == 0
+
+
+def test_parallel_fundamentals_tools_fetch_the_page_once():
+    async def run():
+        async with StubScreener(latency=0.02) as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                before = singleflight.get_group("company_html").stats()["coalesced"]
+                await asyncio.gather(get_quarterly_results("COALESCE"), get_profit_loss("COALESCE"),
+                                     get_balance_sheet("COALESCE"), get_ratios("COALESCE"))
+                after = singleflight.get_group("company_html").stats()["coalesced"]
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+            return stub.hits["company"], after - before
+
+    company_hits, coalesced = asyncio.run(run())
+    assert company_hits == 1
+    assert coalesced == 3
+
+
+def test_concurrent_chart_requests_are_coalesced():
+    from server import get_price_info
+
+    async def run():
+        async with StubScreener(latency=0.02) as stub:
+            http_client.configure_client(base_url=stub.base_url)
+            try:
+                payloads = await asyncio.gather(*(get_price_info("CHARTCO", query="Price", days=30)
+                                                  for _ in range(4)))
+            finally:
+                await http_client.close_client()
+                http_client.reset_client_config()
+            return payloads, dict(stub.hits)
+
+    payloads, hits = asyncio.run(run())
+    assert all(p == payloads[0] for p in payloads)
+    assert hits == {"company": 1, "chart": 1}
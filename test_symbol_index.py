@@ -0,0 +1,66 @@
+import asyncio
+
+import http_client
+import symbol_index
+from benchmarks.stub_server import StubScreener, company_ids
+from server import get_price_info, get_warehouse_and_company_id
+
+
+async def _with_stub(tmp_path, coro_fn):
+    symbol_index.configure_symbol_index(str(tmp_path / "symbols.sqlite3"))
+    async with StubScreener() as stub:
+        http_client.configure_client(base_url=stub.base_url)
+        try:
+            return await coro_fn(stub)
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+
+def test_ids_are_resolved_once_and_persisted(tmp_path):
+    async def run(stub):
+        first = await get_warehouse_and_company_id("wipro")
+        second = await get_warehouse_and_company_id("WIPRO")
+        return first, second, dict(stub.hits)
+
+    first, second, hits = asyncio.run(_with_stub(tmp_path, run))
+    assert first == second == company_ids("WIPRO")
+    assert hits == {"company": 1}
+
+    # A fresh index on the same file (e.g. after a restart) needs no network
+    reopened = symbol_index.SymbolIndex(str(tmp_path / "symbols.sqlite3"))
+    assert reopened.get("WIPRO").url == "/company/WIPRO/"
+
+
+def test_concurrent_lookups_are_deduplicated(tmp_path):
+    async def run(stub):
+        results = await asyncio.gather(*(symbol_index.resolve_company("TCS") for _ in range(10)))
+        return results, dict(stub.hits)
+
+    results, hits = asyncio.run(_with_stub(tmp_path, run))
+    assert len({r.company_id for r in results}) == 1
+    assert hits == {"company": 1}
+
+
+def test_falls_back_to_search_when_symbol_is_not_a_page_slug(tmp_path):
+    async def run(stub):
+        stub.responder = lambda method, path, query: (404, {}, b"") if path == "/company/NOSLUG/" else None
+        ids = await symbol_index.resolve_company("NOSLUG")
+        return ids, dict(stub.hits)
+
+    ids, hits = asyncio.run(_with_stub(tmp_path, run))
+    assert ids.url == "/company/NOSLUG/consolidated/"
+    assert ids.company_id == company_ids("NOSLUG")[1]
+    assert hits == {"search": 1, "company": 1}
+
+
+def test_price_info_skips_search_and_page_once_warm(tmp_path):
+    async def run(stub):
+        await symbol_index.seed(["INFY"])
+        stub.reset_counters()
+        payload = await get_price_info("INFY", query="Price", days=30)
+        return payload, dict(stub.hits)
+
+    payload, hits = asyncio.run(_with_stub(tmp_path, run))
+    assert payload["datasets"][0]["metric"] == "Price"
+    assert hits == {"chart": 1}
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_server import chart_payload, render_company_page
+from parsing import extract_tables
+from table_format import encode_chart, encode_table
+
+
+def test_default_table_encoding_is_unchanged():
+    df = extract_tables(render_company_page("WIPRO"), ["ratios"])["ratios"]
+    assert encode_table(df) == df.to_dict()
+
+
+def test_compact_table_is_split_with_nulls_and_ints():
+    df = pd.DataFrame([[1263.0, 24.81], [np.nan, 5.0]], index=pd.Index(["Sales", "OPM %"], name="Quarter"),
+                      columns=["Mar 2024", "Jun 2024"])
+    encoded = encode_table(df, compact=True)
+    assert encoded == {"name": "Quarter", "index": ["Sales", "OPM %"], "columns": ["Mar 2024", "Jun 2024"],
+                       "data": [[1263, 24.81], [None, 5]]}
+    # Valid JSON, unlike the NaN to_dict() would emit
+    json.loads(json.dumps(encoded, allow_nan=False))
+
+
+def test_table_slicing_and_rounding():
+    df = extract_tables(render_company_page("WIPRO"), ["quarterly_results"])["quarterly_results"]
+    encoded = encode_table(df, compact=True, periods=2, items=["Net Profit", "Sales", "Missing"], precision=0)
+    assert encoded["index"] == ["Net Profit", "Sales"]
+    assert encoded["columns"] == list(df.columns[-2:])
+    assert encoded["data"][1] == [int(round(v)) for v in df.loc["Sales"].iloc[-2:]]
+    assert list(encode_table(df, periods=3)) == list(df.columns[-3:])
+
+
+def test_compact_chart_puts_metrics_on_one_date_axis():
+    payload = chart_payload("WIPRO", "Price-Volume", 30)
+    encoded = encode_chart(payload, compact=True, periods=5)
+    assert encoded["dates"] == [v[0] for v in payload["datasets"][0]["values"][-5:]]
+    assert encoded["series"]["Price"] == [float(v[1]) for v in payload["datasets"][0]["values"][-5:]]
+    assert encoded["series"]["Volume"] == [v[1] for v in payload["datasets"][1]["values"][-5:]]
+    assert encode_chart(payload) is payload
+    assert encode_chart({"error": "boom"}, compact=True) == {"error": "boom"}
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+import http_client
+from replay import ReplayMissError, ReplayTransport
+from server import (calculate_moving_average, calculate_rsi, download_report, get_price_info, make_screener_request,
+                    trade_recommendation)
+from symbol_index import resolve_company
+from upstream import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, retry_after, upstream_stats
+
+
+# Retry quickly against the stub
+FAST_RETRIES = {"retry_backoff": 0.01}
+
+
+def test_gets_are_retried_through_server_errors(run_against_stub):
+    async def run(stub):
+        stub.fail_next(2, status=503)
+        result = await make_screener_request("company/WIPRO/")
+        return result, stub.hits
+
+    result, hits = run_against_stub(run, **FAST_RETRIES)
+    assert result["response"].status_code == 200
+    assert hits["failed"] == 2 and hits["company"] == 1
+    assert upstream_stats()["company"]["retries"] == 2
+
+
+def test_posts_are_not_retried(run_against_stub):
+    async def run(stub):
+        await resolve_company("WIPRO")
+        stub.fail_next(1, status=502)
+        return await download_report("WIPRO"), stub.hits
+
+    result, hits = run_against_stub(run, **FAST_RETRIES)
+    assert result == "Error in downloading report for: WIPRO"
+    assert hits["failed"] == 1 and hits["export"] == 0
+    assert "retries" not in upstream_stats().get("export", {})
+
+
+def test_rate_adapts_to_429s_and_every_request_completes(run_against_stub):
+    async def run(stub):
+        stub.throttle_to(rate=40, burst=2, retry_after=0.05)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(make_screener_request("api/company/search/", params={"q": f"S{i}"})
+                                         for i in range(30)))
+        return results, stub.hits, time.perf_counter() - start
+
+    results, hits, elapsed = run_against_stub(run, **FAST_RETRIES, rate_limit=200, rate_burst=30, retries=10)
+    assert all("response" in r for r in results)
+    assert hits["search"] == 30 and hits["throttled"] > 0
+    stats = upstream_stats()["search"]
+    assert stats["throttled"] == hits["throttled"] and stats["retries"] == hits["throttled"]
+    assert stats["rate"] < 200
+    assert elapsed < 5
+
+
+def test_retry_after_beyond_the_backoff_cap_is_returned_not_waited_for(run_against_stub):
+    async def run(stub):
+        stub.throttle_to(rate=0.01, burst=1, retry_after=120)
+        await make_screener_request("screens/")
+        return await make_screener_request("screens/"), stub.hits
+
+    result, hits = run_against_stub(run, **FAST_RETRIES, retry_max_backoff=5)
+    assert "429" in result["error"]
+    assert hits["throttled"] == 1
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_a_probe(run_against_stub):
+    async def run(stub):
+        stub.fail_next(3, status=500)
+        failed = [await make_screener_request("company/WIPRO/") for _ in range(3)]
+        requests = stub.requests
+        with pytest.raises(CircuitOpenError):
+            await http_client.get_client().get("/company/WIPRO/")
+        rejected = await make_screener_request("company/TCS/")
+        # Other endpoint classes are unaffected
+        search = await make_screener_request("api/company/search/", params={"q": "TCS"})
+        assert stub.requests == requests + 1
+        await asyncio.sleep(0.25)
+        recovered = await make_screener_request("company/WIPRO/")
+        return failed, rejected, search, recovered
+
+    failed, rejected, search, recovered = run_against_stub(run, **FAST_RETRIES, retries=0, breaker_threshold=3,
+                                                           breaker_cooldown=0.2)
+    assert all("500" in r["error"] for r in failed)
+    assert "Circuit open for company requests" in rejected["error"]
+    assert "response" in search and "response" in recovered
+    stats = upstream_stats()["company"]
+    assert stats["failures"] == 3 and stats["rejected"] == 2 and stats["circuit"] == "closed"
+
+
+def test_unresolvable_symbols_come_back_as_error_dicts(run_against_stub):
+    def unknown(method, path, query):
+        if "NOPE" in path.upper() or "NOPE" in str(query.get("q")).upper():
+            if path.startswith("/api/company/search/"):
+                return 200, {"content-type": "application/json"}, b"[]"
+            return 404, {"content-type": "text/plain"}, b"not found"
+        return None
+
+    async def run(stub):
+        tools = [get_price_info("NOPE"), calculate_moving_average("NOPE"), calculate_rsi("NOPE"),
+                 trade_recommendation("NOPE")]
+        unknown_results = [await tool for tool in tools]
+        # Search failing, then its circuit open
+        stub.responder = lambda method, path, query: (503, {}, b"down")
+        return unknown_results, [await get_price_info("NOPE2"), await trade_recommendation("NOPE3")]
+
+    unknown_results, failing = run_against_stub(run, unknown, **FAST_RETRIES, retries=0, breaker_threshold=1)
+    assert all("No company found for symbol: NOPE" in r["error"] for r in unknown_results)
+    assert "503" in failing[0]["error"] and "Circuit open for search requests" in failing[1]["error"]
+
+
+def test_connection_errors_come_back_as_error_dicts():
+    async def run():
+        http_client.configure_client(base_url="http://127.0.0.1:9", retries=1, retry_backoff=0.01)
+        try:
+            return await make_screener_request("company/WIPRO/")
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+    result = asyncio.run(run())
+    assert "error" in result
+    assert upstream_stats()["company"]["retries"] == 1
+
+
+def test_replay_misses_are_not_retried(tmp_path):
+    async def run():
+        http_client.configure_client(transport=ReplayTransport(str(tmp_path)))
+        try:
+            return await http_client.get_client().get("/company/NOPE/")
+        finally:
+            await http_client.close_client()
+            http_client.reset_client_config()
+
+    with pytest.raises(ReplayMissError):
+        asyncio.run(run())
+    assert "retries" not in upstream_stats().get("company", {})
+
+
+def test_retry_after_header_forms():
+    def response(value):
+        return httpx.Response(429, headers={} if value is None else {"retry-after": value})
+
+    assert retry_after(response("3")) == 3.0
+    assert retry_after(response("0.5")) == 0.5
+    assert 55 < retry_after(response(formatdate(time.time() + 60, usegmt=True))) <= 60
+    assert retry_after(response("soon")) is None
+    assert retry_after(response(None)) is None
+
+
+def test_limiter_halves_once_per_throttle_window_and_recovers():
+    limiter = AdaptiveLimiter(rate=20, burst=5, recovery=30)
+    limiter.throttled(0.5)
+    limiter.throttled(0.5)
+    assert limiter.rate == 10
+    # Recovery is paced by time, not by the number of successes
+    for _ in range(50):
+        limiter.succeeded()
+    assert limiter.rate < 11
+    limiter._adjusted -= 15
+    limiter.succeeded()
+    assert limiter.rate == pytest.approx(20)
+    for _ in range(50):
+        limiter._throttled_until = 0
+        limiter.throttled(0.01)
+    assert limiter.rate == pytest.approx(1)
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = CircuitBreaker(threshold=2, cooldown=0)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.allow()
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+
+from company_page import get_sections
+from server import screen_companies
+from warehouse import (Warehouse, company_fields, company_periods, configure_warehouse, field_name, get_warehouse,
+                       ingest, period_columns)
+
+SYMBOLS = ["TCS", "INFY", "WIPRO", "HCLTECH", "TECHM"]
+
+
+async def with_pages(stub, call):
+    """`call`'s result and the number of company pages the stub served."""
+    return await call, stub.hits["company"]
+
+
+def test_field_names():
+    assert field_name("ratios", "ROCE %") == "ratios_roce_pct"
+    assert field_name("balance_sheet", "Borrowings", 1) == "bs_borrowings_1"
+    assert field_name("profit_loss", "Profit before tax") == "pl_profit_before_tax"
+    assert field_name("shareholding_pattern_quarterly", "No. of Shareholders", 2) == "shq_no_of_shareholders_2"
+
+
+def test_yearly_fields_count_back_from_the_latest_financial_year():
+    def table(columns):
+        return pd.DataFrame([range(len(columns))], index=["Net Profit"], columns=columns, dtype=float)
+
+    page = {"profit_loss": table(["Mar 2023", "Mar 2024", "Mar 2025", "TTM"]),
+            "balance_sheet": table(["Mar 2023", "Mar 2024", "Mar 2025", "Sep 2025"]),
+            "quarterly_results": table(["Mar 2025", "Jun 2025", "Sep 2025"])}
+    report = {"profit_loss": table(["Mar 2023", "Mar 2024", "Mar 2025"]),
+              "balance_sheet": table(["Mar 2023", "Mar 2024", "Mar 2025"]),
+              "quarterly_results": table(["Mar 2025", "Jun 2025", "Sep 2025"])}
+    assert company_fields(page) == company_fields(report)
+    assert company_fields(page)["pl_net_profit"] == 2 and company_fields(page)["q_net_profit"] == 2
+    assert company_periods(page) == {"pl": "Mar 2025", "bs": "Mar 2025", "q": "Sep 2025"}
+    december = table(["Dec 2022", "Dec 2023", "Dec 2024", "TTM"])
+    assert list(period_columns("profit_loss", december).columns) == ["Dec 2022", "Dec 2023", "Dec 2024"]
+
+
+def test_screen_matches_per_company_tables(tmp_path, run_against_stub):
+    outcome, pages = run_against_stub(lambda stub: with_pages(stub, ingest(SYMBOLS)))
+    assert (outcome["succeeded"], outcome["universe"], pages) == (5, 5, 5)
+
+    expression = "ratios_roce_pct > 20 and bs_borrowings < bs_borrowings_1"
+    result = asyncio.run(screen_companies(expression, rank_by="ratios_roce_pct", fields=["pl_sales"]))
+    assert result["universe"] == 5
+
+    tables = run_against_stub(lambda stub: asyncio.gather(*(get_sections(s) for s in SYMBOLS)))
+    expected = {}
+    for symbol, sections in zip(SYMBOLS, tables):
+        roce = sections["ratios"].loc["ROCE %"].iloc[-1]
+        borrowings = period_columns("balance_sheet", sections["balance_sheet"]).loc["Borrowings"]
+        if roce > 20 and borrowings.iloc[-1] < borrowings.iloc[-2]:
+            expected[symbol] = roce
+    assert expected and result["matched"] == len(expected)
+    assert [r["symbol"] for r in result["results"]] == sorted(expected, key=expected.get, reverse=True)
+    for row in result["results"]:
+        assert set(row) == {"symbol", "ratios_roce_pct", "bs_borrowings", "bs_borrowings_1", "pl_sales", "rank",
+                            "periods"}
+        assert row["periods"] == {"ratios": "Mar 2025", "bs": "Mar 2025", "pl": "Mar 2025"}
+
+
+def test_warehouse_persists_and_refreshes_rows(tmp_path, run_against_stub):
+    run_against_stub(lambda stub: ingest(SYMBOLS[:3]))
+    run_against_stub(lambda stub: ingest(["tcs", "TECHM"]))
+    reloaded = Warehouse(str(tmp_path / "warehouse"))
+    assert sorted(reloaded.frame.index) == ["INFY", "TCS", "TECHM", "WIPRO"]
+    assert reloaded.periods == get_warehouse().periods and reloaded.periods["TCS"]["bs"] == "Mar 2025"
+    assert reloaded.frame.equals(get_warehouse().frame)
+
+
+def test_invalid_expressions_are_reported(tmp_path):
+    configure_warehouse(str(tmp_path / "screen")).upsert({"TCS": {"ratios_roce_pct": 30.0}})
+    assert "error" in asyncio.run(screen_companies("no_such_field > 1"))
+    assert "error" in asyncio.run(screen_companies("ratios_roce_pct * 2"))
+    with pytest.raises(ValueError):
+        get_warehouse().screen("ratios_roce_pct >")
+    assert asyncio.run(screen_companies("ratios_roce_pct > 20"))["results"] == [
+        {"symbol": "TCS", "ratios_roce_pct": 30, "periods": {"ratios": None}}]
+
+
+def test_expressions_cannot_run_code(tmp_path, capfd):
+    rows = {"TCS": {"ratios_roce_pct": 30.0}, "INFY": {"ratios_roce_pct": 5.0}}
+    configure_warehouse(str(tmp_path / "screen")).upsert(rows)
+    payload = ("(ratios_roce_pct.__init__.__globals__.get('sys').modules.get('os').system('echo PWNED >&2') == 0)"
+               " | (ratios_roce_pct > 0)")
+    result = asyncio.run(screen_companies(payload))
+    assert "error" in result and "PWNED" not in capfd.readouterr().err
+    for expression in ("abs(ratios_roce_pct) > 1", "ratios_roce_pct[0] > 1", "ratios_roce_pct > 'a'",
+                       "(lambda: 1)() > 0", "@ratios_roce_pct > 1"):
+        assert "error" in asyncio.run(screen_companies(expression)), expression
+    assert "error" in asyncio.run(screen_companies("ratios_roce_pct > 0", rank_by="ratios_roce_pct.sum()"))
+    allowed = "not (ratios_roce_pct < 10) and (-ratios_roce_pct <= 1e3) & ~(ratios_roce_pct == 0)"
+    result = asyncio.run(screen_companies(allowed, rank_by="ratios_roce_pct * 2"))
+    assert [r["symbol"] for r in result["results"]] == ["TCS"]
+
+
+def test_powers_are_refused(tmp_path):
+    configure_warehouse(str(tmp_path / "screen")).upsert({"TCS": {"ratios_roce_pct": 30.0}})
+    start = time.perf_counter()
+    for expression in ("ratios_roce_pct > 9**9**9", "ratios_roce_pct ** 2 > 1"):
+        assert "**" in asyncio.run(screen_companies(expression))["error"]
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,292 @@
+"""Upstream governance for Screener.in: adaptive rate limits, retries and a circuit breaker.
+
+Requests are grouped into endpoint classes (search, chart, export, company,
+screen, screens). GovernedTransport wraps the client's transport and, per
+class:
+
+- paces requests with a token bucket. A 429 halves the bucket's rate and
+  pauses it for the Retry-After; while requests succeed the rate climbs back
+  linearly, reaching the configured rate after SCREENER_RATE_RECOVERY
+  seconds from zero (additive increase, multiplicative decrease).
+- retries idempotent requests (GET/HEAD) that hit a 429, a 5xx, a timeout
+  or a dropped connection, after a jittered exponential backoff or the
+  Retry-After. POSTs (the Excel export) are sent once.
+- opens a circuit after SCREENER_BREAKER_THRESHOLD consecutive 5xx or
+  connection failures. For SCREENER_BREAKER_COOLDOWN seconds requests fail
+  at once with CircuitOpenError, then one probe is let through: its success
+  closes the circuit, its failure opens it again. 429s never open it.
+
+Both error types subclass httpx.TransportError, so callers handling
+httpx.HTTPError need no changes.
+"""
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+
+import httpx
+
+from rate_limit import TokenBucket
+
+# Retries of an idempotent request after the first attempt, and their backoff (seconds)
+SCREENER_RETRIES = int(os.getenv("SCREENER_RETRIES", "3"))
+SCREENER_RETRY_BACKOFF = float(os.getenv("SCREENER_RETRY_BACKOFF", "0.5"))
+SCREENER_RETRY_MAX_BACKOFF = float(os.getenv("SCREENER_RETRY_MAX_BACKOFF", "30"))
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+SCREENER_BREAKER_THRESHOLD = int(os.getenv("SCREENER_BREAKER_THRESHOLD", "5"))
+SCREENER_BREAKER_COOLDOWN = float(os.getenv("SCREENER_BREAKER_COOLDOWN", "30"))
+
+# Upstream paths grouped into endpoint classes, first match wins
+ENDPOINTS = (
+    ("search", re.compile(r"^/api/company/search/")),
+    ("chart", re.compile(r"^/api/company/[^/]+/chart/")),
+    ("export", re.compile(r"^/user/company/export/")),
+    ("company", re.compile(r"^/company/")),
+    ("screen", re.compile(r"^/screens/\d+")),
+    ("screens", re.compile(r"^/screens")),
+)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# ReplayMissError and CircuitOpenError are TransportErrors too, but retrying them cannot help
+RETRY_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+# Seconds an adaptive rate takes to climb back from zero to the configured one
+SCREENER_RATE_RECOVERY = float(os.getenv("SCREENER_RATE_RECOVERY", "30"))
+# An adaptive rate never drops below this fraction of the configured one
+MIN_RATE_FRACTION = 0.05
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The endpoint's circuit is open: Screener has been failing, the request was not sent."""
+
+
+def endpoint_of(path: str) -> str:
+    for name, pattern in ENDPOINTS:
+        if pattern.match(path):
+            return name
+    return "other"
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), if any."""
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """A token bucket whose rate backs off on 429s and creeps back up on successes."""
+
+    def __init__(self, rate: float, burst: float, recovery: float = SCREENER_RATE_RECOVERY):
+        self.max_rate = rate
+        self.recovery = recovery
+        self.bucket = TokenBucket(rate, burst)
+        self._throttled_until = 0.0
+        self._adjusted = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    async def acquire(self) -> float:
+        if self.max_rate <= 0:
+            return 0.0
+        return await self.bucket.acquire()
+
+    def throttled(self, pause: float | None) -> None:
+        if self.max_rate <= 0:
+            return
+        now = time.monotonic()
+        # A burst of 429s answers one overload: slow down once per pause window
+        if now >= self._throttled_until:
+            self.bucket.set_rate(max(self.max_rate * MIN_RATE_FRACTION, self.bucket.rate / 2))
+            self._adjusted = now
+        pause = pause if pause is not None else 1 / self.bucket.rate
+        self._throttled_until = max(self._throttled_until, now + pause)
+        self.bucket.pause(pause)
+
+    def succeeded(self) -> None:
+        if 0 < self.bucket.rate < self.max_rate:
+            # Linear in time, not per success, so a busy endpoint does not win its rate back faster
+            now = time.monotonic()
+            step = self.max_rate * (now - self._adjusted) / self.recovery if self.recovery > 0 else self.max_rate
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + step))
+            self._adjusted = now
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open (one probe) after `cooldown`."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half-open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only the first caller is the probe."""
+        state = self.state
+        if state == "closed" or self.threshold <= 0:
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool) -> None:
+        self.probing = False
+        if ok:
+            self.failures, self.opened_at = 0, None
+            return
+        self.failures += 1
+        if self.threshold > 0 and (self.opened_at is not None or self.failures >= self.threshold):
+            if self.opened_at is None:
+                logging.info(f"Circuit opened after {self.failures} consecutive upstream failures")
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give up a probe that ended without an outcome (cancelled, no recording, ...)."""
+        self.probing = False
+
+
+_counters: dict[str, Counter] = {}
+_active: "GovernedTransport | None" = None
+
+
+def _count(endpoint: str, event: str) -> None:
+    _counters.setdefault(endpoint, Counter())[event] += 1
+
+
+def upstream_stats() -> dict[str, dict[str, Any]]:
+    """Per endpoint: retries/throttled/failures/rejected counts, current rate and circuit state."""
+    stats = {endpoint: dict(counts) for endpoint, counts in _counters.items()}
+    if _active is not None:
+        for endpoint, limiter in _active.limiters.items():
+            stats.setdefault(endpoint, {})["rate"] = limiter.rate
+        for endpoint, breaker in _active.breakers.items():
+            stats.setdefault(endpoint, {})["circuit"] = breaker.state
+    return stats
+
+
+def reset_upstream_stats() -> None:
+    _counters.clear()
+
+
+class GovernedTransport(httpx.AsyncBaseTransport):
+    """Rate limits, retries and circuit-breaks the requests of the wrapped transport, per endpoint class.
+
+    `on_wait(endpoint, seconds)` is called with the time each attempt spent
+    waiting on the rate limiter.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, rate: float, burst: float,
+                 retries: int = SCREENER_RETRIES, backoff_base: float = SCREENER_RETRY_BACKOFF,
+                 max_backoff: float = SCREENER_RETRY_MAX_BACKOFF,
+                 breaker_threshold: int = SCREENER_BREAKER_THRESHOLD,
+                 breaker_cooldown: float = SCREENER_BREAKER_COOLDOWN,
+                 on_wait: Callable[[str, float], None] | None = None):
+        global _active
+        self._transport = transport
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.on_wait = on_wait
+        self.limiters: dict[str, AdaptiveLimiter] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        _active = self
+
+    def limiter(self, endpoint: str) -> AdaptiveLimiter:
+        limiter = self.limiters.get(endpoint)
+        if limiter is None:
+            limiter = self.limiters[endpoint] = AdaptiveLimiter(self.rate, self.burst)
+        return limiter
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return breaker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = endpoint_of(request.url.path)
+        limiter, breaker = self.limiter(endpoint), self.breaker(endpoint)
+        retries = self.retries if request.method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                _count(endpoint, "rejected")
+                raise CircuitOpenError(f"Circuit open for {endpoint} requests, Screener.in is failing", request=request)
+            try:
+                waited = await limiter.acquire()
+                if self.on_wait is not None:
+                    self.on_wait(endpoint, waited)
+                response = await self._transport.handle_async_request(request)
+            except RETRY_ERRORS:
+                breaker.record(False)
+                _count(endpoint, "failures")
+                if attempt >= retries:
+                    raise
+                _count(endpoint, "retries")
+                await asyncio.sleep(backoff(attempt, self.backoff_base, self.max_backoff))
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            status = response.status_code
+            if status == 429:
+                breaker.release()
+                _count(endpoint, "throttled")
+                limiter.throttled(retry_after(response))
+            elif status >= 500:
+                breaker.record(False)
+                _count(endpoint, "failures")
+            else:
+                breaker.record(True)
+                limiter.succeeded()
+                return response
+            if attempt >= retries or status not in RETRY_STATUSES:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff(attempt, self.backoff_base, self.max_backoff)
+            elif delay > self.max_backoff:
+                return response
+            await response.aclose()
+            _count(endpoint, "retries")
+            # After a 429 the paused bucket does the waiting, unless rate limiting is off
+            if status != 429 or limiter.max_rate <= 0:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
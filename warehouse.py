@@ -0,0 +1,273 @@
+"""Cross-company fundamentals warehouse for screening the whole universe at once.
+
+Every ingested company becomes one row of a float matrix whose columns are
+named fields, one per (section, line item, period back from the latest):
+
+    ratios_roce_pct       ROCE % in the latest Ratios column
+    bs_borrowings_1       Borrowings one balance sheet period before the latest
+    q_net_profit_3        Net Profit three quarters before the latest
+
+Section prefixes are q, pl, bs, cf, ratios, shq and shy (see SECTION_PREFIXES)
+and line items are lower-cased with "%" spelled "pct". Yearly sections keep
+financial-year columns only: the company page's TTM and half-year columns
+are dropped (the Excel report has neither), so pl_net_profit is the latest
+full year's profit for every company. The latest period of each section is
+recorded per company (Warehouse.periods) and returned with screen results. Screens are pandas
+expressions over those fields, evaluated for all companies in one vectorized
+pass, e.g. "ratios_roce_pct > 20 and bs_borrowings < bs_borrowings_1". Only
+fields, numbers, + - * / // %, comparisons and and/or/not/&/|/~ are accepted
+(see check_expression): no powers, attribute access, calls or subscripts.
+
+The matrix is kept as a .npy file (memory-mapped on load) next to a JSON
+file of row and column names, under SCREENER_WAREHOUSE_DIR.
+
+Fill it from the command line (pages come through the usual caches):
+
+    python warehouse.py TCS WIPRO INFY
+    python warehouse.py --file nifty500.txt
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+
+from batch import run_batch
+from cache import SCREENER_CACHE_DIR
+from company_page import get_sections
+from lazy_import import lazy_module
+from symbol_index import normalize_symbol
+
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+SCREENER_WAREHOUSE_DIR = os.getenv("SCREENER_WAREHOUSE_DIR", os.path.join(SCREENER_CACHE_DIR, "warehouse"))
+# How many periods (latest included) of each line item are kept
+SCREENER_WAREHOUSE_PERIODS = int(os.getenv("SCREENER_WAREHOUSE_PERIODS", "5"))
+
+SECTION_PREFIXES = {
+    "quarterly_results": "q",
+    "profit_loss": "pl",
+    "balance_sheet": "bs",
+    "cash_flow": "cf",
+    "ratios": "ratios",
+    "shareholding_pattern_quarterly": "shq",
+    "shareholding_pattern_yearly": "shy",
+}
+
+
+def field_name(section: str, item: str, back: int = 0) -> str:
+    """Warehouse field for `item` of `section`, `back` periods before the latest."""
+    slug = re.sub(r"[^a-z0-9]+", "_", item.lower().replace("%", " pct").replace("&", " and ")).strip("_")
+    name = f"{SECTION_PREFIXES[section]}_{slug}"
+    return f"{name}_{back}" if back else name
+
+
+# Sections with one column per financial year
+YEARLY_SECTIONS = ("profit_loss", "balance_sheet", "cash_flow", "ratios", "shareholding_pattern_yearly")
+
+
+def period_columns(section: str, table: pd.DataFrame) -> pd.DataFrame:
+    """`table` without the columns that are not whole periods of `section`.
+
+    For yearly sections that is every column not ending in the company's
+    financial year-end month (the most common month among its columns):
+    TTM, and the half-year the balance sheet adds after the last year.
+    """
+    if section not in YEARLY_SECTIONS:
+        return table
+    months = [str(c).split()[0] for c in table.columns if re.fullmatch(r"[A-Z][a-z]{2} \d{4}", str(c))]
+    if not months:
+        return table
+    year_end = max(months, key=months.count)
+    return table.loc[:, [c for c in table.columns if re.fullmatch(rf"{year_end} \d{{4}}", str(c))]]
+
+
+def company_periods(tables: dict[str, pd.DataFrame]) -> dict[str, str]:
+    """Latest period label of each section (by prefix) that company_fields counts back from."""
+    latest = {SECTION_PREFIXES[section]: period_columns(section, table).columns for section, table in tables.items()}
+    return {prefix: str(columns[-1]) for prefix, columns in latest.items() if len(columns)}
+
+
+def company_fields(tables: dict[str, pd.DataFrame], periods: int = SCREENER_WAREHOUSE_PERIODS) -> dict[str, float]:
+    """Flatten one company's section tables into warehouse fields."""
+    fields: dict[str, float] = {}
+    for section, table in tables.items():
+        table = period_columns(section, table)
+        values = table.to_numpy(dtype=float)
+        for row, item in enumerate(table.index):
+            # Latest period is the last column; walk backwards from it
+            for back in range(min(periods, values.shape[1])):
+                fields.setdefault(field_name(section, str(item), back), values[row, -1 - back])
+    return fields
+
+
+# Everything a screen expression may contain besides field names and numbers. No ** (9**9**9 is
+# exact integer arithmetic that would run for minutes) and no @
+EXPRESSION_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.Load,
+                    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+                    ast.BitAnd, ast.BitOr, ast.BitXor, ast.unaryop, ast.cmpop, ast.boolop)
+
+
+def check_expression(expression: str, fields: Iterable[str]) -> None:
+    """Raise ValueError unless `expression` is arithmetic and logic over known fields and numbers.
+
+    Screens run through pandas' python-engine eval, which would otherwise
+    follow attribute access and calls.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screen expression: {e.msg}") from None
+    known = set(fields)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if node.id not in known:
+                raise ValueError(f"Unknown field in screen expression: {node.id}")
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"Only numbers are allowed as constants, got: {node.value!r}")
+        elif isinstance(node, ast.Pow):
+            raise ValueError("Powers (**) are not allowed in a screen expression")
+        elif not isinstance(node, EXPRESSION_NODES):
+            part = ast.get_source_segment(expression.strip(), node) or type(node).__name__
+            raise ValueError(f"Not allowed in a screen expression: {part}")
+
+
+class Warehouse:
+    """Companies x fields float matrix, persisted as a memory-mappable .npy."""
+
+    def __init__(self, directory: str = SCREENER_WAREHOUSE_DIR):
+        self.directory = directory
+        self._values_path = os.path.join(directory, "values.npy")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self.frame = pd.DataFrame(dtype=float)
+        self.updated_at: dict[str, float] = {}
+        # symbol -> section prefix -> label of the latest period its fields count back from
+        self.periods: dict[str, dict[str, str]] = {}
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            values = np.load(self._values_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return
+        self.frame = pd.DataFrame(values, index=pd.Index(meta["symbols"], name="symbol"), columns=meta["fields"])
+        self.updated_at = meta["updated_at"]
+        self.periods = meta.get("periods", {})
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self.frame.columns)
+
+    def upsert(self, rows: dict[str, dict[str, float]], periods: dict[str, dict[str, str]] | None = None) -> None:
+        """Replace the rows of these symbols (adding any new fields as columns), and their latest periods."""
+        if not rows:
+            return
+        incoming = pd.DataFrame.from_dict(rows, orient="index", dtype=float)
+        frame = self.frame.drop(index=incoming.index, errors="ignore")
+        self.frame = pd.concat([frame, incoming]).astype(float)
+        self.frame.index.name = "symbol"
+        now = time.time()
+        self.updated_at.update({symbol: now for symbol in rows})
+        for symbol in rows:
+            self.periods[symbol] = (periods or {}).get(symbol, {})
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Write both files under temp names and swap them in, values first
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.frame.to_numpy(dtype=float)))
+        os.replace(tmp, self._values_path)
+        meta = {"symbols": list(self.frame.index), "fields": self.fields, "updated_at": self.updated_at,
+                "periods": self.periods}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def referenced_fields(self, expression: str, fields: Iterable[str] | None = None) -> list[str]:
+        known = set(self.frame.columns if fields is None else fields)
+        return list(dict.fromkeys(t for t in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", expression) if t in known))
+
+    def screen(self, expression: str, rank_by: str | None = None, descending: bool = True,
+               fields: Iterable[str] = ()) -> pd.DataFrame:
+        """Companies matching `expression`, optionally ranked by the `rank_by` expression.
+
+        Returns the referenced fields (plus `fields`, plus a "rank" column when
+        ranking) for the matches. Raises ValueError for an invalid expression.
+        """
+        # Work on one snapshot: this runs in a worker thread while ingest may swap the frame in
+        table = self.frame
+        for text in (expression, rank_by) if rank_by else (expression,):
+            check_expression(text, table.columns)
+        columns = self.referenced_fields(f"{expression} {rank_by or ''}", table.columns)
+        # Evaluate over the referenced columns only; eval resolves every column of the frame it runs on
+        frame = table[columns]
+        try:
+            mask = frame.eval(expression, engine="python")
+            ranking = frame.eval(rank_by, engine="python") if rank_by else None
+        except Exception as e:
+            raise ValueError(f"Invalid screen expression: {e}") from e
+        if not isinstance(mask, pd.Series) or mask.dtype != bool:
+            raise ValueError(f"Screen expression must be a condition, got: {expression}")
+        columns += [f for f in fields if f in table.columns and f not in columns]
+        result = table.loc[mask, columns]
+        if ranking is not None:
+            result = result.assign(rank=ranking[mask]).sort_values("rank", ascending=not descending)
+        return result
+
+
+_warehouse: Warehouse | None = None
+
+
+def get_warehouse() -> Warehouse:
+    global _warehouse
+    if _warehouse is None:
+        _warehouse = Warehouse()
+    return _warehouse
+
+
+def configure_warehouse(directory: str) -> Warehouse:
+    """Point the process-wide warehouse at another directory (tests, alternate deployments)."""
+    global _warehouse
+    _warehouse = Warehouse(directory)
+    return _warehouse
+
+
+async def ingest(symbols: list[str], concurrency: int | None = None) -> dict[str, Any]:
+    """Load the seven fundamentals sections of each symbol into the warehouse and save it."""
+    outcome = await run_batch([normalize_symbol(s) for s in symbols],
+                              lambda s: get_sections(s), concurrency)
+    warehouse = get_warehouse()
+    warehouse.upsert({symbol: company_fields(tables) for symbol, tables in outcome["results"].items()},
+                     {symbol: company_periods(tables) for symbol, tables in outcome["results"].items()})
+    await asyncio.to_thread(warehouse.save)
+    outcome["results"] = sorted(outcome["results"])
+    outcome["universe"] = len(warehouse)
+    return outcome
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load companies into the fundamentals warehouse")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--file", help="file with one symbol per line")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip()]
+    result = asyncio.run(ingest(symbols, args.concurrency))
+    print(f"{result['succeeded']} loaded, {result['failed']} failed, {result['universe']} companies in the warehouse")
+    for symbol, error in result["errors"].items():
+        print(f"{symbol}: {error}")